@@ -2,7 +2,16 @@
 import streamlit as st  # Para crear la interfaz web interactiva.
 import pandas as pd     # Para la manipulación y análisis de datos.
 import plotly.express as px # Para crear gráficos interactivos.
-import io               # Para manejar la conversión de datos a bytes (necesario para la descarga de archivos).
+from datos import load_cubo, load_data  # Cargas cacheadas del conjunto de datos indexado y del cubo (compartidas con las demás páginas).
+from exportacion import (FORMATOS, URL_API, a_archivo, bloques_provincias, bloques_series, en_bloques,  # Exportación por bloques.
+                         formatos_disponibles, nombre_archivo, url_exportacion)
+from mapas import (NIVELES_DETALLE, cargar_geojson, figura_coropletas, figura_provincias,  # Mapas con geometría local.
+                   geojson_disponibles, paises_geojson)
+from cache_acotada import cache_acotada  # Caché en memoria acotada (LRU por bytes, caduca con la instantánea).
+from instrumentacion import iniciar_rerun, instrumentar_cache, medir, panel_depuracion  # Tiempos por rerun (opcional).
+
+# Abre el registro de tiempos de este rerun (no hace nada si la instrumentación está desactivada).
+iniciar_rerun('Pagina_Principal')
 
 # --- Configuración de la Página ---
 # Establece las propiedades iniciales de la página web.
@@ -13,42 +22,9 @@ st.set_page_config(
 )
 
 
-# --- Funciones de Carga y Procesamiento de Datos ---
-# El decorador @st.cache_data le dice a Streamlit que "recuerde" el resultado de esta función.
-# De esta forma, los datos se descargan y procesan solo una vez, haciendo la app mucho más rápida.
-@st.cache_data
-def load_data():
-    # Define la URL del archivo CSV con los datos.
-    url = 'https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_daily_reports/04-18-2022.csv'
-    # Lee los datos desde la URL y los carga en un DataFrame de pandas.
-    df = pd.read_csv(url)
-
-    # Limpieza básica de los datos.
-    # Renombra la columna 'Case_Fatality_Ratio' a 'CFR' para que sea más corta y fácil de usar.
-    df.rename(columns={'Case_Fatality_Ratio': 'CFR'}, inplace=True)
-    # Convierte la columna 'CFR' a un tipo de dato numérico. Si encuentra un valor que no puede convertir, lo reemplaza con NaN (Not a Number).
-    df['CFR'] = pd.to_numeric(df['CFR'], errors='coerce')
-
-    # Agrupa los datos por país para obtener los totales.
-    # .groupby('Country_Region') agrupa todas las filas que pertenecen al mismo país.
-    # .agg({...}) aplica una función de agregación (en este caso, 'sum') a cada columna especificada.
-    # .reset_index() convierte el resultado agrupado de nuevo en un DataFrame estándar.
-    df_pais = df.groupby('Country_Region').agg({
-        'Confirmed': 'sum',
-        'Deaths': 'sum',
-        'Recovered': 'sum',
-        'Active': 'sum'
-    }).reset_index()
-
-    # (Punto 2.1 del lab) Calcula la Tasa de Mortalidad (Case Fatality Ratio) para cada país.
-    df_pais['CFR'] = (df_pais['Deaths'] / df_pais['Confirmed'] * 100).round(2)
-
-    # La función devuelve dos DataFrames: el original (crudo) y el procesado por país.
-    return df, df_pais
-
-
-# Llama a la función para cargar los datos y los guarda en dos variables.
-df_raw, df_country = load_data()
+# Llama a la función para cargar los datos y toma las dos tablas principales.
+datos = load_data()
+df_raw, df_country = datos.raw, datos.paises
 
 # --- Barra Lateral (Sidebar) con Filtros ---
 # Añade un encabezado a la barra lateral izquierda.
@@ -56,7 +32,7 @@ st.sidebar.header("Filtros Globales")
 # Crea un widget de selección múltiple en la barra lateral para que el usuario elija los países.
 selected_countries = st.sidebar.multiselect(
     'Selecciona Países',
-    options=sorted(df_country['Country_Region'].unique()), # Las opciones son la lista de países únicos, ordenados alfabéticamente.
+    options=datos.opciones_paises, # Las opciones son la lista de países, ya ordenada alfabéticamente al cargar los datos.
     default=['US', 'India', 'Brazil', 'France', 'Germany', 'Peru'] # Países seleccionados por defecto al cargar la app.
 )
 
@@ -70,10 +46,10 @@ confirmed_threshold = st.sidebar.slider(
 )
 
 # Filtra el DataFrame de países basándose en las selecciones del usuario en la barra lateral.
-df_filtered_sidebar = df_country[
-    (df_country['Country_Region'].isin(selected_countries)) & # Condición 1: el país debe estar en la lista seleccionada.
-    (df_country['Confirmed'] >= confirmed_threshold)         # Condición 2: los casos confirmados deben ser mayores o iguales al umbral.
-    ]
+# Condición 1: el país debe estar en la lista seleccionada (búsqueda directa por índice país → fila).
+# Condición 2: los casos confirmados deben ser mayores o iguales al umbral (búsqueda binaria en el orden precalculado).
+with medir('filtrar'):
+    df_filtered_sidebar = datos.filtrar(selected_countries, 'Confirmed', confirmed_threshold)
 
 # --- Título Principal ---
 # Muestra el título principal de la aplicación en el área de contenido.
@@ -84,10 +60,10 @@ st.markdown("Laboratorio 1.1 - Análisis Estadístico, Modelado y Propuesta de I
 # --- 5.2: KPIs Principales ---
 # Muestra un encabezado para la sección de indicadores clave.
 st.header("Indicadores Clave de Rendimiento (KPIs) Globales")
-# Calcula el total de casos confirmados sumando la columna 'Confirmed'.
-total_confirmed = df_country['Confirmed'].sum()
-# Calcula el total de fallecidos sumando la columna 'Deaths'.
-total_deaths = df_country['Deaths'].sum()
+# Toma el total global de casos confirmados del cubo jerárquico (ya sumado al cargar los datos).
+total_confirmed = datos.jerarquia.total['Confirmed']
+# Toma el total global de fallecidos del cubo jerárquico.
+total_deaths = datos.jerarquia.total['Deaths']
 # Calcula la tasa de mortalidad global.
 global_cfr = (total_deaths / total_confirmed) * 100
 
@@ -111,47 +87,140 @@ metric_select = st.selectbox("Selecciona una Métrica:", ['Confirmed', 'Deaths',
 # Crea un slider para que el usuario elija cuántos países mostrar en el gráfico.
 top_n = st.slider("Número de países a mostrar:", 5, 50, 10)
 
-# Selecciona los 'N' países con los valores más altos para la métrica elegida.
-top_n_data = df_country.nlargest(top_n, metric_select)
-# Crea una figura de gráfico de barras interactivo con Plotly Express.
-fig_top_n = px.bar(top_n_data, x='Country_Region', y=metric_select, title=f"Top {top_n} Países por {metric_select}")
+# Construye el gráfico de barras del Top N y lo guarda ya serializado.
+# La caché se indexa por (instantánea, métrica, N): volver a una combinación ya vista no reconstruye la figura.
+@instrumentar_cache(cache_acotada())
+def figura_top_n(_datos, id_snapshot, metrica, n):
+    # Selecciona los 'N' países con los valores más altos para la métrica elegida (un corte del orden precalculado).
+    top_n_data = _datos.top_n(metrica, n)
+    # Crea una figura de gráfico de barras interactivo con Plotly Express.
+    fig = px.bar(top_n_data, x='Country_Region', y=metrica, title=f"Top {n} Países por {metrica}")
+    # Devuelve la figura como diccionario (su representación JSON).
+    return fig.to_dict()
+
+
 # Muestra el gráfico en la aplicación, haciendo que ocupe todo el ancho disponible.
-st.plotly_chart(fig_top_n, use_container_width=True)
+st.plotly_chart(figura_top_n(datos, datos.id_snapshot, metric_select, top_n), use_container_width=True)
 
 # Sub-encabezado para el mapa.
 st.subheader("Mapa Interactivo de Casos Confirmados")
-# Crea una figura de mapa coroplético (mapa del mundo coloreado por valor).
-fig_map = px.choropleth(
-    df_country,
-    locations="Country_Region",        # Columna con los nombres de los países.
-    locationmode='country names',      # Le dice a Plotly que use nombres de países para ubicarlos.
-    color="Confirmed",                 # La columna que determinará el color de cada país.
-    hover_name="Country_Region",       # El nombre que aparecerá al pasar el cursor sobre un país.
-    color_continuous_scale=px.colors.sequential.Plasma, # La paleta de colores a usar.
-    title="Distribución Mundial de Casos Confirmados"
-)
-# Muestra el mapa en la aplicación.
-st.plotly_chart(fig_map, use_container_width=True)
 
-# --- 5.4: Exportación de Datos ---
-# Encabezado en la barra lateral para la sección de descarga.
-st.sidebar.header("Exportación de Datos")
 
+# Construye el mapa coroplético (mapa del mundo coloreado por valor) y lo guarda ya serializado.
+# Los países se ubican por código ISO3 de una tabla local, no por nombre, y la figura se construye
+# una sola vez por instantánea y métrica.
+@instrumentar_cache(cache_acotada())
+def figura_mapa(_datos, id_snapshot, metrica):
+    return figura_coropletas(_datos.paises, metrica)
 
-# Define una función (también cacheada) para convertir un DataFrame a un archivo CSV en memoria.
-@st.cache_data
-def convert_df_to_csv(df):
-    # .to_csv() convierte el DataFrame a formato CSV. index=False evita que se guarde el índice.
-    # .encode('utf-8') convierte el texto a bytes, que es el formato que necesita el botón de descarga.
-    return df.to_csv(index=False).encode('utf-8')
 
+# Muestra el mapa en la aplicación.
+st.plotly_chart(figura_mapa(datos, datos.id_snapshot, 'Confirmed'), use_container_width=True)
+
+# --- Desglose por Provincia y Condado ---
+# Encabezado para la sección de desglose geográfico.
+st.header("Desglose por Provincia y Condado")
+# Crea dos columnas para los selectores de país y provincia.
+col_pais, col_provincia = st.columns(2)
+# Selector del país a desglosar, con EE.UU. por defecto (es el que tiene más detalle por condado).
+pais_desglose = col_pais.selectbox("País a desglosar:", options=datos.opciones_paises, index=datos.indice_opcion('US'))
+# Las provincias del país salen del cubo jerárquico (un corte de la tabla ya agregada, sin groupby).
+df_provincias = datos.jerarquia.desglose(pais_desglose)
+# Selector de provincia; '(Todas)' muestra el nivel de provincias del país.
+provincia_desglose = col_provincia.selectbox("Provincia / Estado:", options=['(Todas)'] + list(df_provincias['Province_State']))
+
+# Elige el nivel a mostrar: provincias del país o condados de la provincia elegida.
+if provincia_desglose == '(Todas)':
+    df_desglose, nivel_desglose = df_provincias, 'Province_State'
+else:
+    df_desglose, nivel_desglose = datos.jerarquia.desglose(pais_desglose, provincia_desglose), 'Admin2'
+
+
+# Mapa de provincias sobre la geometría local ya simplificada (mapas.py), una figura por instantánea,
+# conjunto de geometría, nivel de detalle, país y métrica.
+@instrumentar_cache(cache_acotada())
+def figura_mapa_provincias(_df_provincias, id_snapshot, nombre_geo, detalle, pais, metrica):
+    return figura_provincias(_df_provincias, cargar_geojson(nombre_geo, detalle), metrica, f"Casos {metrica} en {pais}")
+
+
+# Busca un GeoJSON local de provincias que cubra el país elegido (solo si se preparó con mapas.py).
+nombre_geo = None
+if provincia_desglose == '(Todas)':
+    nombre_geo = next((n for n in geojson_disponibles() if pais_desglose in paises_geojson(cargar_geojson(n, 'bajo'))), None)
+
+if nombre_geo is not None:
+    # Con geometría local: coropletas de provincias con selector de nivel de detalle (menos detalle = figura más liviana).
+    detalle_mapa = st.select_slider("Nivel de detalle del mapa:", options=list(NIVELES_DETALLE), value='medio')
+    with medir('desglose'):
+        fig_desglose = figura_mapa_provincias(df_desglose, datos.id_snapshot, nombre_geo, detalle_mapa, pais_desglose, 'Confirmed')
+else:
+    # Sin geometría: un mapa de puntos, cada provincia o condado en su centroide, con tamaño según los casos confirmados.
+    with medir('desglose'):
+        fig_desglose = px.scatter_geo(
+            df_desglose.dropna(subset=['Lat', 'Long_']),
+            lat='Lat',                         # Latitud del centroide.
+            lon='Long_',                       # Longitud del centroide.
+            size='Confirmed',                  # El tamaño del punto depende de los casos confirmados.
+            color='CFR',                       # El color muestra la tasa de mortalidad.
+            hover_name=nivel_desglose,         # Nombre de la provincia o condado al pasar el cursor.
+            title=f"Casos Confirmados en {pais_desglose}" + ("" if provincia_desglose == '(Todas)' else f" - {provincia_desglose}")
+        )
+# Muestra el mapa y la tabla del desglose.
+st.plotly_chart(fig_desglose, use_container_width=True)
+st.dataframe(df_desglose)
 
-# Llama a la función para convertir el DataFrame filtrado por el usuario.
-csv = convert_df_to_csv(df_filtered_sidebar)
-# Crea un botón de descarga en la barra lateral.
-st.sidebar.download_button(
-    label="Descargar datos filtrados en CSV", # Texto que aparece en el botón.
-    data=csv,                                 # Los datos (en bytes) que se descargarán.
-    file_name='covid_data_filtrada.csv',      # Nombre del archivo que se descargará.
-    mime='text/csv',                          # El tipo de archivo (MIME type).
-)
+# --- 5.4: Exportación de Datos ---
+# Encabezado en la barra lateral para la sección de descarga.
+st.sidebar.header("Exportación de Datos")
+# Qué exportar: la tabla filtrada por país, las filas crudas (provincias y condados) de los países
+# seleccionados o un rango de las series temporales del cubo.
+fuente_export = st.sidebar.radio("Datos a exportar:", options=['Tabla filtrada por país', 'Provincias de los países seleccionados', 'Series temporales'])
+# Formato del archivo (Parquet y XLSX solo si su librería está instalada).
+formato_export = st.sidebar.selectbox("Formato:", options=formatos_disponibles())
+
+if fuente_export == 'Series temporales':
+    cubo = load_cubo()
+    if cubo.paises:
+        # Rango de fechas a exportar; por defecto, el archivo completo.
+        primera, ultima = pd.Timestamp(cubo.fechas[0]).date(), pd.Timestamp(cubo.fechas[-1]).date()
+        rango_export = st.sidebar.date_input("Rango de fechas:", value=(primera, ultima), min_value=primera, max_value=ultima)
+        # Mientras se elige el rango, el widget devuelve solo la fecha inicial.
+        desde_export, hasta_export = rango_export if len(rango_export) == 2 else (rango_export[0], ultima)
+        # Países seleccionados arriba; sin selección se exporta el archivo de todos los países.
+        generar_bloques = lambda: bloques_series(cubo, selected_countries or None, desde_export, hasta_export)
+        base_export = f'covid_series_{desde_export:%Y%m%d}_{hasta_export:%Y%m%d}'
+        # La misma exportación como ruta de la API (fuente, países y filtros).
+        consulta_api = ('series', selected_countries, {'desde': desde_export, 'hasta': hasta_export})
+    else:
+        generar_bloques = None
+        st.sidebar.info("No hay series temporales: ejecuta `python app/ingesta.py`.")
+elif fuente_export == 'Provincias de los países seleccionados':
+    generar_bloques = lambda: bloques_provincias(datos, selected_countries)
+    base_export = 'covid_provincias'
+    consulta_api = ('provincias', selected_countries, {})
+else:
+    # La tabla filtrada ya está calculada (unas pocas filas por país): un solo bloque.
+    generar_bloques = lambda: en_bloques(df_filtered_sidebar)
+    base_export = 'covid_data_filtrada'
+    consulta_api = ('paises', selected_countries, {'metrica': 'Confirmed', 'umbral': confirmed_threshold})
+
+if generar_bloques is not None and URL_API:
+    # Con la API configurada, el botón enlaza a su ruta /exportar: el archivo se genera y se envía
+    # por bloques, sin tenerlo entero en memoria ni en el dashboard ni en la API.
+    fuente_api, paises_api, filtros_api = consulta_api
+    st.sidebar.link_button(f"Descargar en {formato_export.upper()}",
+                           url_exportacion(fuente_api, formato_export, paises_api, **filtros_api))
+elif generar_bloques is not None:
+    # Sin API, un botón de descarga de Streamlit. El archivo no se genera en cada rerun: Streamlit
+    # llama a la función solo al hacer clic, y esta lo escribe por bloques en un archivo temporal;
+    # al enviarlo, Streamlit lo lee entero en memoria (tanta como el tamaño del archivo).
+    st.sidebar.download_button(
+        label=f"Descargar en {formato_export.upper()}",         # Texto que aparece en el botón.
+        data=lambda: a_archivo(generar_bloques(), formato_export),  # Se ejecuta solo al hacer clic.
+        file_name=nombre_archivo(base_export, formato_export),  # Nombre del archivo que se descargará.
+        mime=FORMATOS[formato_export][1],                       # El tipo de archivo (MIME type).
+        on_click='ignore',                                      # Descargar no vuelve a ejecutar la página.
+    )
+
+# Cierra el registro de tiempos del rerun y muestra el panel de depuración (si está activo).
+panel_depuracion()
@@ -0,0 +1,80 @@
+# Actualización diaria incremental: publica un reporte nuevo de JHU sin recalcular el archivo.
+# Con el CSV del día:
+#   1. se crea su instantánea columnar (solo ese archivo) y su conjunto de datos indexado, con lo
+#      que los agregados por país, provincia y condado salen de las filas de ese día;
+#   2. se precalculan sus artefactos (describe, CFR, clustering), con el K-means iniciado en los
+#      centroides del día anterior;
+#   3. se prepara una versión nueva del cubo país × fecha con su columna (sin publicarla), el
+#      detector de anomalías procesa solo ese día a partir de su estado guardado y se reconstruyen
+#      los índices de trayectorias similares de esa versión;
+#   4. al final se mueve el puntero 'actual' a la nueva instantánea y a la nueva versión del cubo
+#      en una sola escritura atómica.
+# Hasta el paso 4 el dashboard y la API siguen sirviendo la instantánea y el cubo anteriores.
+#
+# Uso: python app/actualizacion.py data/raw/04-19-2022.csv [--procesos N]
+import time
+from pathlib import Path
+
+from almacen import PUNTERO_ACTUAL, ingerir_reporte, leer_snapshot, publicar_puntero, snapshot_vigente
+from anomalias import detectar_anomalias
+from artefactos import DIRECTORIO_ARTEFACTOS, escribir_artefactos, leer_artefacto
+from ingesta import DIRECTORIO_CUBO, actualizar_cubo, anexar_reporte, publicar_version
+from modelo_datos import DatosCovid
+from precalculo import calcular_artefactos
+from similitud import construir_indices, poblaciones
+
+# Métricas cuyas anomalías se vigilan (las mismas que ofrece la página de calidad).
+METRICAS_ANOMALIAS = ['Deaths', 'Confirmed']
+
+
+def publicar_dia(ruta_csv, directorio_cubo=DIRECTORIO_CUBO, raiz_artefactos=DIRECTORIO_ARTEFACTOS, procesos=1):
+    # Publica el reporte de un día y devuelve el tiempo de cada paso (en segundos) y la instantánea.
+    ruta = Path(ruta_csv)
+    tiempos = {}
+
+    def paso(nombre, funcion, *args):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        tiempos[nombre] = round(time.perf_counter() - inicio, 3)
+        return resultado
+
+    # 1. Instantánea y agregados del día (el puntero de su fecha se publica, pero no el 'actual').
+    destino = paso('instantanea', ingerir_reporte, ruta.stem, ruta.read_bytes())
+    datos = paso('agregados', lambda: DatosCovid(leer_snapshot(destino)))
+
+    # 2. Artefactos del día, partiendo de los del día que se sirve ahora.
+    previo = snapshot_vigente(PUNTERO_ACTUAL)
+    anteriores = {'clustering': leer_artefacto(previo.name, 'clustering', raiz_artefactos)} if previo else None
+    paso('artefactos', lambda: escribir_artefactos(datos.id_snapshot, calcular_artefactos(datos, procesos, anteriores), raiz_artefactos))
+
+    # 3. Cubo preparado y anomalías: si el día no se puede anexar (fecha intermedia, país nuevo o
+    #    sin columnas reservadas), se cae a la ingesta completa de su directorio.
+    cubo = paso('cubo', anexar_reporte, ruta, directorio_cubo, False)
+    if cubo is None:
+        cubo = paso('cubo_completo', actualizar_cubo, ruta.parent, directorio_cubo, procesos, False)
+    for metrica in METRICAS_ANOMALIAS:
+        paso(f'anomalias_{metrica}', detectar_anomalias, cubo, metrica)
+    paso('similitud', lambda: construir_indices(directorio_cubo, poblaciones(datos.raw), cubo.version,
+                                                destino.name, procesos=procesos))
+
+    # 4. Cambio atómico de la instantánea y del cubo servidos. Después meta.json pasa a la versión
+    #    nueva para que la próxima ingesta parta de ella.
+    paso('publicar', lambda: publicar_puntero(PUNTERO_ACTUAL, destino.name, cubo=cubo.version))
+    publicar_version(cubo.version, directorio_cubo)
+    return {'snapshot': destino.name, 'tiempos': tiempos}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Publica el reporte diario de un día nuevo de forma incremental.')
+    parser.add_argument('csv', help='Reporte diario MM-DD-YYYY.csv del día a publicar.')
+    parser.add_argument('--cubo-dir', default=str(DIRECTORIO_CUBO))
+    parser.add_argument('--artefactos', default=str(DIRECTORIO_ARTEFACTOS))
+    parser.add_argument('--procesos', type=int, default=1, help='Procesos para el clustering y la ingesta completa.')
+    args = parser.parse_args()
+
+    resultado = publicar_dia(args.csv, args.cubo_dir, args.artefactos, args.procesos)
+    print(f"Publicada {resultado['snapshot']}")
+    for nombre, segundos in resultado['tiempos'].items():
+        print(f'  {nombre:<22} {segundos:>8.3f} s')
@@ -0,0 +1,196 @@
+# Almacén local de instantáneas (snapshots) columnares del reporte diario de JHU.
+# La primera vez que se pide una fecha, el CSV se lee (desde disco o desde GitHub),
+# se tipa y se guarda como un conjunto de arrays de NumPy (.npy), uno por columna.
+# A partir de ahí, cualquier proceso nuevo lee esos arrays con mmap, sin red y sin parsear texto.
+import hashlib  # Para calcular el hash del contenido del CSV.
+import io       # Para leer el CSV desde bytes en memoria.
+import json     # Para el manifiesto de cada snapshot.
+import os       # Para variables de entorno y reemplazos atómicos de archivos.
+import shutil   # Para limpiar directorios temporales.
+import urllib.request  # Para descargar el CSV cuando no existe una copia local.
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# URL base de los reportes diarios de la Universidad Johns Hopkins.
+URL_BASE = 'https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_daily_reports/'
+# Fecha del reporte que usa el dashboard (formato MM-DD-YYYY, igual que los archivos de JHU).
+FECHA_POR_DEFECTO = '04-18-2022'
+
+# Directorio raíz de datos. Se puede cambiar con la variable de entorno COVID_DATA_DIR.
+DIRECTORIO_DATOS = Path(os.environ.get('COVID_DATA_DIR', Path(__file__).resolve().parent.parent / 'data'))
+# Aquí se buscan los CSV locales (copias descargadas o archivos dejados a mano para trabajar sin red).
+DIRECTORIO_CSV = DIRECTORIO_DATOS / 'raw'
+# Aquí se guardan las instantáneas columnares.
+DIRECTORIO_SNAPSHOTS = DIRECTORIO_DATOS / 'snapshots'
+
+# Versión del formato en disco; si cambia, las instantáneas antiguas se ignoran.
+VERSION_FORMATO = 1
+# Puntero a la instantánea que sirven el dashboard y la API; lo mueve la actualización diaria
+# (app/actualizacion.py) cuando el nuevo día ya está listo.
+PUNTERO_ACTUAL = 'actual'
+
+
+def ruta_csv_local(fecha):
+    # Devuelve la ruta donde se espera (o se guarda) el CSV crudo de una fecha.
+    return DIRECTORIO_CSV / f'{fecha}.csv'
+
+
+def hash_contenido(contenido):
+    # Hash corto del contenido en bytes; identifica la versión exacta del reporte.
+    return hashlib.sha256(contenido).hexdigest()[:16]
+
+
+def leer_bytes_fuente(fecha):
+    # Primero intenta el CSV local (modo sin conexión).
+    ruta = ruta_csv_local(fecha)
+    if ruta.exists():
+        return ruta.read_bytes()
+    # Si no existe, lo descarga de GitHub y deja una copia local para la próxima vez.
+    with urllib.request.urlopen(URL_BASE + f'{fecha}.csv', timeout=30) as respuesta:
+        contenido = respuesta.read()
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.write_bytes(contenido)
+    return contenido
+
+
+def normalizar_reporte(df):
+    # Limpieza básica común a todas las páginas.
+    # Renombra la columna 'Case_Fatality_Ratio' a 'CFR' para que sea más corta y fácil de usar.
+    df = df.rename(columns={'Case_Fatality_Ratio': 'CFR'})
+    # Convierte la columna 'CFR' a numérico; lo que no se pueda convertir queda como NaN.
+    if 'CFR' in df.columns:
+        df['CFR'] = pd.to_numeric(df['CFR'], errors='coerce')
+    return df
+
+
+def guardar_snapshot(df, fecha, hash_csv):
+    # Guarda el DataFrame tipado como un directorio con un .npy por columna y un manifiesto JSON.
+    nombre = f'{fecha}-{hash_csv}'
+    destino = DIRECTORIO_SNAPSHOTS / nombre
+    if not (destino / 'manifiesto.json').exists():
+        # Se escribe primero en un directorio temporal y luego se renombra, para que un lector
+        # nunca vea una instantánea a medio escribir.
+        temporal = DIRECTORIO_SNAPSHOTS / f'.{nombre}.tmp-{os.getpid()}'
+        shutil.rmtree(temporal, ignore_errors=True)
+        temporal.mkdir(parents=True)
+        columnas = []
+        for i, columna in enumerate(df.columns):
+            serie = df[columna]
+            archivo = f'col{i:03d}.npy'
+            if pd.api.types.is_numeric_dtype(serie) and not isinstance(serie.dtype, pd.CategoricalDtype):
+                # Columnas numéricas: se guardan tal cual, con su dtype.
+                np.save(temporal / archivo, serie.to_numpy())
+                columnas.append({'nombre': columna, 'tipo': 'numerico', 'archivo': archivo})
+            else:
+                # Columnas de texto: se guardan como códigos enteros + lista de categorías (-1 = nulo).
+                codigos, categorias = pd.factorize(serie, sort=True)
+                np.save(temporal / archivo, codigos.astype(np.int32))
+                columnas.append({'nombre': columna, 'tipo': 'categorico', 'archivo': archivo,
+                                 'categorias': [str(c) for c in categorias]})
+        manifiesto = {'version': VERSION_FORMATO, 'fecha': fecha, 'hash': hash_csv,
+                      'filas': int(len(df)), 'columnas': columnas}
+        (temporal / 'manifiesto.json').write_text(json.dumps(manifiesto, ensure_ascii=False))
+        try:
+            os.replace(temporal, destino)
+        except OSError:
+            # Otro proceso la escribió primero; su copia es equivalente (mismo hash).
+            shutil.rmtree(temporal, ignore_errors=True)
+    # Actualiza el puntero de la fecha a esta instantánea (reemplazo atómico).
+    publicar_puntero(fecha, nombre)
+    return destino
+
+
+def publicar_puntero(fecha, nombre, **extra):
+    # El puntero '<fecha>.json' indica qué instantánea está vigente para esa fecha. Los campos extra
+    # (p. ej. la versión del cubo) se publican con ella en la misma escritura atómica.
+    puntero = DIRECTORIO_SNAPSHOTS / f'{fecha}.json'
+    temporal = puntero.with_suffix(f'.json.tmp-{os.getpid()}')
+    temporal.write_text(json.dumps({'snapshot': nombre, **extra}))
+    os.replace(temporal, puntero)
+
+
+def leer_puntero(fecha):
+    # Contenido del puntero '<fecha>.json', o None si no existe.
+    puntero = DIRECTORIO_SNAPSHOTS / f'{fecha}.json'
+    return json.loads(puntero.read_text()) if puntero.exists() else None
+
+
+def snapshot_vigente(fecha):
+    # Devuelve el directorio de la instantánea vigente para la fecha, o None si no hay.
+    puntero = DIRECTORIO_SNAPSHOTS / f'{fecha}.json'
+    if not puntero.exists():
+        return None
+    destino = DIRECTORIO_SNAPSHOTS / json.loads(puntero.read_text())['snapshot']
+    manifiesto = destino / 'manifiesto.json'
+    if not manifiesto.exists() or json.loads(manifiesto.read_text()).get('version') != VERSION_FORMATO:
+        return None
+    return destino
+
+
+def snapshots_publicados():
+    # Nombres de las instantáneas a las que apunta algún puntero (las vigentes de cada fecha).
+    publicados = set()
+    for puntero in DIRECTORIO_SNAPSHOTS.glob('*.json'):
+        try:
+            publicados.add(json.loads(puntero.read_text())['snapshot'])
+        except (OSError, ValueError, KeyError):
+            # Un puntero a medio escribir o borrado entre el glob y la lectura se ignora.
+            continue
+    return publicados
+
+
+def leer_snapshot(destino):
+    # Reconstruye el DataFrame a partir de los arrays mapeados en memoria (mmap).
+    manifiesto = json.loads((Path(destino) / 'manifiesto.json').read_text())
+    datos = {}
+    for columna in manifiesto['columnas']:
+        valores = np.load(Path(destino) / columna['archivo'], mmap_mode='r')
+        if columna['tipo'] == 'categorico':
+            # Los textos vuelven como columna categórica (menos memoria que objetos de Python).
+            datos[columna['nombre']] = pd.Categorical.from_codes(np.asarray(valores), categories=columna['categorias'])
+        else:
+            datos[columna['nombre']] = valores
+    df = pd.DataFrame(datos)
+    # Guarda el nombre de la instantánea (fecha-hash): identifica la versión exacta de los datos.
+    df.attrs['snapshot'] = Path(destino).name
+    return df
+
+
+def ingerir_reporte(fecha, contenido=None):
+    # Convierte el CSV de una fecha en instantánea columnar y devuelve su directorio.
+    if contenido is None:
+        contenido = leer_bytes_fuente(fecha)
+    df = normalizar_reporte(pd.read_csv(io.BytesIO(contenido)))
+    return guardar_snapshot(df, fecha, hash_contenido(contenido))
+
+
+def snapshot_servido():
+    # Instantánea que deben mostrar las páginas: la del último día publicado o, si nunca se publicó
+    # ninguno, la de FECHA_POR_DEFECTO (que se ingiere la primera vez, como en cargar_reporte).
+    destino = snapshot_vigente(PUNTERO_ACTUAL) or snapshot_vigente(FECHA_POR_DEFECTO)
+    return destino if destino is not None else ingerir_reporte(FECHA_POR_DEFECTO)
+
+
+def cargar_reporte(fecha=FECHA_POR_DEFECTO):
+    # Punto de entrada para la aplicación: devuelve el reporte crudo ya tipado.
+    # Si la instantánea existe, es una lectura local por mmap; si no, se ingiere una vez.
+    destino = snapshot_vigente(fecha)
+    if destino is None:
+        destino = ingerir_reporte(fecha)
+    return leer_snapshot(destino)
+
+
+if __name__ == '__main__':
+    # Uso: python app/almacen.py [--fecha MM-DD-YYYY] [--csv ruta/al/archivo.csv]
+    # Permite crear la instantánea a partir de un CSV local, sin necesidad de red.
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Crea la instantánea columnar de un reporte diario de JHU.')
+    parser.add_argument('--fecha', default=FECHA_POR_DEFECTO, help='Fecha del reporte (MM-DD-YYYY).')
+    parser.add_argument('--csv', help='Ruta a un CSV local; si se omite se usa data/raw o GitHub.')
+    args = parser.parse_args()
+
+    contenido = Path(args.csv).read_bytes() if args.csv else None
+    print(ingerir_reporte(args.fecha, contenido))
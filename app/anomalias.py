@@ -0,0 +1,294 @@
+# Detector de anomalías en flujo sobre las series diarias de todos los países.
+# Mantiene, para cada país, una ventana móvil con media y varianza actualizadas en O(1) por día
+# (Welford con ventana deslizante), una EWMA y un CUSUM. Cada día nuevo se procesa para todos los
+# países a la vez con operaciones de NumPy, y el estado se guarda en disco para que añadir un día
+# no obligue a recalcular la historia. Con el estado se guarda una firma por fecha y la firma de
+# cada CSV del que salió el cubo: si un reporte histórico se corrige, el detector se reanuda desde
+# esa fecha y no desde la última, sin volver a leer todo el archivo histórico en cada publicación.
+# Cada guardado es una versión inmutable (versiones/estado-<ns>/ con estado.npz y meta.json) que se
+# publica moviendo un único puntero, actual.json, como las versiones del cubo en ingesta.py.
+import hashlib
+import json
+import os
+import shutil
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+from almacen import DIRECTORIO_DATOS
+from ingesta import escribir_json, fecha_de_archivo
+
+# Directorio donde se guarda el estado del detector (uno por métrica).
+DIRECTORIO_ANOMALIAS = DIRECTORIO_DATOS / 'anomalias'
+# Versiones del estado que se conservan (la publicada y las anteriores, por si un lector aún las usa).
+ESTADOS_CONSERVADOS = 2
+
+# Tamaño de la ventana móvil (días), número de desviaciones estándar de los límites de control,
+# factor de suavizado de la EWMA y parámetros del CUSUM (holgura k y umbral h, en desviaciones).
+VENTANA = 7
+SIGMAS = 3.0
+LAMBDA_EWMA = 0.3
+CUSUM_K = 0.5
+CUSUM_H = 5.0
+
+# Series de salida por día (una matriz país × fecha para cada una).
+# El CUSUM de cada día (tras el reinicio por alerta) permite reanudar el detector desde el historial.
+SALIDAS = ['valor', 'media', 'limite_superior', 'limite_inferior', 'ewma',
+           'alerta_sigma', 'alerta_ewma', 'alerta_cusum', 'cusum_pos', 'cusum_neg']
+
+
+class DetectorAnomalias:
+    # Estado del detector para n países. Todos los arrays tienen una entrada por país.
+
+    def __init__(self, n_paises, ventana=VENTANA):
+        self.ventana = ventana
+        self.buffer = np.zeros((n_paises, ventana))   # Últimos 'ventana' valores (buffer circular).
+        self.vistos = np.zeros(n_paises, dtype=np.int64)  # Días procesados por país.
+        self.media = np.zeros(n_paises)
+        self.m2 = np.zeros(n_paises)                  # Suma de cuadrados de desviaciones (Welford).
+        self.ewma = np.full(n_paises, np.nan)
+        self.cusum_pos = np.zeros(n_paises)
+        self.cusum_neg = np.zeros(n_paises)
+
+    def ampliar(self, n_paises):
+        # Añade países nuevos (sin historia) al final del estado.
+        extra = n_paises - len(self.vistos)
+        if extra <= 0:
+            return
+        self.buffer = np.vstack([self.buffer, np.zeros((extra, self.ventana))])
+        self.vistos = np.concatenate([self.vistos, np.zeros(extra, dtype=np.int64)])
+        for nombre in ['media', 'm2', 'cusum_pos', 'cusum_neg']:
+            setattr(self, nombre, np.concatenate([getattr(self, nombre), np.zeros(extra)]))
+        self.ewma = np.concatenate([self.ewma, np.full(extra, np.nan)])
+
+    def actualizar(self, x):
+        # Procesa un día (vector con un valor por país) y devuelve las salidas de ese día.
+        # Los límites se calculan con la ventana anterior, antes de incluir el valor nuevo.
+        x = np.asarray(x, dtype=np.float64)
+        llena = np.minimum(self.vistos, self.ventana) == self.ventana
+        with np.errstate(invalid='ignore', divide='ignore'):
+            desviacion = np.sqrt(np.clip(self.m2, 0, None) / (np.minimum(self.vistos, self.ventana) - 1))
+        media = np.where(llena, self.media, np.nan)
+        desviacion = np.where(llena, desviacion, np.nan)
+        superior = media + SIGMAS * desviacion
+        inferior = media - SIGMAS * desviacion
+
+        # Gráfico de Shewhart: fuera de media ± 3 desviaciones.
+        alerta_sigma = llena & ((x > superior) | (x < inferior))
+
+        # EWMA: fuera de media ± L·σ·sqrt(λ / (2 - λ)).
+        ewma = np.where(np.isnan(self.ewma), x, LAMBDA_EWMA * x + (1 - LAMBDA_EWMA) * self.ewma)
+        margen_ewma = SIGMAS * desviacion * np.sqrt(LAMBDA_EWMA / (2 - LAMBDA_EWMA))
+        alerta_ewma = llena & (np.abs(ewma - media) > margen_ewma)
+
+        # CUSUM sobre el valor estandarizado; se reinicia al dar la alerta.
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = np.where(llena & (desviacion > 0), (x - media) / desviacion, 0.0)
+        self.cusum_pos = np.maximum(0.0, self.cusum_pos + z - CUSUM_K)
+        self.cusum_neg = np.maximum(0.0, self.cusum_neg - z - CUSUM_K)
+        alerta_cusum = (self.cusum_pos > CUSUM_H) | (self.cusum_neg > CUSUM_H)
+        self.cusum_pos[alerta_cusum] = 0.0
+        self.cusum_neg[alerta_cusum] = 0.0
+        self.ewma = ewma
+
+        # Welford con ventana deslizante: O(1) por país.
+        posicion = self.vistos % self.ventana
+        filas = np.arange(len(x))
+        saliente = self.buffer[filas, posicion]
+        # Mientras la ventana se llena, se añade el valor (Welford clásico).
+        n = np.minimum(self.vistos + 1, self.ventana)
+        delta = x - self.media
+        media_llenando = self.media + delta / n
+        m2_llenando = self.m2 + delta * (x - media_llenando)
+        # Con la ventana llena, el valor nuevo reemplaza al más antiguo.
+        media_llena = self.media + (x - saliente) / self.ventana
+        m2_llena = self.m2 + (x - saliente) * (x - media_llena + saliente - self.media)
+        self.media = np.where(llena, media_llena, media_llenando)
+        self.m2 = np.where(llena, m2_llena, m2_llenando)
+        self.buffer[filas, posicion] = x
+        self.vistos += 1
+
+        return {'valor': x, 'media': media, 'limite_superior': superior, 'limite_inferior': inferior,
+                'ewma': ewma, 'alerta_sigma': alerta_sigma, 'alerta_ewma': alerta_ewma, 'alerta_cusum': alerta_cusum,
+                'cusum_pos': self.cusum_pos.copy(), 'cusum_neg': self.cusum_neg.copy()}
+
+    def procesar(self, matriz):
+        # Procesa varios días (matriz país × día) y devuelve una matriz por salida.
+        dias = [self.actualizar(matriz[:, j]) for j in range(matriz.shape[1])]
+        if not dias:
+            return {s: np.zeros((matriz.shape[0], 0), dtype=bool if s.startswith('alerta') else np.float64) for s in SALIDAS}
+        return {s: np.stack([d[s] for d in dias], axis=1) for s in SALIDAS}
+
+    def estado(self):
+        return {'buffer': self.buffer, 'vistos': self.vistos, 'media': self.media, 'm2': self.m2,
+                'ewma': self.ewma, 'cusum_pos': self.cusum_pos, 'cusum_neg': self.cusum_neg}
+
+    @classmethod
+    def desde_estado(cls, estado):
+        detector = cls(len(estado['vistos']), estado['buffer'].shape[1])
+        for nombre, valor in estado.items():
+            setattr(detector, nombre, np.array(valor))
+        return detector
+
+    @classmethod
+    def desde_historial(cls, historial, ventana=VENTANA):
+        # Estado del detector justo después del último día del historial, para reanudar desde una
+        # fecha intermedia. Los días vistos son los valores no NaN (un país añadido más tarde tiene
+        # NaN al principio), la ventana son sus últimos valores y la EWMA y el CUSUM, los del último día.
+        valor = historial['valor']
+        detector = cls(valor.shape[0], ventana)
+        if not valor.shape[1]:
+            return detector
+        detector.vistos = np.isfinite(valor).sum(axis=1)
+        # Últimos 'ventana' días (NaN donde el país aún no tenía historia).
+        ultimos = np.full((valor.shape[0], ventana), np.nan)
+        tramo = valor[:, -ventana:]
+        ultimos[:, ventana - tramo.shape[1]:] = tramo
+        with np.errstate(invalid='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            detector.media = np.nan_to_num(np.nanmean(ultimos, axis=1))
+        detector.m2 = np.nansum((ultimos - detector.media[:, None]) ** 2, axis=1)
+        # El k-ésimo valor más reciente ocupa la posición (vistos - k) del buffer circular.
+        filas = np.arange(valor.shape[0])
+        for k in range(1, ventana + 1):
+            detector.buffer[filas, (detector.vistos - k) % ventana] = np.nan_to_num(ultimos[:, ventana - k])
+        detector.ewma = historial['ewma'][:, -1].astype(np.float64)
+        detector.cusum_pos = np.nan_to_num(historial['cusum_pos'][:, -1].astype(np.float64))
+        detector.cusum_neg = np.nan_to_num(historial['cusum_neg'][:, -1].astype(np.float64))
+        return detector
+
+
+def firmas_fechas(cubo, metrica, desde=0):
+    # Firma de cada fecha del cubo desde la columna 'desde': hash de los países con reporte ese día
+    # y de sus valores.
+    firmas = []
+    for columna in range(desde, len(cubo.fechas)):
+        filas = np.flatnonzero(cubo.presente[:, columna])
+        h = hashlib.sha1(filas.astype(np.int64).tobytes())
+        h.update(np.asarray(cubo.metricas[metrica][filas, columna], dtype=np.int64).tobytes())
+        firmas.append(h.hexdigest()[:16])
+    return firmas
+
+
+def version_estado(directorio):
+    # Versión publicada del estado ('estado-<ns>'), o None si no hay ninguna.
+    puntero = Path(directorio) / 'actual.json'
+    return json.loads(puntero.read_text())['version'] if puntero.exists() else None
+
+
+def podar_estados(directorio, conservar=ESTADOS_CONSERVADOS):
+    # Borra las versiones más antiguas, los temporales abandonados y los archivos del formato
+    # anterior (estado.npz y meta.json sueltos, que ya no se leen).
+    versiones = sorted((directorio / 'versiones').glob('estado-*'), key=lambda r: int(r.name.rsplit('-', 1)[1]))
+    for ruta in versiones[:-conservar]:
+        shutil.rmtree(ruta, ignore_errors=True)
+    for ruta in (directorio / 'versiones').glob('.estado-*'):
+        shutil.rmtree(ruta, ignore_errors=True)
+    for ruta in (directorio / 'estado.npz', directorio / 'meta.json'):
+        ruta.unlink(missing_ok=True)
+
+
+def guardar(directorio, paises, fechas, detector, historial, firmas, procesados=None):
+    # Escribe estado e historial (.npz) y países, fechas, firmas y archivos del cubo (JSON) en una versión nueva y la
+    # publica con un solo reemplazo atómico del puntero: los dos archivos cambian juntos o no cambian.
+    directorio = Path(directorio)
+    (directorio / 'versiones').mkdir(parents=True, exist_ok=True)
+    anterior = version_estado(directorio)
+    version = f"estado-{max(time.time_ns(), int(anterior.rsplit('-', 1)[1]) + 1 if anterior else 0)}"
+    # Se arma en un directorio oculto y se renombra entero (el renombrado también es atómico).
+    temporal = directorio / 'versiones' / f'.{version}.tmp-{os.getpid()}'
+    temporal.mkdir()
+    np.savez(temporal / 'estado.npz', **{f'estado_{k}': v for k, v in detector.estado().items()},
+             **{f'historial_{k}': v for k, v in historial.items()})
+    (temporal / 'meta.json').write_text(json.dumps({'paises': list(paises), 'fechas': [str(f) for f in fechas],
+                                                    'firmas': firmas, 'procesados': procesados}, ensure_ascii=False))
+    os.rename(temporal, directorio / 'versiones' / version)
+    escribir_json(directorio / 'actual.json', {'version': version})
+    podar_estados(directorio)
+
+
+def cargar(directorio):
+    # Devuelve (paises, fechas, detector, historial, firmas, procesados) de la versión publicada, o None si no
+    # hay estado guardado (el formato anterior, sin puntero, cuenta como sin estado).
+    version = version_estado(directorio)
+    if version is None:
+        return None
+    directorio = Path(directorio) / 'versiones' / version
+    meta = json.loads((directorio / 'meta.json').read_text())
+    with np.load(directorio / 'estado.npz') as archivo:
+        estado = {k[len('estado_'):]: archivo[k] for k in archivo.files if k.startswith('estado_')}
+        historial = {k[len('historial_'):]: archivo[k] for k in archivo.files if k.startswith('historial_')}
+    return (meta['paises'], np.array(meta['fechas'], dtype='datetime64[D]'), DetectorAnomalias.desde_estado(estado),
+            historial, meta.get('firmas'), meta.get('procesados'))
+
+
+def columnas_cambiadas(cubo, procesados):
+    # Primera columna del cubo cuyo CSV no coincide con 'procesados' (archivo → firma del estado
+    # guardado): archivos nuevos, reescritos o que ya no están. None si no hay ninguno.
+    distintos = (set(procesados) ^ set(cubo.procesados)) | {a for a in procesados.keys() & cubo.procesados.keys()
+                                                            if procesados[a] != cubo.procesados[a]}
+    fechas = [f for f in map(fecha_de_archivo, distintos) if f is not None]
+    return int(np.searchsorted(cubo.fechas, min(fechas))) if fechas else None
+
+
+def primera_fecha_cambiada(guardado, cubo, metrica):
+    # Devuelve (inicio, firmas): la primera columna del cubo que no coincide con el estado guardado
+    # (fecha o firma distinta, o fecha nueva; 0 si el estado no sirve: otros países o sin firmas) y
+    # las firmas de todas las fechas del cubo. Las firmas solo se recalculan desde la última fecha
+    # guardada, o desde el primer CSV que cambió según las firmas de archivo de ingesta.py; las
+    # anteriores se toman del estado. Un cubo sin esa información (armado en memoria, o un estado
+    # anterior) compara las firmas de todas sus fechas.
+    paises, fechas, _, historial, guardadas, procesados = guardado
+    comunes = min(len(paises), len(cubo.paises))
+    if guardadas is None or set(SALIDAS) - set(historial) or list(paises[:comunes]) != cubo.paises[:comunes]:
+        return 0, firmas_fechas(cubo, metrica)
+    n = min(len(fechas), len(cubo.fechas))
+    desde = 0
+    if procesados is not None and cubo.procesados is not None:
+        cambiada = columnas_cambiadas(cubo, procesados)
+        desde = max(min(n - 1, n if cambiada is None else cambiada), 0)
+    firmas = list(guardadas[:desde]) + firmas_fechas(cubo, metrica, desde)
+    distintas = np.flatnonzero((fechas[:n] != cubo.fechas[:n]) | (np.asarray(guardadas[:n]) != np.asarray(firmas[:n])))
+    return (int(distintas[0]) if len(distintas) else n), firmas
+
+
+def detectar_anomalias(cubo, metrica='Deaths', directorio=None):
+    # Actualiza el detector con los días del cubo que aún no procesó y devuelve
+    # (paises, fechas, historial). La historia se reutiliza hasta la primera fecha nueva o corregida
+    # y solo se procesa desde ahí (un día en la actualización diaria).
+    directorio = Path(directorio) if directorio else DIRECTORIO_ANOMALIAS / metrica
+    guardado = cargar(directorio)
+    n_paises, n_fechas = len(cubo.paises), len(cubo.fechas)
+    inicio, firmas = (0, firmas_fechas(cubo, metrica)) if guardado is None else primera_fecha_cambiada(guardado, cubo, metrica)
+
+    if inicio == 0:
+        # Sin estado previo (o no sirve): se procesa todo desde cero.
+        detector = DetectorAnomalias(n_paises)
+        historial = detector.procesar(cubo.nuevos_diarios(metrica))
+    else:
+        paises, fechas, detector, historial, _, _ = guardado
+        if inicio == n_fechas and len(paises) >= n_paises:
+            # Nada nuevo. Si el estado va por delante del cubo (una versión preparada por la
+            # actualización diaria que aún no se sirve), se devuelve su parte sin tocar el estado.
+            return cubo.paises, cubo.fechas, {s: h[:n_paises, :n_fechas] for s, h in historial.items()}
+        if inicio < len(fechas) or len(paises) > n_paises:
+            # Una fecha ya procesada cambió: se descarta la historia desde ella y el detector se
+            # reconstruye al final de la parte que sigue valiendo.
+            historial = {s: h[:n_paises, :inicio] for s, h in historial.items()}
+            detector = None
+        # Países nuevos: se añaden con historial vacío (NaN / sin alertas).
+        extra = n_paises - historial['valor'].shape[0]
+        if extra:
+            historial = {s: np.vstack([h, np.full((extra, h.shape[1]), False if h.dtype == bool else np.nan, dtype=h.dtype)])
+                         for s, h in historial.items()}
+        if detector is None:
+            detector = DetectorAnomalias.desde_historial(historial)
+        detector.ampliar(n_paises)
+        # Solo se calculan los casos nuevos de las fechas pendientes.
+        dias = detector.procesar(cubo.nuevos_diarios(metrica, desde=inicio))
+        historial = {s: np.concatenate([historial[s], dias[s]], axis=1) for s in SALIDAS}
+
+    guardar(directorio, cubo.paises, cubo.fechas, detector, historial, firmas, cubo.procesados)
+    return cubo.paises, cubo.fechas, historial
@@ -0,0 +1,357 @@
+# API HTTP de solo lectura con los mismos datos que muestra el dashboard.
+# Sirve la tabla por país, el desglose por provincia y condado, los intervalos de CFR, las etiquetas
+# de clustering y los pronósticos ya guardados, leídos del almacén compartido (instantáneas,
+# artefactos precalculados, cubo y caché de pronósticos); nunca escribe en él.
+# Cada ruta acepta filtros propios y los parámetros comunes:
+#   orden=<columna>, desc=1, limite=<n> (máx. LIMITE_MAXIMO), desplazamiento=<n>, formato=json|arrow
+# La respuesta es JSON o Arrow IPC (stream), con ETag por instantánea y consulta: un cliente que
+# repite la petición con If-None-Match recibe 304 sin cuerpo. Los cuerpos ya serializados se
+# guardan en una caché acotada (cache_acotada.py). Cada consulta devuelve primero su versión (barata)
+# y la tabla solo se construye si la respuesta no es un 304 ni está en la caché.
+# /exportar/<paises|provincias|series> descarga la fuente completa (sin paginar) en CSV, CSV.gz,
+# Parquet o XLSX, generada por bloques mientras se envía (exportacion.py); cada país va en un
+# parámetro 'pais' propio, y las series aceptan desde= y hasta= (YYYY-MM-DD).
+#
+# Uso: python app/api.py [--fecha 04-18-2022] [--host 127.0.0.1] [--port 8000] [--workers 1]
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from almacen import ingerir_reporte, leer_snapshot, snapshot_servido, snapshot_vigente
+from artefactos import leer_artefacto
+from cache_acotada import INTERVALO_VIGENCIA, CacheAcotada
+from exportacion import (FORMATOS, bloques_paises, bloques_provincias, bloques_series, flujo, formatos_disponibles,
+                         nombre_archivo)
+from ingesta import cargar_cubo, version_servida
+from modelo_datos import METRICAS_RANKING, DatosCovid
+
+# Fecha fija del reporte que se sirve; sin ella se sirve la misma instantánea que el dashboard
+# (la publicada por la actualización diaria o la de la fecha por defecto).
+FECHA = os.environ.get('COVID_FECHA')
+# Paginación: filas por página si no se indica y máximo permitido.
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+# Memoria máxima de la caché de respuestas serializadas, en MB.
+MAX_MB_RESPUESTAS = 64
+# Tipo MIME del formato de streaming de Arrow IPC.
+TIPO_ARROW = 'application/vnd.apache.arrow.stream'
+TIPO_JSON = 'application/json'
+# Nombre base del archivo descargado desde /exportar, por fuente (los mismos que en el dashboard).
+NOMBRES_EXPORTACION = {'paises': 'covid_data_filtrada', 'provincias': 'covid_provincias', 'series': 'covid_series'}
+
+
+class ErrorConsulta(Exception):
+    # Parámetro inválido (400) o recurso inexistente (404); el mensaje va en el cuerpo JSON.
+
+    def __init__(self, mensaje, estado=400):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class Almacen:
+    # Datos de la instantánea vigente y del cubo, recargados cuando cambia su versión en disco
+    # (se comprueba como mucho cada INTERVALO_VIGENCIA segundos). Las tablas derivadas (CFR,
+    # clustering) se leen de los artefactos precalculados o se calculan una vez por instantánea.
+
+    def __init__(self, fecha=FECHA):
+        self.fecha = fecha
+        self.candado = threading.Lock()
+        self.datos, self.cubo, self.version_cubo = None, None, None
+        self.revisado = -INTERVALO_VIGENCIA
+        self.derivadas = {}
+
+    def _revisar(self):
+        ahora = time.monotonic()
+        if self.datos is not None and ahora - self.revisado < INTERVALO_VIGENCIA:
+            return
+        with self.candado:
+            if self.datos is not None and ahora - self.revisado < INTERVALO_VIGENCIA:
+                return
+            destino = self._snapshot()
+            if self.datos is None or destino.name != self.datos.id_snapshot:
+                self.datos = DatosCovid(leer_snapshot(destino))
+                self.derivadas = {}
+            version = version_servida()
+            if version != self.version_cubo:
+                self.cubo, self.version_cubo = cargar_cubo(version=version), version
+            self.revisado = ahora
+
+    def _snapshot(self):
+        # Instantánea a servir: la de la fecha fija (ingerida si aún no existe) o la del dashboard.
+        if not self.fecha:
+            return snapshot_servido()
+        destino = snapshot_vigente(self.fecha)
+        if destino is None:
+            # Como cargar_reporte: la primera vez se ingiere la fecha (CSV local o descarga).
+            try:
+                destino = ingerir_reporte(self.fecha)
+            except OSError as e:
+                raise ErrorConsulta(f"No hay reporte para {self.fecha}: {e}", 404)
+        return destino
+
+    def reporte(self):
+        self._revisar()
+        return self.datos
+
+    def series(self):
+        self._revisar()
+        return self.cubo, self.version_cubo
+
+    def derivada(self, nombre, calcular):
+        datos = self.reporte()
+        clave = (datos.id_snapshot, nombre)
+        with self.candado:
+            if clave not in self.derivadas:
+                valor = leer_artefacto(datos.id_snapshot, nombre)
+                self.derivadas[clave] = valor if valor is not None else calcular(datos)
+            return self.derivadas[clave]
+
+
+def lista(parametros, nombre):
+    # Parámetro con valores separados por comas ('paises=US,Peru') → lista (vacía si no está).
+    return [v.strip() for v in parametros.get(nombre, '').split(',') if v.strip()]
+
+
+def entero(parametros, nombre, por_defecto, minimo=0, maximo=None):
+    try:
+        valor = int(parametros.get(nombre, por_defecto))
+    except ValueError:
+        raise ErrorConsulta(f"'{nombre}' debe ser un entero")
+    if valor < minimo or (maximo is not None and valor > maximo):
+        raise ErrorConsulta(f"'{nombre}' debe estar entre {minimo} y {maximo if maximo is not None else '∞'}")
+    return valor
+
+
+def metrica_umbral(parametros):
+    # Métrica del ranking y umbral mínimo de los filtros por país.
+    metrica = parametros.get('metrica', 'Confirmed')
+    if metrica not in METRICAS_RANKING:
+        raise ErrorConsulta(f"'metrica' debe ser una de {METRICAS_RANKING}")
+    try:
+        return metrica, float(parametros.get('umbral', 0))
+    except ValueError:
+        raise ErrorConsulta("'umbral' debe ser un número")
+
+
+def fecha(parametros, nombre):
+    # Fecha opcional en formato YYYY-MM-DD (None si no está).
+    valor = parametros.get(nombre)
+    try:
+        return None if valor is None else np.datetime64(valor, 'D')
+    except ValueError:
+        raise ErrorConsulta(f"'{nombre}' debe ser una fecha YYYY-MM-DD")
+
+
+def paginar(df, parametros):
+    # Orden opcional por una columna y corte [desplazamiento, desplazamiento + limite).
+    orden = parametros.get('orden')
+    if orden:
+        if orden not in df.columns:
+            raise ErrorConsulta(f"No se puede ordenar por '{orden}'")
+        df = df.sort_values(orden, ascending=parametros.get('desc', '0') in ('0', 'false'), kind='stable')
+    limite = entero(parametros, 'limite', LIMITE_POR_DEFECTO, 1, LIMITE_MAXIMO)
+    desplazamiento = entero(parametros, 'desplazamiento', 0)
+    return df.iloc[desplazamiento:desplazamiento + limite], len(df), limite, desplazamiento
+
+
+def serializar(df, formato, meta):
+    # Cuerpo de la respuesta: JSON con los metadatos y las filas, o un stream Arrow IPC
+    # (los metadatos van en el esquema y en las cabeceras).
+    if formato == 'arrow':
+        import pyarrow as pa
+
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+        tabla = tabla.replace_schema_metadata({**(tabla.schema.metadata or {}), b'covid': json.dumps(meta).encode()})
+        salida = pa.BufferOutputStream()
+        with pa.ipc.new_stream(salida, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+        return salida.getvalue().to_pybytes(), TIPO_ARROW
+    filas = df.to_json(orient='records', date_format='iso', force_ascii=False)
+    return f'{json.dumps(meta, ensure_ascii=False)[:-1]}, "filas": {filas}}}'.encode('utf-8'), TIPO_JSON
+
+
+def respuesta_error(mensaje, estado):
+    return Response(json.dumps({'error': mensaje}, ensure_ascii=False), estado, media_type=TIPO_JSON)
+
+
+def crear_app(almacen=None):
+    almacen = almacen or Almacen()
+    respuestas = CacheAcotada('respuestas_api', MAX_MB_RESPUESTAS * 2 ** 20)
+
+    def ruta(consulta):
+        # Convierte 'consulta(parametros, camino) → (version, construir)' en un endpoint con
+        # paginación, negociación de formato, ETag y caché de respuestas. La consulta solo valida los
+        # parámetros y lee la versión; construir() devuelve el DataFrame y se llama en un fallo de caché.
+        # Las funciones son síncronas: Starlette las ejecuta en su pool de hilos.
+        def endpoint(request):
+            parametros = dict(request.query_params)
+            formato = parametros.pop('formato', None) or ('arrow' if TIPO_ARROW in request.headers.get('accept', '') else 'json')
+            if formato not in ('json', 'arrow'):
+                return respuesta_error("'formato' debe ser 'json' o 'arrow'", 400)
+            try:
+                version, construir = consulta(parametros, request.path_params)
+                # La ETag identifica la versión de los datos y la representación pedida.
+                firma = json.dumps([request.url.path, sorted(parametros.items()), formato], ensure_ascii=False)
+                etag = f'"{version}.{hashlib.sha1(firma.encode()).hexdigest()[:16]}"'
+                cabeceras = {'ETag': etag, 'Cache-Control': 'public, max-age=60'}
+                if etag in request.headers.get('if-none-match', ''):
+                    return Response(status_code=304, headers=cabeceras)
+                acierto, guardado = respuestas.obtener(etag)
+                if not acierto:
+                    pagina, total, limite, desplazamiento = paginar(construir(), parametros)
+                    meta = {'version': version, 'total': total, 'limite': limite, 'desplazamiento': desplazamiento}
+                    guardado = (*serializar(pagina, formato, meta), total)
+                    # Los cuerpos ligados a una instantánea caducan con ella; los del cubo, por LRU.
+                    respuestas.guardar(etag, guardado, None if version.startswith('cubo-') else version)
+            except ErrorConsulta as e:
+                return respuesta_error(str(e), e.estado)
+            cuerpo, tipo, total = guardado
+            return Response(cuerpo, headers={**cabeceras, 'X-Total-Count': str(total)}, media_type=tipo)
+        return endpoint
+
+    def paises(parametros, _):
+        # Tabla por país, opcionalmente limitada a una lista y a un umbral mínimo de una métrica.
+        datos = almacen.reporte()
+        metrica, umbral = metrica_umbral(parametros)
+        seleccion = lista(parametros, 'paises') or datos.opciones_paises
+        return datos.id_snapshot, lambda: datos.filtrar(seleccion, metrica, umbral)
+
+    def provincias(parametros, _):
+        # Provincias de un país, o condados si también se indica la provincia.
+        datos = almacen.reporte()
+        pais, provincia = parametros.get('pais'), parametros.get('provincia')
+        if pais is None:
+            raise ErrorConsulta("Falta el parámetro 'pais'")
+        if pais not in datos.posicion:
+            raise ErrorConsulta(f"País desconocido: {pais}", 404)
+        return datos.id_snapshot, lambda: datos.jerarquia.desglose(pais, provincia)
+
+    def cfr(parametros, _):
+        # Intervalos de confianza de la CFR (Wald, Wilson y Clopper-Pearson) por país, más los
+        # intervalos por remuestreo (bootstrap y Beta-Binomial).
+        from precalculo import tabla_remuestreo_cfr, tablas_cfr
+
+        def construir():
+            intervalos = almacen.derivada('cfr', tablas_cfr)['intervalos'].join(
+                almacen.derivada('cfr_remuestreo', tabla_remuestreo_cfr))
+            seleccion = [p for p in lista(parametros, 'paises') if p in intervalos.index]
+            if seleccion:
+                intervalos = intervalos.loc[seleccion]
+            return intervalos.rename_axis('Country_Region').reset_index()
+        return almacen.reporte().id_snapshot, construir
+
+    def clusters(parametros, _):
+        # Etiqueta de K-means y primeras componentes del PCA de cada país, para un k del barrido.
+        from segmentacion import RANGO_K, RANGO_PCA, barrido_clustering
+
+        datos = almacen.reporte()
+        k = entero(parametros, 'k', 4, min(RANGO_K), max(RANGO_K))
+        n = entero(parametros, 'componentes', 2, min(RANGO_PCA), max(RANGO_PCA))
+
+        def construir():
+            barrido = almacen.derivada('clustering', lambda d: barrido_clustering(d, procesos=1))
+            tabla = pd.DataFrame(barrido['pca'][n], columns=[f'PC{i + 1}' for i in range(n)])
+            tabla.insert(0, 'Cluster', barrido['etiquetas'][k])
+            tabla.insert(0, 'Country_Region', barrido['paises'])
+            seleccion = lista(parametros, 'paises')
+            if seleccion:
+                tabla = tabla[tabla['Country_Region'].isin(seleccion)]
+            return tabla
+        return datos.id_snapshot, construir
+
+    def pronosticos(parametros, camino):
+        # Pronóstico ya guardado de un país (app/pronostico.py o la página de modelado lo calculan).
+        from pronostico import MODELOS, pronostico_guardado
+
+        cubo, version = almacen.series()
+        pais, modelo = camino['pais'], parametros.get('modelo', 'ets')
+        metrica = parametros.get('metrica', 'Confirmed')
+        if modelo not in MODELOS or metrica not in ('Confirmed', 'Deaths'):
+            raise ErrorConsulta(f"'modelo' debe ser uno de {MODELOS} y 'metrica' Confirmed o Deaths")
+        horizonte = entero(parametros, 'horizonte', 14, 1, 365)
+
+        def construir():
+            resultado = pronostico_guardado(pais, modelo, {'horizonte': horizonte}, metrica, cubo)
+            if resultado is None:
+                raise ErrorConsulta(f"No hay pronóstico guardado para {pais}; ejecuta python app/pronostico.py", 404)
+            return resultado['pronostico']
+        return version, construir
+
+    def exportar(request):
+        # Descarga completa de una fuente. Los parámetros se validan antes de responder; después, los
+        # bloques se generan y se envían uno a uno (Starlette recorre el generador en su pool de hilos),
+        # así que ni la API ni el cliente tienen el archivo entero en memoria.
+        parametros, fuente = request.query_params, request.path_params['fuente']
+        formato = parametros.get('formato', 'csv.gz')
+        try:
+            if formato not in formatos_disponibles():
+                raise ErrorConsulta(f"'formato' debe ser uno de {formatos_disponibles()}")
+            seleccion = parametros.getlist('pais')
+            if fuente == 'series':
+                cubo, _ = almacen.series()
+                bloques = bloques_series(cubo, seleccion or None, fecha(parametros, 'desde'), fecha(parametros, 'hasta'))
+            elif fuente == 'paises':
+                datos = almacen.reporte()
+                bloques = bloques_paises(datos, seleccion or datos.opciones_paises, *metrica_umbral(parametros))
+            elif fuente == 'provincias':
+                datos = almacen.reporte()
+                bloques = bloques_provincias(datos, seleccion or datos.opciones_paises)
+            else:
+                raise ErrorConsulta(f"Fuente desconocida: {fuente}", 404)
+        except ErrorConsulta as e:
+            return respuesta_error(str(e), e.estado)
+        archivo = nombre_archivo(NOMBRES_EXPORTACION[fuente], formato)
+        return StreamingResponse(flujo(bloques, formato), media_type=FORMATOS[formato][1],
+                                 headers={'Content-Disposition': f'attachment; filename="{archivo}"'})
+
+    def salud(_):
+        # Versión de los datos servidos (sin caché: sirve para comprobar que el servicio responde).
+        try:
+            datos = almacen.reporte()
+            cubo, version_cubo = almacen.series()
+        except ErrorConsulta as e:
+            return respuesta_error(str(e), e.estado)
+        cuerpo = {'fecha': almacen.fecha, 'snapshot': datos.id_snapshot, 'cubo': version_cubo, 'paises_cubo': len(cubo.paises)}
+        return Response(json.dumps(cuerpo, ensure_ascii=False), media_type=TIPO_JSON)
+
+    return Starlette(routes=[
+        Route('/salud', salud),
+        Route('/paises', ruta(paises)),
+        Route('/provincias', ruta(provincias)),
+        Route('/cfr', ruta(cfr)),
+        Route('/clusters', ruta(clusters)),
+        Route('/pronosticos/{pais}', ruta(pronosticos)),
+        Route('/exportar/{fuente}', exportar),
+    ])
+
+
+# Aplicación ASGI para uvicorn ('api:app'); los datos se cargan en la primera petición.
+app = crear_app()
+
+
+if __name__ == '__main__':
+    import argparse
+    from pathlib import Path
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='API HTTP de solo lectura con los agregados del dashboard.')
+    parser.add_argument('--fecha', default=FECHA, help='Fecha fija del reporte (MM-DD-YYYY); por defecto, la publicada.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help='Procesos de uvicorn (cada uno carga sus datos).')
+    args = parser.parse_args()
+
+    # La fecha llega a los procesos de uvicorn por la variable de entorno.
+    if args.fecha:
+        os.environ['COVID_FECHA'] = args.fecha
+    uvicorn.run('api:app', host=args.host, port=args.port, workers=args.workers,
+                app_dir=str(Path(__file__).resolve().parent), log_level='warning')
@@ -0,0 +1,50 @@
+# Lectura de los artefactos precalculados por app/precalculo.py.
+# Las páginas solo leen (nunca escriben) estos archivos; si un artefacto no existe para la
+# instantánea actual, la página lo calcula en el momento como antes.
+import json
+import os
+import pickle
+import shutil
+from pathlib import Path
+
+from almacen import DIRECTORIO_DATOS
+
+# Directorio raíz de artefactos; cada instantánea tiene su propia carpeta versionada.
+DIRECTORIO_ARTEFACTOS = Path(os.environ.get('COVID_ARTIFACTS_DIR', DIRECTORIO_DATOS / 'artefactos'))
+# Versión del formato de artefactos; si cambia, los anteriores dejan de usarse.
+VERSION_ARTEFACTOS = 4
+
+
+def directorio_version(id_snapshot, raiz=DIRECTORIO_ARTEFACTOS):
+    # Carpeta de los artefactos de una instantánea: <raiz>/v<version>/<fecha-hash>/
+    return Path(raiz) / f'v{VERSION_ARTEFACTOS}' / id_snapshot
+
+
+def leer_artefacto(id_snapshot, nombre, raiz=DIRECTORIO_ARTEFACTOS):
+    # Devuelve el artefacto 'nombre' de la instantánea, o None si no se ha precalculado.
+    ruta = directorio_version(id_snapshot, raiz) / f'{nombre}.pkl'
+    if not id_snapshot or not ruta.exists():
+        return None
+    with open(ruta, 'rb') as f:
+        return pickle.load(f)
+
+
+def escribir_artefactos(id_snapshot, artefactos, raiz=DIRECTORIO_ARTEFACTOS):
+    # Escribe todos los artefactos en una carpeta temporal y la publica con un solo rename,
+    # para que las páginas nunca lean una mezcla de versiones.
+    destino = directorio_version(id_snapshot, raiz)
+    temporal = destino.with_name(f'.{destino.name}.tmp-{os.getpid()}')
+    shutil.rmtree(temporal, ignore_errors=True)
+    temporal.mkdir(parents=True)
+    for nombre, valor in artefactos.items():
+        with open(temporal / f'{nombre}.pkl', 'wb') as f:
+            pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+    manifiesto = {'version': VERSION_ARTEFACTOS, 'snapshot': id_snapshot, 'artefactos': sorted(artefactos)}
+    (temporal / 'manifiesto.json').write_text(json.dumps(manifiesto, ensure_ascii=False))
+    # Si ya existía una versión para esta instantánea, se reemplaza.
+    anterior = destino.with_name(f'.{destino.name}.old-{os.getpid()}')
+    if destino.exists():
+        os.replace(destino, anterior)
+    os.replace(temporal, destino)
+    shutil.rmtree(anterior, ignore_errors=True)
+    return destino
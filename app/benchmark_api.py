@@ -0,0 +1,112 @@
+# Prueba de carga local de la API (app/api.py).
+# Lanza cientos de clientes concurrentes (un hilo con conexión keep-alive por cliente) contra una
+# lista de rutas y mide el rendimiento (peticiones/s), la latencia (p50, p95, p99) y los códigos de
+# estado. Sin --url levanta la API en este mismo proceso, en un puerto libre.
+#
+# Uso: python app/benchmark_api.py [--url http://127.0.0.1:8000] [--concurrencia 200] [--peticiones 20000] [--etag]
+import http.client
+import json
+import socket
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from urllib.parse import urlsplit
+
+# Rutas por defecto: una mezcla de consultas de cada endpoint.
+RUTAS = [
+    '/paises',
+    '/paises?paises=US,India,Brazil,Peru&orden=Deaths&desc=1',
+    '/paises?metrica=CFR&umbral=1&limite=20&formato=arrow',
+    '/provincias?pais=US',
+    '/cfr?paises=Peru,Mexico,Chile',
+    '/clusters?k=4',
+    '/clusters?k=6&componentes=3&formato=arrow',
+]
+
+
+def iniciar_servidor():
+    # Arranca uvicorn en un hilo con la API en un puerto libre y devuelve su URL.
+    import uvicorn
+
+    from api import app
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        puerto = s.getsockname()[1]
+    servidor = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=puerto, log_level='warning', backlog=4096))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+    return f'http://127.0.0.1:{puerto}'
+
+
+def cliente(url, rutas, turnos, usar_etag):
+    # Hace peticiones hasta agotar los turnos compartidos; devuelve [(latencia, estado), ...].
+    partes = urlsplit(url)
+    conexion = http.client.HTTPConnection(partes.hostname, partes.port, timeout=60)
+    etags, registros = {}, []
+    while (turno := next(turnos)) >= 0:
+        ruta = rutas[turno % len(rutas)]
+        cabeceras = {'If-None-Match': etags[ruta]} if usar_etag and ruta in etags else {}
+        inicio = time.perf_counter()
+        try:
+            conexion.request('GET', ruta, headers=cabeceras)
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            estado = respuesta.status
+            if respuesta.getheader('ETag'):
+                etags[ruta] = respuesta.getheader('ETag')
+        except (OSError, http.client.HTTPException):
+            # Conexión rechazada o cortada: se cuenta como error y se abre otra.
+            estado = 'error'
+            conexion.close()
+            conexion = http.client.HTTPConnection(partes.hostname, partes.port, timeout=60)
+        registros.append((time.perf_counter() - inicio, estado))
+    conexion.close()
+    return registros
+
+
+def cargar(url, rutas, concurrencia, peticiones, usar_etag=False):
+    # Reparte 'peticiones' entre 'concurrencia' clientes y resume los resultados.
+    numeros = count()
+    candado = threading.Lock()
+
+    def turnos():
+        # Iterador compartido: cada cliente toma el siguiente número; -1 cuando se acaban.
+        while True:
+            with candado:
+                n = next(numeros)
+            yield n if n < peticiones else -1
+
+    # Una petición de calentamiento carga los datos antes de medir.
+    cliente(url, rutas[:1], iter([0, -1]), False)
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        partes = list(pool.map(lambda _: cliente(url, rutas, turnos(), usar_etag), range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+    registros = [r for parte in partes for r in parte]
+    latencias = sorted(l for l, _ in registros)
+    cuantil = lambda q: round(latencias[min(len(latencias) - 1, int(q * len(latencias)))] * 1000, 2)
+    return {'peticiones': len(registros), 'segundos': round(duracion, 2),
+            'peticiones_por_segundo': round(len(registros) / duracion, 1),
+            'p50_ms': cuantil(0.50), 'p95_ms': cuantil(0.95), 'p99_ms': cuantil(0.99),
+            'media_ms': round(statistics.mean(latencias) * 1000, 2),
+            'estados': {str(k): v for k, v in Counter(e for _, e in registros).items()}}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Prueba de carga local de la API del dashboard.')
+    parser.add_argument('--url', help='URL de una API ya en marcha (por defecto se levanta una aquí).')
+    parser.add_argument('--concurrencia', type=int, default=200, help='Clientes simultáneos.')
+    parser.add_argument('--peticiones', type=int, default=20000, help='Peticiones en total.')
+    parser.add_argument('--rutas', nargs='+', default=RUTAS)
+    parser.add_argument('--etag', action='store_true', help='Reenvía la ETag recibida (mide las respuestas 304).')
+    args = parser.parse_args()
+
+    url = args.url or iniciar_servidor()
+    print(json.dumps(cargar(url, args.rutas, args.concurrencia, args.peticiones, args.etag), indent=2, ensure_ascii=False))
@@ -0,0 +1,180 @@
+# Benchmark de las rutas de cálculo del dashboard sobre datos sintéticos escalados.
+# Cada caso ejecuta, sin Streamlit, lo mismo que calcula una página (modelo de datos, cubo jerárquico,
+# Top N y filtros, intervalos y tests de CFR, también por remuestreo, clustering, calidad, anomalías,
+# pronóstico, ingesta)
+# sobre reportes con el esquema de JHU de 1x, 10x, 100x... filas y series de varios años, y registra
+# la latencia (mediana y mínimo de varias repeticiones) y el pico de memoria (tracemalloc).
+# Todo corre sin red y en un directorio temporal. Con --comparar se compara contra una línea base
+# guardada y el proceso termina con código 1 si algún caso empeora más de la tolerancia.
+#
+# Uso: python app/benchmark_computo.py [--escalas 1 10 100] [--anos 1 3] [--guardar base.json] [--comparar base.json]
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import count
+from pathlib import Path
+
+# Las cachés y cubos que escriben los módulos van a un directorio temporal (se fija antes de importarlos).
+DIRECTORIO_TEMPORAL = Path(tempfile.mkdtemp(prefix='benchmark-covid-'))
+os.environ['COVID_DATA_DIR'] = str(DIRECTORIO_TEMPORAL)
+
+from anomalias import DetectorAnomalias
+from calidad import perfilar
+from estadistica_cfr import intervalos_cfr
+from ingesta import actualizar_cubo
+from jerarquia import CuboJerarquico
+from modelo_datos import DatosCovid
+from precalculo import describir, histograma_cfr, tabla_remuestreo_cfr, tablas_cfr
+from pronostico import PARAMETROS_POR_DEFECTO, ajustar_ets
+from remuestreo_cfr import tendencia_cfr
+from segmentacion import barrido_clustering
+from sinteticos import N_PAISES, escribir_archivo, generar_cubo, generar_reporte
+
+# Días de reportes CSV que se escriben para el caso de ingesta.
+DIAS_INGESTA = 5
+# País con el que se mide el ajuste del pronóstico y países de las series temporales.
+PAIS_PRONOSTICO = 'Peru'
+PAISES_SERIE = N_PAISES
+
+
+def contexto_reporte(escala):
+    # Datos de entrada compartidos por los casos de una escala (su preparación no se mide).
+    df = generar_reporte(escala, dia=1)
+    datos = DatosCovid(df, id_snapshot=f'sintetico-{escala}x')
+    directorio_csv = DIRECTORIO_TEMPORAL / f'csv-{escala}x'
+    escribir_archivo(directorio_csv, DIAS_INGESTA, escala)
+    return {'df': df, 'df_anterior': generar_reporte(escala, dia=0), 'datos': datos,
+            'directorio_csv': directorio_csv, 'corridas': count()}
+
+
+def caso_ingesta(c):
+    # Cada repetición construye el cubo en un directorio nuevo para medir siempre la carga completa.
+    destino = DIRECTORIO_TEMPORAL / f"cubo-{c['directorio_csv'].name}-{next(c['corridas'])}"
+    actualizar_cubo(c['directorio_csv'], destino, procesos=1)
+
+
+def caso_ranking(c):
+    # Interacciones de la página principal: Top N, filtro por umbral y desglose por país.
+    datos = c['datos']
+    datos.top_n('Confirmed', 10)
+    datos.filtrar(datos.opciones_paises[:20], 'Confirmed', 1000)
+    datos.jerarquia.desglose('US')
+
+
+def caso_cfr_provincias(c):
+    # Intervalos de CFR al nivel más fino, el que crece con la escala.
+    tabla = c['datos'].jerarquia.nivel('Province_State')
+    intervalos_cfr(tabla.index, tabla['Deaths'], tabla['Confirmed'])
+
+
+# Casos sobre un reporte diario: nombre → función que recibe el contexto de la escala.
+CASOS_REPORTE = {
+    'modelo_datos': lambda c: DatosCovid(c['df']),
+    'jerarquia': lambda c: CuboJerarquico(c['datos'].raw),
+    'ranking': caso_ranking,
+    'describe': lambda c: describir(c['datos']),
+    'histograma_cfr': lambda c: histograma_cfr(c['datos']),
+    'cfr_provincias': caso_cfr_provincias,
+    'cfr_pares': lambda c: tablas_cfr(c['datos']),
+    'cfr_remuestreo': lambda c: tabla_remuestreo_cfr(c['datos']),
+    'clustering': lambda c: barrido_clustering(c['datos'], procesos=1),
+    'calidad': lambda c: perfilar(c['df'], c['df_anterior']),
+    'ingesta': caso_ingesta,
+}
+
+
+def contexto_serie(anos):
+    cubo = generar_cubo(PAISES_SERIE, n_dias=365 * anos)
+    return {'cubo': cubo, 'nuevos': cubo.nuevos_diarios('Deaths')}
+
+
+def caso_pronostico(c):
+    # Ajuste ETS de un país (lo que hace la página de modelado temporal sin caché).
+    cubo = c['cubo']
+    serie = cubo.serie(PAIS_PRONOSTICO, 'Confirmed').diff().fillna(0).clip(lower=0).asfreq('D')
+    ajustar_ets(serie, PARAMETROS_POR_DEFECTO['ets'])
+
+
+# Casos sobre series temporales: nombre → función que recibe el contexto de los años.
+CASOS_SERIE = {
+    'nuevos_diarios': lambda c: c['cubo'].nuevos_diarios('Deaths'),
+    'anomalias': lambda c: DetectorAnomalias(len(c['cubo'].paises)).procesar(c['nuevos']),
+    'pronostico_ets': caso_pronostico,
+    'tendencia_cfr': lambda c: tendencia_cfr(c['cubo'], replicas=200),
+}
+
+
+def medir(funcion, contexto, repeticiones):
+    # Latencia sin tracemalloc (que ralentiza) y, en una corrida aparte, el pico de memoria.
+    # Una primera corrida sin medir paga las importaciones diferidas (scipy, statsmodels...).
+    funcion(contexto)
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(contexto)
+        tiempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcion(contexto)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'mediana_ms': round(statistics.median(tiempos) * 1000, 2),
+            'min_ms': round(min(tiempos) * 1000, 2),
+            'pico_mb': round(pico / 2 ** 20, 2)}
+
+
+def ejecutar(escalas, anos, repeticiones, casos=None):
+    # Devuelve {'caso@escala': métricas}; 'casos' limita la ejecución a esos nombres.
+    resultados = {}
+    grupos = [(CASOS_REPORTE, contexto_reporte, escalas, 'x'), (CASOS_SERIE, contexto_serie, anos, 'a')]
+    for registro, preparar, tamanos, sufijo in grupos:
+        elegidos = {n: f for n, f in registro.items() if not casos or n in casos}
+        for tamano in tamanos if elegidos else []:
+            contexto = preparar(tamano)
+            for nombre, funcion in elegidos.items():
+                resultados[f'{nombre}@{tamano}{sufijo}'] = r = medir(funcion, contexto, repeticiones)
+                print(f"{nombre + '@' + str(tamano) + sufijo:<24} mediana {r['mediana_ms']:>10.1f} ms  "
+                      f"mín {r['min_ms']:>10.1f} ms  pico {r['pico_mb']:>8.1f} MB", flush=True)
+    return resultados
+
+
+def comparar(resultados, base, tolerancia):
+    # Lista de casos cuya latencia mediana o pico de memoria empeoró más que la tolerancia relativa.
+    regresiones = []
+    for caso, r in resultados.items():
+        for metrica, unidad in [('mediana_ms', 'ms'), ('pico_mb', 'MB')]:
+            anterior = base.get(caso, {}).get(metrica)
+            if anterior and r[metrica] > anterior * (1 + tolerancia):
+                regresiones.append(f'{caso} {metrica}: {anterior:.1f} {unidad} → {r[metrica]:.1f} {unidad}')
+    return regresiones
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Mide latencia y memoria de los cálculos del dashboard con datos sintéticos.')
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 10, 100], help='Multiplicadores de filas del reporte.')
+    parser.add_argument('--anos', type=int, nargs='+', default=[1, 3], help='Años de las series temporales.')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--casos', nargs='+', help=f'Casos a ejecutar (por defecto todos): {", ".join([*CASOS_REPORTE, *CASOS_SERIE])}.')
+    parser.add_argument('--guardar', help='Guarda los resultados como línea base (JSON).')
+    parser.add_argument('--comparar', help='Línea base (JSON) contra la que comparar.')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='Empeoramiento relativo permitido (0.25 = 25%%).')
+    args = parser.parse_args()
+
+    try:
+        resultados = ejecutar(args.escalas, args.anos, args.repeticiones, args.casos)
+    finally:
+        shutil.rmtree(DIRECTORIO_TEMPORAL, ignore_errors=True)
+
+    if args.guardar:
+        Path(args.guardar).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.comparar:
+        regresiones = comparar(resultados, json.loads(Path(args.comparar).read_text()), args.tolerancia)
+        for regresion in regresiones:
+            print(f'REGRESIÓN {regresion}')
+        sys.exit(1 if regresiones else 0)
@@ -0,0 +1,103 @@
+# Benchmark del costo de arranque en frío de cada página, basado en `python -X importtime`.
+# Para cada página se lanza un intérprete nuevo que ejecuta solo sus sentencias import (o la página
+# completa con --ejecutar) y se resume la salida de importtime: tiempo total de importación y los
+# módulos de primer nivel más pesados. Con --comparar se compara contra una línea base guardada
+# y el proceso termina con código 1 si alguna página empeora más de la tolerancia.
+#
+# Uso: python app/benchmark_importacion.py [--ejecutar] [--guardar base.json] [--comparar base.json]
+import ast
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Directorio de la aplicación (se añade al sys.path del intérprete hijo, como hace Streamlit).
+DIRECTORIO_APP = Path(__file__).resolve().parent
+# Páginas a medir: la principal y todas las de pages/.
+PAGINAS = [DIRECTORIO_APP / 'Pagina_Principal.py'] + sorted((DIRECTORIO_APP / 'pages').glob('*.py'))
+# Número de módulos más pesados que se muestran por página.
+TOP_MODULOS = 5
+
+
+def codigo_importaciones(ruta):
+    # Extrae solo las sentencias import de primer nivel de un script (sin dibujar ni cargar datos).
+    arbol = ast.parse(ruta.read_text(encoding='utf-8'))
+    return '\n'.join(ast.unparse(nodo) for nodo in arbol.body if isinstance(nodo, (ast.Import, ast.ImportFrom)))
+
+
+def medir_pagina(ruta, ejecutar=False):
+    # Lanza un intérprete nuevo con -X importtime y devuelve (segundos de pared, líneas de importtime).
+    if ejecutar:
+        cuerpo = f'import runpy; runpy.run_path({str(ruta)!r}, run_name="__main__")'
+    else:
+        cuerpo = codigo_importaciones(ruta)
+    codigo = f'import sys; sys.path.insert(0, {str(DIRECTORIO_APP)!r})\n{cuerpo}'
+    inicio = time.perf_counter()
+    proceso = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo],
+                             capture_output=True, text=True, cwd=DIRECTORIO_APP)
+    pared = time.perf_counter() - inicio
+    if proceso.returncode != 0:
+        raise RuntimeError(f'{ruta.name}: {proceso.stderr.strip().splitlines()[-1]}')
+    return pared, [l for l in proceso.stderr.splitlines() if l.startswith('import time:')]
+
+
+def resumir_importtime(lineas):
+    # Convierte la salida de importtime en {módulo de primer nivel: milisegundos acumulados}.
+    modulos = {}
+    for linea in lineas:
+        partes = linea[len('import time:'):].split('|')
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue  # Cabecera.
+        nombre = partes[2]
+        # La sangría del nombre indica el nivel de anidamiento; solo se suman los de primer nivel.
+        if len(nombre) - len(nombre.lstrip()) == 1:
+            modulos[nombre.strip()] = modulos.get(nombre.strip(), 0.0) + int(partes[1]) / 1000
+    return modulos
+
+
+def medir_todas(ejecutar=False):
+    # Devuelve {página: {'pared_ms', 'importacion_ms', 'top'}}.
+    resultados = {}
+    for ruta in PAGINAS:
+        pared, lineas = medir_pagina(ruta, ejecutar)
+        modulos = resumir_importtime(lineas)
+        top = sorted(modulos.items(), key=lambda par: par[1], reverse=True)[:TOP_MODULOS]
+        resultados[ruta.name] = {'pared_ms': round(pared * 1000, 1),
+                                 'importacion_ms': round(sum(modulos.values()), 1),
+                                 'top': [[m, round(ms, 1)] for m, ms in top]}
+    return resultados
+
+
+def comparar(resultados, base, tolerancia):
+    # Lista de páginas cuya importación empeoró más que la tolerancia relativa respecto a la base.
+    regresiones = []
+    for pagina, r in resultados.items():
+        anterior = base.get(pagina, {}).get('importacion_ms')
+        if anterior and r['importacion_ms'] > anterior * (1 + tolerancia):
+            regresiones.append(f"{pagina}: {anterior:.0f} ms → {r['importacion_ms']:.0f} ms")
+    return regresiones
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Mide el costo de importación en frío de cada página.')
+    parser.add_argument('--ejecutar', action='store_true', help='Ejecuta la página completa, no solo sus imports.')
+    parser.add_argument('--guardar', help='Guarda los resultados como línea base (JSON).')
+    parser.add_argument('--comparar', help='Línea base (JSON) contra la que comparar.')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='Empeoramiento relativo permitido (0.25 = 25%%).')
+    args = parser.parse_args()
+
+    resultados = medir_todas(args.ejecutar)
+    for pagina, r in resultados.items():
+        top = ', '.join(f'{m} {ms:.0f} ms' for m, ms in r['top'])
+        print(f"{pagina:<24} importación {r['importacion_ms']:>7.0f} ms  pared {r['pared_ms']:>7.0f} ms  [{top}]")
+
+    if args.guardar:
+        Path(args.guardar).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.comparar:
+        regresiones = comparar(resultados, json.loads(Path(args.comparar).read_text()), args.tolerancia)
+        for regresion in regresiones:
+            print(f'REGRESIÓN {regresion}')
+        sys.exit(1 if regresiones else 0)
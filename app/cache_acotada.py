@@ -0,0 +1,178 @@
+# Caché en memoria acotada por tamaño para las funciones de las páginas.
+# st.cache_data no tiene límite por defecto y calcula la clave serializando y hasheando cada
+# argumento (un DataFrame filtrado completo en cada rerun). Esta caché:
+#   - usa claves baratas: solo los argumentos que no empiezan con guion bajo, que deben ser
+#     hashables (el identificador de la instantánea y una tupla con los filtros);
+#   - cuenta los bytes de cada valor y expulsa los menos usados (LRU) al superar el límite;
+#   - caduca las entradas cuya instantánea dejó de estar vigente (o que superan un TTL opcional);
+#   - lleva métricas de aciertos, fallos, expulsiones y memoria residente.
+# Los valores se comparten entre sesiones y se tratan como de solo lectura (no se copian).
+#
+# Se usa como decorador, también dentro de instrumentar_cache:
+#   @instrumentar_cache(cache_acotada(max_mb=32))
+#   def figura(_datos, id_snapshot, metrica): ...
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Límite por defecto de cada caché, en MB (se puede cambiar con COVID_CACHE_MB).
+MAX_MB_POR_DEFECTO = float(os.environ.get('COVID_CACHE_MB', 64))
+# Cada cuántos segundos se vuelve a leer qué instantáneas están vigentes.
+INTERVALO_VIGENCIA = 30.0
+# Nombre del argumento que identifica la instantánea de la que depende el valor.
+ARGUMENTO_SNAPSHOT = 'id_snapshot'
+
+# Todas las cachés creadas en el proceso, por archivo y nombre de función. Streamlit vuelve a
+# ejecutar la página (y a decorar sus funciones) en cada rerun: la caché se recupera de aquí.
+_registro = {}
+# Instantáneas vigentes leídas la última vez y momento de la lectura.
+_vigencia = {'snapshots': None, 'leido': -INTERVALO_VIGENCIA}
+_candado_vigencia = threading.Lock()
+
+
+def tamano_bytes(valor):
+    # Estimación de la memoria que ocupa un valor, recorriendo contenedores.
+    if isinstance(valor, (pd.DataFrame, pd.Series, pd.Index)):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum() if isinstance(valor, pd.DataFrame) else uso)
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamano_bytes(k) + tamano_bytes(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return sys.getsizeof(valor) + sum(tamano_bytes(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+def snapshots_vigentes():
+    # Conjunto de instantáneas vigentes, releído como mucho cada INTERVALO_VIGENCIA segundos.
+    from almacen import snapshots_publicados
+
+    with _candado_vigencia:
+        ahora = time.monotonic()
+        if ahora - _vigencia['leido'] >= INTERVALO_VIGENCIA:
+            _vigencia['snapshots'], _vigencia['leido'] = snapshots_publicados(), ahora
+        return _vigencia['snapshots']
+
+
+def clave_barata(valor):
+    # Las listas (por ejemplo, los países de un multiselect) pasan a tuplas para poder hashearlas.
+    if isinstance(valor, list):
+        return tuple(clave_barata(v) for v in valor)
+    return valor
+
+
+class CacheAcotada:
+    # Diccionario LRU con límite de bytes; cada entrada guarda (valor, bytes, creación, instantánea).
+
+    def __init__(self, nombre, max_bytes, ttl=None, codigo=None):
+        self.nombre = nombre
+        # Bytecode de la función cacheada, para detectar ediciones en caliente.
+        self.codigo = codigo
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entradas = OrderedDict()
+        self.bytes = 0
+        self.metricas = {'llamadas': 0, 'aciertos': 0, 'fallos': 0, 'expulsiones': 0, 'caducadas': 0}
+        self.candado = threading.Lock()
+
+    def vigente(self, entrada):
+        _, _, creada, id_snapshot = entrada
+        if self.ttl is not None and time.monotonic() - creada > self.ttl:
+            return False
+        # Sin punteros publicados (o sin instantánea en la clave) no hay con qué comparar.
+        if id_snapshot:
+            publicados = snapshots_vigentes()
+            return not publicados or id_snapshot in publicados
+        return True
+
+    def _quitar(self, clave):
+        _, tamano, _, _ = self.entradas.pop(clave)
+        self.bytes -= tamano
+
+    def obtener(self, clave):
+        # Devuelve (True, valor) en un acierto o (False, None) en un fallo.
+        with self.candado:
+            self.metricas['llamadas'] += 1
+            entrada = self.entradas.get(clave)
+            if entrada is not None and not self.vigente(entrada):
+                self._quitar(clave)
+                self.metricas['caducadas'] += 1
+                entrada = None
+            if entrada is None:
+                self.metricas['fallos'] += 1
+                return False, None
+            self.entradas.move_to_end(clave)
+            self.metricas['aciertos'] += 1
+            return True, entrada[0]
+
+    def guardar(self, clave, valor, id_snapshot=None):
+        tamano = tamano_bytes(valor)
+        # Un valor más grande que toda la caché no se guarda (expulsaría todo lo demás).
+        if tamano > self.max_bytes:
+            return
+        with self.candado:
+            if clave in self.entradas:
+                self._quitar(clave)
+            self.entradas[clave] = (valor, tamano, time.monotonic(), id_snapshot)
+            self.bytes += tamano
+            while self.bytes > self.max_bytes:
+                self._quitar(next(iter(self.entradas)))
+                self.metricas['expulsiones'] += 1
+
+    def limpiar(self):
+        with self.candado:
+            self.entradas.clear()
+            self.bytes = 0
+
+    def estadisticas(self):
+        with self.candado:
+            return {**self.metricas, 'entradas': len(self.entradas),
+                    'mb_residentes': round(self.bytes / 2 ** 20, 3), 'mb_maximo': round(self.max_bytes / 2 ** 20, 3),
+                    'tasa_aciertos': self.metricas['aciertos'] / self.metricas['llamadas'] if self.metricas['llamadas'] else 0.0}
+
+
+def cache_acotada(max_mb=None, ttl=None):
+    # Decorador: cachea la función en una CacheAcotada de 'max_mb' MB y TTL opcional en segundos.
+    def decorar(funcion):
+        firma = inspect.signature(funcion)
+        # Solo entran en la clave los parámetros sin guion bajo (misma convención que Streamlit).
+        parametros = [p for p in firma.parameters if not p.startswith('_')]
+        # Se identifica por la función original (sin envolturas como la de instrumentar_cache).
+        codigo = inspect.unwrap(funcion).__code__
+        identidad = (codigo.co_filename, funcion.__qualname__)
+        cache = _registro.get(identidad)
+        # Si el código de la función cambió (edición en caliente), sus valores ya no sirven.
+        if cache is None or cache.codigo != codigo.co_code:
+            cache = CacheAcotada(funcion.__qualname__, int((max_mb or MAX_MB_POR_DEFECTO) * 2 ** 20), ttl, codigo.co_code)
+            _registro[identidad] = cache
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            argumentos = firma.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            clave = tuple(clave_barata(argumentos.arguments[p]) for p in parametros)
+            acierto, valor = cache.obtener(clave)
+            if acierto:
+                return valor
+            # El cálculo se hace fuera del candado: dos sesiones con el mismo fallo calculan en paralelo.
+            valor = funcion(*args, **kwargs)
+            cache.guardar(clave, valor, argumentos.arguments.get(ARGUMENTO_SNAPSHOT))
+            return valor
+
+        envoltura.clear = cache.limpiar
+        envoltura.cache = cache
+        return envoltura
+    return decorar
+
+
+def estadisticas_caches():
+    # Métricas de todas las cachés acotadas del proceso, por nombre de función.
+    return {cache.nombre: cache.estadisticas() for cache in _registro.values()}
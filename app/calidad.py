@@ -0,0 +1,151 @@
+# Perfilador vectorizado de calidad de datos para los reportes diarios de JHU.
+# Aplica en una sola pasada sobre cada archivo las reglas de validación (nulos, conteos negativos,
+# fallecidos > confirmados, activos inconsistentes, claves duplicadas y descensos del acumulado
+# respecto al día anterior). El resultado de cada archivo se guarda por hash de contenido, así que
+# volver a perfilar un archivo que no cambió es gratis; el archivo completo se reparte en procesos.
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from almacen import DIRECTORIO_CSV, DIRECTORIO_DATOS, hash_contenido
+from ingesta import fecha_de_archivo, normalizar_columnas
+
+# Directorio de la caché de resultados por archivo.
+DIRECTORIO_CALIDAD = DIRECTORIO_DATOS / 'calidad'
+# Versión de las reglas: si cambian, los resultados guardados dejan de valer.
+VERSION_REGLAS = 1
+
+# Columnas de conteo que se validan.
+CONTEOS = ['Confirmed', 'Deaths', 'Recovered', 'Active']
+# Métricas acumuladas que no deberían bajar de un día a otro.
+ACUMULADOS = ['Confirmed', 'Deaths']
+# Nombre legible de cada regla (columna de la tabla de marcas).
+REGLAS = {
+    'conteo_negativo': 'Conteo negativo',
+    'fallecidos_mayor_confirmados': 'Fallecidos > Confirmados',
+    'activos_inconsistentes': 'Active ≠ Confirmed - Deaths - Recovered',
+    'clave_duplicada': 'Combined_Key duplicada',
+    'descenso_acumulado': 'Descenso del acumulado respecto al día anterior',
+}
+
+
+def marcas_calidad(df, df_anterior=None):
+    # Devuelve un DataFrame booleano (una columna por regla, una fila por fila del reporte).
+    conteos = {c: pd.to_numeric(df[c], errors='coerce').to_numpy(dtype=np.float64) if c in df.columns
+               else np.full(len(df), np.nan) for c in CONTEOS}
+    marcas = pd.DataFrame(index=df.index)
+    # Conteos negativos en cualquiera de las columnas (NaN < 0 es False).
+    marcas['conteo_negativo'] = np.any([conteos[c] < 0 for c in CONTEOS], axis=0)
+    marcas['fallecidos_mayor_confirmados'] = conteos['Deaths'] > conteos['Confirmed']
+    # La identidad de 'Active' solo se comprueba cuando las cuatro columnas tienen valor.
+    esperado = conteos['Confirmed'] - conteos['Deaths'] - conteos['Recovered']
+    marcas['activos_inconsistentes'] = ~np.isnan(esperado) & ~np.isnan(conteos['Active']) & (conteos['Active'] != esperado)
+    claves = df['Combined_Key'] if 'Combined_Key' in df.columns else pd.Series(np.nan, index=df.index)
+    marcas['clave_duplicada'] = claves.notna().to_numpy() & claves.duplicated(keep=False).to_numpy()
+
+    # Descensos del acumulado: se cruza por Combined_Key con el reporte del día anterior.
+    descenso = np.zeros(len(df), dtype=bool)
+    if df_anterior is not None and 'Combined_Key' in df.columns and 'Combined_Key' in df_anterior.columns:
+        anterior = df_anterior.drop_duplicates('Combined_Key').set_index('Combined_Key')
+        for c in ACUMULADOS:
+            if c in df.columns and c in anterior.columns:
+                previo = pd.to_numeric(anterior[c], errors='coerce').reindex(claves.to_numpy()).to_numpy(dtype=np.float64)
+                descenso |= conteos[c] < previo
+    marcas['descenso_acumulado'] = descenso
+    return marcas
+
+
+def resumen_calidad(df, marcas):
+    # Resumen serializable en JSON: filas, tasa de nulos por columna y número de filas por regla.
+    return {
+        'filas': int(len(df)),
+        'nulos': {c: float(v) for c, v in df.isna().mean().items()},
+        'reglas': {r: int(marcas[r].sum()) for r in REGLAS},
+    }
+
+
+def perfilar(df, df_anterior=None):
+    # Perfila un reporte ya cargado; devuelve (resumen, marcas).
+    marcas = marcas_calidad(df, df_anterior)
+    return resumen_calidad(df, marcas), marcas
+
+
+def leer_cache(clave):
+    ruta = DIRECTORIO_CALIDAD / f'{clave}.json'
+    return json.loads(ruta.read_text()) if ruta.exists() else None
+
+
+def escribir_cache(clave, resumen):
+    DIRECTORIO_CALIDAD.mkdir(parents=True, exist_ok=True)
+    temporal = DIRECTORIO_CALIDAD / f'.{clave}.tmp-{os.getpid()}'
+    temporal.write_text(json.dumps(resumen, ensure_ascii=False))
+    os.replace(temporal, DIRECTORIO_CALIDAD / f'{clave}.json')
+
+
+def clave_archivo(contenido, contenido_anterior):
+    # La regla de descensos depende también del día anterior, así que la clave combina ambos hashes.
+    anterior = hash_contenido(contenido_anterior) if contenido_anterior is not None else 'ninguno'
+    return f'v{VERSION_REGLAS}-{hash_contenido(contenido)}-{anterior}'
+
+
+def leer_csv(ruta):
+    # Lee un reporte y unifica los nombres de columna entre versiones.
+    return normalizar_columnas(pd.read_csv(ruta, encoding='utf-8-sig', low_memory=False))
+
+
+def perfilar_archivo(tarea):
+    # Perfila un archivo (con el anterior para los descensos) y guarda el resumen en la caché.
+    # Recibe una tupla (clave, ruta, ruta_anterior) para poder usarse con pool.map.
+    clave, ruta, ruta_anterior = tarea
+    df_anterior = leer_csv(ruta_anterior) if ruta_anterior is not None else None
+    resumen, _ = perfilar(leer_csv(ruta), df_anterior)
+    escribir_cache(clave, resumen)
+    return resumen
+
+
+def perfilar_historico(directorio_csv=DIRECTORIO_CSV, procesos=None):
+    # Perfila todos los MM-DD-YYYY.csv del directorio. Los archivos sin cambios se leen de la caché;
+    # el resto se perfila en paralelo. Devuelve un DataFrame con una fila por fecha.
+    archivos = sorted((fecha_de_archivo(r.name), r) for r in Path(directorio_csv).glob('*.csv')
+                      if fecha_de_archivo(r.name) is not None)
+    resumenes, tareas, fechas_pendientes = {}, [], []
+    contenido_anterior, ruta_anterior = None, None
+    for fecha, ruta in archivos:
+        contenido = ruta.read_bytes()
+        clave = clave_archivo(contenido, contenido_anterior)
+        guardado = leer_cache(clave)
+        if guardado is not None:
+            resumenes[fecha] = guardado
+        else:
+            tareas.append((clave, ruta, ruta_anterior))
+            fechas_pendientes.append(fecha)
+        contenido_anterior, ruta_anterior = contenido, ruta
+
+    if tareas:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            for fecha, resumen in zip(fechas_pendientes, pool.map(perfilar_archivo, tareas, chunksize=4)):
+                resumenes[fecha] = resumen
+
+    filas = []
+    for fecha, _ in archivos:
+        resumen = resumenes[fecha]
+        filas.append({'Fecha': pd.Timestamp(fecha), 'Filas': resumen['filas'],
+                      **{REGLAS[r]: n for r, n in resumen['reglas'].items()},
+                      'Tasa máx. de nulos': max(resumen['nulos'].values(), default=0.0)})
+    return pd.DataFrame(filas)
+
+
+if __name__ == '__main__':
+    # Uso: python app/calidad.py [--csv-dir data/raw] [--procesos N]
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Perfila la calidad de todos los reportes diarios.')
+    parser.add_argument('--csv-dir', default=str(DIRECTORIO_CSV))
+    parser.add_argument('--procesos', type=int, default=None)
+    args = parser.parse_args()
+
+    print(perfilar_historico(args.csv_dir, args.procesos).to_string(index=False))
@@ -0,0 +1,47 @@
+# Carga de datos compartida por todas las páginas del dashboard.
+# Este módulo no dibuja nada ni configura la página: importarlo desde una página solo define
+# la función cacheada, en lugar de volver a ejecutar el script de la página principal.
+import streamlit as st  # Solo para el decorador de caché.
+
+from almacen import DIRECTORIO_SNAPSHOTS, leer_snapshot, snapshot_servido  # Almacén local de instantáneas columnares del reporte diario.
+from modelo_datos import DatosCovid  # Conjunto de datos indexado compartido por todas las páginas.
+from instrumentacion import instrumentar_cache  # Mide la carga y cuenta aciertos/fallos de caché (si está activa).
+
+
+# --- Funciones de Carga y Procesamiento de Datos ---
+# load_data() se llama en cada rerun: solo lee el puntero de la instantánea publicada (un archivo
+# pequeño) y pide el conjunto de datos de esa instantánea. Cuando la actualización diaria mueve el
+# puntero, el rerun siguiente carga la nueva; un rerun que ya empezó sigue con la anterior.
+def load_data():
+    return cargar_datos(snapshot_servido().name)
+
+
+# El decorador @st.cache_resource le dice a Streamlit que "recuerde" el resultado de esta función.
+# A diferencia de @st.cache_data, no copia el objeto en cada rerun: todas las páginas y sesiones
+# comparten el mismo conjunto de datos indexado, que se trata como de solo lectura.
+# Se guardan como mucho dos instantáneas: la vigente y la anterior (mientras se hace el cambio).
+@instrumentar_cache(st.cache_resource(max_entries=2))
+def cargar_datos(nombre_snapshot):
+    # Lee el reporte desde la instantánea local (mmap). Si aún no existía, snapshot_servido() ya la
+    # creó a partir del CSV local en data/raw o, si no está, descargándolo de GitHub.
+    # La limpieza básica (renombrar 'Case_Fatality_Ratio' a 'CFR' y convertirla a numérico)
+    # ya viene hecha desde el almacén.
+    df = leer_snapshot(DIRECTORIO_SNAPSHOTS / nombre_snapshot)
+    # Construye el conjunto de datos indexado: tabla por país, dtypes compactos e índices país → fila.
+    return DatosCovid(df)
+
+
+# Cubo país × fecha del archivo de reportes diarios, compartido por las páginas que usan series
+# temporales. Igual que load_data(), cada rerun consulta la versión servida (la que se publicó con
+# la instantánea en el puntero 'actual', ver ingesta.version_servida) y solo recarga el cubo si cambió.
+# La importación de ingesta se hace dentro para no pagarla en las páginas que no lo usan.
+def load_cubo():
+    from ingesta import version_servida
+    return cargar_cubo_version(version_servida())
+
+
+@instrumentar_cache(st.cache_resource(max_entries=2))
+def cargar_cubo_version(version):
+    from ingesta import cargar_cubo
+    # Los arrays de esa versión se leen con mmap desde data/cubo; cubo.version sirve como clave.
+    return cargar_cubo(version=version)
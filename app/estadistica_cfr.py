@@ -0,0 +1,88 @@
+# Motor vectorizado de intervalos de confianza y tests de hipótesis para la CFR.
+# En lugar de filtrar el DataFrame país por país, todas las operaciones se hacen sobre
+# arrays de NumPy con una entrada por país (o por par de países), de modo que la página
+# solo tiene que indexar una tabla ya calculada.
+import numpy as np
+import pandas as pd
+
+# Métodos de corrección por comparaciones múltiples disponibles (nombres de statsmodels).
+CORRECCIONES = ['holm', 'bonferroni', 'fdr_bh']
+
+
+def intervalos_cfr(paises, fallecidos, confirmados, confianza=0.95):
+    # Calcula la CFR y sus intervalos de Wald, Wilson y Clopper-Pearson (exacto) para todos los países a la vez.
+    # Devuelve un DataFrame indexado por país, con proporciones (no porcentajes).
+    # scipy se importa aquí y no al inicio del módulo: solo se carga cuando se calcula algo.
+    from scipy import stats
+
+    x = np.asarray(fallecidos, dtype=np.float64)
+    n = np.asarray(confirmados, dtype=np.float64)
+    alfa = 1 - confianza
+    z = stats.norm.ppf(1 - alfa / 2)
+
+    # Los países sin casos confirmados quedan como NaN en lugar de dividir por cero.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = np.where(n > 0, x / n, np.nan)
+        # Wald: aproximación normal, la misma que usaba la página originalmente.
+        se = np.sqrt(p * (1 - p) / n)
+        wald_inf, wald_sup = p - z * se, p + z * se
+        # Wilson: se comporta mucho mejor con pocos casos o CFR cercana a 0.
+        centro = (p + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+        margen = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / (1 + z ** 2 / n)
+        # Clopper-Pearson: cuantiles de la distribución beta (los extremos 0 y n se fijan a 0 y 1).
+        cp_inf = np.where(x > 0, stats.beta.ppf(alfa / 2, x, n - x + 1), 0.0)
+        cp_sup = np.where(x < n, stats.beta.ppf(1 - alfa / 2, x + 1, n - x), 1.0)
+
+    tabla = pd.DataFrame({
+        'CFR': p,
+        'Wald Inferior': wald_inf, 'Wald Superior': wald_sup,
+        'Wilson Inferior': centro - margen, 'Wilson Superior': centro + margen,
+        'Clopper-Pearson Inferior': cp_inf, 'Clopper-Pearson Superior': cp_sup,
+    }, index=pd.Index(np.asarray(paises), name='País'))
+    # Las filas sin confirmados no tienen intervalo.
+    tabla.loc[~(n > 0)] = np.nan
+    return tabla
+
+
+def test_z_pares(paises, fallecidos, confirmados, correccion='holm'):
+    # Test Z de dos proporciones (una cola) para todos los pares ordenados de países.
+    # z[i, j] y p[i, j] contrastan H1: CFR(i) > CFR(j), con la misma varianza agrupada que
+    # statsmodels.stats.proportion.proportions_ztest. Devuelve (z, p, p_corregido) como DataFrames;
+    # p_corregido es bilateral y simétrico (ver abajo).
+    from scipy import stats
+
+    x = np.asarray(fallecidos, dtype=np.float64)
+    n = np.asarray(confirmados, dtype=np.float64)
+    indice = pd.Index(np.asarray(paises), name='País')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = x / n
+        # Proporción agrupada de cada par mediante broadcasting (matriz n_paises × n_paises).
+        agrupada = (x[:, None] + x[None, :]) / (n[:, None] + n[None, :])
+        se = np.sqrt(agrupada * (1 - agrupada) * (1 / n[:, None] + 1 / n[None, :]))
+        z = (p[:, None] - p[None, :]) / se
+    p_valor = stats.norm.sf(z)
+    # La diagonal (un país contra sí mismo) no es un test.
+    np.fill_diagonal(z, np.nan)
+    np.fill_diagonal(p_valor, np.nan)
+
+    # Corrección por comparaciones múltiples sobre los N(N-1)/2 pares distintos, no sobre las N(N-1)
+    # celdas: p[i, j] y p[j, i] son el mismo par (suman 1). Para cada par se corrige su p-valor
+    # bilateral (el doble del menor de los dos, H1: CFR(i) ≠ CFR(j)) y se guarda en las dos celdas,
+    # así el resultado no depende del orden de los países (con z = 0 vale 1 en ambas).
+    # statsmodels también se importa aquí, solo cuando hace falta.
+    from statsmodels.stats.multitest import multipletests
+
+    p_corregido = np.full_like(p_valor, np.nan)
+    filas, columnas = np.triu_indices(len(n), k=1)
+    validos = np.isfinite(p_valor[filas, columnas])
+    filas, columnas = filas[validos], columnas[validos]
+    if len(filas):
+        bilateral = np.minimum(2 * np.minimum(p_valor[filas, columnas], p_valor[columnas, filas]), 1)
+        ajustado = multipletests(bilateral, method=correccion)[1]
+        p_corregido[filas, columnas] = ajustado
+        p_corregido[columnas, filas] = ajustado
+
+    return (pd.DataFrame(z, index=indice, columns=indice),
+            pd.DataFrame(p_valor, index=indice, columns=indice),
+            pd.DataFrame(p_corregido, index=indice, columns=indice))
@@ -0,0 +1,253 @@
+# Exportación por bloques (streaming) de las tablas del dashboard.
+# Cada fuente (tabla filtrada por país, filas crudas de provincias, rango de series temporales)
+# se entrega como una secuencia de DataFrames de a lo sumo FILAS_POR_BLOQUE filas, y cada formato
+# (CSV, CSV comprimido con gzip, Parquet, XLSX) convierte esa secuencia en trozos de bytes sin
+# construir nunca el archivo completo en memoria (XLSX se arma en un archivo temporal en disco).
+# La ruta /exportar de app/api.py envía esos trozos según se generan; con COVID_API_URL definida, el
+# dashboard enlaza a ella. Sin la API, el botón de descarga de Streamlit vuelca los trozos a un archivo
+# temporal al hacer clic, pero Streamlit lo lee entero en memoria para enviarlo: esa descarga ocupa
+# en el servidor, mientras dura, tanta memoria como el archivo final.
+#
+# Uso: python app/exportacion.py series --formato parquet --desde 2021-01-01 --hasta 2021-12-31 --out series.parquet
+import importlib.util
+import os
+import tempfile
+import zlib
+from urllib.parse import urlencode
+
+import numpy as np
+import pandas as pd
+
+# Filas por bloque: acota la memoria de cada paso de la exportación.
+FILAS_POR_BLOQUE = 100_000
+# Filas de datos por hoja de Excel (el límite de una hoja es 1.048.576 filas, incluida la cabecera).
+MAX_FILAS_XLSX = 1_048_575
+
+# URL base de la API (p. ej. http://127.0.0.1:8000) a la que enlaza el dashboard para descargar
+# en streaming; sin ella, el dashboard genera el archivo él mismo (ver a_archivo).
+URL_API = os.environ.get('COVID_API_URL')
+
+# Formato → (extensión, tipo MIME, librería opcional que necesita).
+FORMATOS = {
+    'csv': ('csv', 'text/csv', None),
+    'csv.gz': ('csv.gz', 'application/gzip', None),
+    'parquet': ('parquet', 'application/vnd.apache.parquet', 'pyarrow'),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'openpyxl'),
+}
+
+
+def formatos_disponibles():
+    # Formatos cuya librería está instalada (Parquet y XLSX son opcionales).
+    return [f for f, (_, _, libreria) in FORMATOS.items() if libreria is None or importlib.util.find_spec(libreria)]
+
+
+def nombre_archivo(base, formato):
+    return f'{base}.{FORMATOS[formato][0]}'
+
+
+def url_exportacion(fuente, formato, paises=(), **parametros):
+    # Enlace a la ruta /exportar/<fuente> de la API. Cada país va en su propio parámetro 'pais'
+    # (hay nombres con comas, como 'Korea, South'); los parámetros sin valor se omiten.
+    consulta = [('formato', formato), *(('pais', p) for p in paises),
+                *((k, str(v)) for k, v in parametros.items() if v is not None)]
+    return f"{URL_API.rstrip('/')}/exportar/{fuente}?{urlencode(consulta)}"
+
+
+# --- Fuentes: generadores de DataFrames por bloques ---
+
+def en_bloques(df, filas=FILAS_POR_BLOQUE):
+    # Parte un DataFrame en vistas consecutivas (iloc no copia los datos).
+    for inicio in range(0, max(len(df), 1), filas):
+        yield df.iloc[inicio:inicio + filas]
+
+
+def bloques_paises(datos, paises, metrica, umbral):
+    # Tabla por país filtrada igual que en la barra lateral (un solo bloque: ~200 filas).
+    yield datos.filtrar(paises, metrica, umbral)
+
+
+def bloques_provincias(datos, paises, filas=FILAS_POR_BLOQUE):
+    # Filas crudas del reporte (provincias y condados) de los países elegidos, país por país.
+    hubo_filas = False
+    for pais in paises:
+        df = datos.raw_de_pais(pais)
+        if len(df):
+            hubo_filas = True
+            yield from en_bloques(df, filas)
+    # Sin filas se entrega un bloque vacío para que el archivo tenga al menos la cabecera.
+    if not hubo_filas:
+        yield datos.raw.iloc[:0]
+
+
+def bloques_series(cubo, paises=None, desde=None, hasta=None, metricas=None, filas=FILAS_POR_BLOQUE):
+    # Rango de fechas del cubo en formato largo (País, Fecha, una columna por métrica acumulada),
+    # por lotes de países. Solo se exportan las celdas que vienen de un reporte.
+    metricas = list(metricas or cubo.metricas)
+    posiciones = [cubo.posicion[p] for p in (paises or cubo.paises) if p in cubo.posicion]
+    desde = np.datetime64(desde, 'D') if desde is not None else None
+    hasta = np.datetime64(hasta, 'D') if hasta is not None else None
+    inicio = 0 if desde is None else int(np.searchsorted(cubo.fechas, desde, side='left'))
+    fin = len(cubo.fechas) if hasta is None else int(np.searchsorted(cubo.fechas, hasta, side='right'))
+    fechas = cubo.fechas[inicio:fin]
+    # Países por lote para que cada bloque tenga como mucho 'filas' filas.
+    paises_por_lote = max(1, filas // max(len(fechas), 1))
+    vacio = True
+    for i in range(0, len(posiciones), paises_por_lote):
+        lote = np.asarray(posiciones[i:i + paises_por_lote])
+        presente = cubo.presente[lote, inicio:fin].ravel()
+        bloque = pd.DataFrame({
+            'Country_Region': np.repeat(np.asarray(cubo.paises, dtype=object)[lote], len(fechas)),
+            'Date': np.tile(fechas, len(lote)),
+            **{m: cubo.metricas[m][lote, inicio:fin].ravel() for m in metricas},
+        })[presente]
+        if len(bloque):
+            vacio = False
+            yield bloque
+    if vacio:
+        yield pd.DataFrame({'Country_Region': pd.Series(dtype=object), 'Date': pd.Series(dtype='datetime64[s]'),
+                            **{m: pd.Series(dtype=np.int32) for m in metricas}})
+
+
+# --- Formatos: de bloques de DataFrames a trozos de bytes ---
+
+def _texto_plano(bloque):
+    # Las columnas categóricas pasan a texto (los diccionarios de cada bloque pueden ser distintos).
+    return bloque.astype({c: object for c in bloque.columns if isinstance(bloque[c].dtype, pd.CategoricalDtype)})
+
+
+def flujo_csv(bloques):
+    # CSV en UTF-8; la cabecera solo va en el primer bloque.
+    cabecera = True
+    for bloque in bloques:
+        yield bloque.to_csv(index=False, header=cabecera).encode('utf-8')
+        cabecera = False
+
+
+def flujo_csv_gz(bloques, nivel=6):
+    # El mismo CSV comprimido con gzip de forma incremental (wbits=31 → cabecera gzip).
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    for trozo in flujo_csv(bloques):
+        comprimido = compresor.compress(trozo)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+class _Sumidero:
+    # Archivo de solo escritura que acumula lo escrito hasta que se vacía con drenar().
+
+    def __init__(self):
+        self.trozos = []
+        self.posicion = 0
+        self.closed = False
+
+    def write(self, datos):
+        datos = bytes(datos)
+        self.trozos.append(datos)
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drenar(self):
+        datos, self.trozos = b''.join(self.trozos), []
+        return datos
+
+
+def flujo_parquet(bloques):
+    # Un grupo de filas de Parquet por bloque; el esquema es el del primer bloque.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sumidero, escritor, esquema = _Sumidero(), None, None
+    for bloque in bloques:
+        tabla = pa.Table.from_pandas(_texto_plano(bloque), schema=esquema, preserve_index=False)
+        if escritor is None:
+            esquema = tabla.schema
+            escritor = pq.ParquetWriter(sumidero, esquema, compression='zstd')
+        escritor.write_table(tabla)
+        yield sumidero.drenar()
+    escritor.close()
+    yield sumidero.drenar()
+
+
+def flujo_xlsx(bloques):
+    # Libro de openpyxl en modo de solo escritura (memoria constante por fila). Un XLSX es un ZIP
+    # cuyo índice va al final, así que se arma en un archivo temporal y se lee por trozos.
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja, filas_hoja, cabecera = None, MAX_FILAS_XLSX, None
+    for bloque in bloques:
+        bloque = _texto_plano(bloque)
+        cabecera = list(bloque.columns)
+        # Los nulos de pandas no son valores de celda válidos: pasan a None.
+        valores = bloque.astype(object).where(bloque.notna(), None)
+        for fila in valores.itertuples(index=False, name=None):
+            # Al llenar una hoja se continúa en otra, repitiendo la cabecera.
+            if filas_hoja >= MAX_FILAS_XLSX:
+                hoja, filas_hoja = libro.create_sheet(f'Datos {len(libro.worksheets) + 1}'), 0
+                hoja.append(cabecera)
+            hoja.append(fila)
+            filas_hoja += 1
+    if hoja is None:
+        libro.create_sheet('Datos 1').append(cabecera or [])
+    with tempfile.TemporaryFile() as temporal:
+        libro.save(temporal)
+        temporal.seek(0)
+        while trozo := temporal.read(2 ** 20):
+            yield trozo
+
+
+FLUJOS = {'csv': flujo_csv, 'csv.gz': flujo_csv_gz, 'parquet': flujo_parquet, 'xlsx': flujo_xlsx}
+
+
+def flujo(bloques, formato):
+    # Trozos de bytes del archivo completo en el formato pedido.
+    return (trozo for trozo in FLUJOS[formato](bloques) if trozo)
+
+
+def a_archivo(bloques, formato):
+    # Vuelca el flujo a un archivo temporal en disco y lo devuelve rebobinado, listo para un botón
+    # de descarga. Sin búfer (buffering=0) es un io.FileIO, uno de los tipos que acepta Streamlit,
+    # que de todos modos lo lee completo a bytes: la generación va por bloques, el envío no.
+    temporal = tempfile.TemporaryFile(buffering=0)
+    for trozo in flujo(bloques, formato):
+        temporal.write(trozo)
+    temporal.seek(0)
+    return temporal
+
+
+if __name__ == '__main__':
+    import argparse
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser(description='Exporta el reporte o las series temporales por bloques.')
+    parser.add_argument('fuente', choices=['paises', 'provincias', 'series'])
+    parser.add_argument('--formato', choices=list(FORMATOS), default='csv.gz')
+    parser.add_argument('--paises', nargs='+', help='Países a exportar (por defecto todos).')
+    parser.add_argument('--desde', help='Primera fecha de las series (YYYY-MM-DD).')
+    parser.add_argument('--hasta', help='Última fecha de las series (YYYY-MM-DD).')
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+
+    if args.fuente == 'series':
+        from ingesta import cargar_cubo
+        bloques = bloques_series(cargar_cubo(), args.paises, args.desde, args.hasta)
+    else:
+        from almacen import cargar_reporte
+        from modelo_datos import DatosCovid
+        datos = DatosCovid(cargar_reporte())
+        paises = args.paises or datos.opciones_paises
+        bloques = bloques_paises(datos, paises, 'Confirmed', 0) if args.fuente == 'paises' else bloques_provincias(datos, paises)
+    with open(args.out, 'wb') as salida:
+        for trozo in flujo(bloques, args.formato):
+            salida.write(trozo)
+    print(f'{args.out}: {Path(args.out).stat().st_size / 2 ** 20:.2f} MB')
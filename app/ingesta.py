@@ -0,0 +1,404 @@
+# Motor de ingesta multi-fecha del archivo de reportes diarios de JHU.
+# Recorre un directorio con cientos de CSV (MM-DD-YYYY.csv), los lee por bloques (chunks),
+# normaliza las diferencias de esquema entre versiones del reporte y construye un "cubo"
+# compacto país × fecha con arrays int32. Solo se procesan los archivos nuevos o modificados.
+# Cada versión del cubo es inmutable: versiones/<versión>.json guarda países, fechas y el directorio
+# de datos (datos-*/, con un .npy por matriz), y meta.json solo apunta a la versión publicada.
+import json     # Para los metadatos del cubo.
+import os       # Para reemplazos atómicos de archivos.
+import re       # Para reconocer los nombres de archivo con fecha.
+import shutil   # Para borrar los directorios de datos de versiones antiguas.
+import time     # Para numerar las versiones del cubo.
+from concurrent.futures import ProcessPoolExecutor  # Para parsear varios archivos en paralelo.
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from almacen import DIRECTORIO_CSV, DIRECTORIO_DATOS, PUNTERO_ACTUAL, leer_puntero
+
+# Directorio donde se guarda el cubo país × fecha.
+DIRECTORIO_CUBO = DIRECTORIO_DATOS / 'cubo'
+
+# Métricas acumuladas que se guardan en el cubo (una matriz por métrica).
+METRICAS = ['Confirmed', 'Deaths', 'Recovered', 'Active']
+
+# Filas leídas por bloque; acota la memoria usada por cada archivo.
+TAMANO_BLOQUE = 100_000
+# Columnas de fecha reservadas al final de cada matriz guardada: permiten anexar un día nuevo
+# escribiendo solo su columna (anexar_reporte), sin reescribir el cubo completo.
+HOLGURA_FECHAS = 64
+# Versiones del cubo que se conservan en disco (las más recientes), para los lectores que aún usan
+# una anterior a la publicada.
+VERSIONES_CONSERVADAS = 4
+
+# Nombres de columna de las versiones antiguas del reporte → nombre actual.
+ALIAS_COLUMNAS = {
+    'Province/State': 'Province_State',
+    'Country/Region': 'Country_Region',
+    'Last Update': 'Last_Update',
+    'Latitude': 'Lat',
+    'Longitude': 'Long_',
+    'Incidence_Rate': 'Incident_Rate',
+    'Case-Fatality_Ratio': 'Case_Fatality_Ratio',
+}
+
+# Nombres de país que cambiaron a lo largo del archivo → nombre actual.
+ALIAS_PAISES = {
+    'Mainland China': 'China',
+    'South Korea': 'Korea, South',
+    'Republic of Korea': 'Korea, South',
+    'Iran (Islamic Republic of)': 'Iran',
+    'Russian Federation': 'Russia',
+    'Viet Nam': 'Vietnam',
+    'UK': 'United Kingdom',
+    'North Ireland': 'United Kingdom',
+    'Republic of Ireland': 'Ireland',
+    'Czech Republic': 'Czechia',
+    'Republic of Moldova': 'Moldova',
+    'Taiwan': 'Taiwan*',
+    'Hong Kong SAR': 'Hong Kong',
+    'Macao SAR': 'Macau',
+    'Bahamas, The': 'Bahamas',
+    'The Bahamas': 'Bahamas',
+    'Gambia, The': 'Gambia',
+    'The Gambia': 'Gambia',
+    'Cape Verde': 'Cabo Verde',
+    'Ivory Coast': "Cote d'Ivoire",
+    'East Timor': 'Timor-Leste',
+    'Vatican City': 'Holy See',
+}
+
+# Los archivos del archivo de JHU se llaman MM-DD-YYYY.csv.
+PATRON_ARCHIVO = re.compile(r'^(\d{2})-(\d{2})-(\d{4})\.csv$')
+
+
+def fecha_de_archivo(nombre):
+    # Convierte 'MM-DD-YYYY.csv' en np.datetime64('YYYY-MM-DD'); None si el nombre no encaja.
+    coincidencia = PATRON_ARCHIVO.match(nombre)
+    if coincidencia is None:
+        return None
+    mes, dia, anio = coincidencia.groups()
+    return np.datetime64(f'{anio}-{mes}-{dia}', 'D')
+
+
+def normalizar_columnas(df):
+    # Unifica los nombres de columna y de país entre las distintas versiones del reporte.
+    df = df.rename(columns=lambda c: ALIAS_COLUMNAS.get(c.strip(), c.strip()))
+    if 'Country_Region' in df.columns:
+        paises = df['Country_Region'].astype(str).str.strip()
+        df['Country_Region'] = paises.replace(ALIAS_PAISES)
+    return df
+
+
+def leer_reporte_diario(ruta):
+    # Lee un CSV por bloques y devuelve sus totales por país: (paises, matriz n_paises × len(METRICAS)).
+    # Se ejecuta dentro de los procesos del pool, por eso solo devuelve arrays pequeños.
+    parciales = []
+    for bloque in pd.read_csv(ruta, chunksize=TAMANO_BLOQUE, encoding='utf-8-sig'):
+        bloque = normalizar_columnas(bloque)
+        # Las versiones más antiguas no traen 'Active'; se rellena con ceros.
+        for metrica in METRICAS:
+            if metrica not in bloque.columns:
+                bloque[metrica] = 0
+            bloque[metrica] = pd.to_numeric(bloque[metrica], errors='coerce').fillna(0)
+        parciales.append(bloque.groupby('Country_Region')[METRICAS].sum())
+    if not parciales:
+        return np.array([], dtype=object), np.zeros((0, len(METRICAS)), dtype=np.int64)
+    # Suma los parciales de todos los bloques (un país puede aparecer en varios bloques).
+    total = pd.concat(parciales).groupby(level=0).sum()
+    return total.index.to_numpy(dtype=object), total.to_numpy(dtype=np.int64)
+
+
+class CuboSeries:
+    # Cubo país × fecha con una matriz int32 por métrica acumulada.
+    # 'presente' marca qué celdas vienen de un reporte (False = fecha sin archivo para ese país).
+
+    def __init__(self, paises, fechas, metricas, presente):
+        self.paises = list(paises)
+        self.fechas = np.asarray(fechas, dtype='datetime64[D]')
+        self.metricas = metricas
+        self.presente = presente
+        # Índice país → fila, para búsquedas O(1).
+        self.posicion = {pais: i for i, pais in enumerate(self.paises)}
+        # Archivo → firma de los CSV de los que salió (solo en un cubo cargado de disco).
+        self.procesados = None
+
+    def serie(self, pais, metrica='Confirmed'):
+        # Serie acumulada de un país como pd.Series indexada por fecha.
+        fila = self.posicion[pais]
+        valores = self.metricas[metrica][fila].astype(np.float64)
+        # Las fechas sin reporte quedan como NaN para no confundirlas con cero casos.
+        valores[~self.presente[fila]] = np.nan
+        return pd.Series(valores, index=pd.DatetimeIndex(self.fechas), name=pais)
+
+    def ultimo_presente(self, filas, hasta):
+        # Última columna anterior a 'hasta' con reporte de cada fila (0 si no hay ninguna). Se busca
+        # hacia atrás por tramos que doblan su ancho: con reportes diarios basta la columna anterior.
+        ultima = np.zeros(len(filas), dtype=np.int64)
+        pendientes = np.arange(len(filas))
+        fin, ancho = hasta, 1
+        while len(pendientes) and fin > 0:
+            inicio = max(fin - ancho, 0)
+            tramo = np.asarray(self.presente[filas[pendientes], inicio:fin])
+            encontrada = tramo.any(axis=1)
+            ultima[pendientes[encontrada]] = fin - 1 - np.argmax(tramo[encontrada, ::-1], axis=1)
+            pendientes = pendientes[~encontrada]
+            fin, ancho = inicio, ancho * 2
+        return ultima
+
+    def acumulado_continuo(self, metrica='Confirmed', filas=slice(None), desde=0):
+        # Matriz acumulada (int64) desde la columna 'desde', con cada fecha sin reporte de un país
+        # rellenada con su último acumulado reportado. En el cubo esas celdas valen 0: restarlas
+        # tal cual daría un día sin casos seguido de un día con todo el acumulado como casos nuevos.
+        # Solo se leen las columnas desde 'desde' (y, por fila, la del último reporte anterior).
+        filas = np.arange(len(self.paises))[filas]
+        presente = np.asarray(self.presente[filas, desde:])
+        columnas = np.where(presente, np.arange(desde, desde + presente.shape[1]), self.ultimo_presente(filas, desde)[:, None])
+        ultima = np.maximum.accumulate(columnas, axis=1)
+        return np.asarray(self.metricas[metrica])[filas[:, None], ultima].astype(np.int64)
+
+    def nuevos_diarios(self, metrica='Confirmed', desde=0):
+        # Matriz país × fecha de casos nuevos diarios (diferencia del acumulado, sin negativos).
+        # Un día sin reporte cuenta 0 casos nuevos y el siguiente reporte suma solo lo acumulado desde
+        # el último. Con 'desde' solo se calculan las columnas a partir de esa fecha (más la anterior).
+        previa = max(desde - 1, 0)
+        acumulado = self.acumulado_continuo(metrica, desde=previa)
+        nuevos = np.diff(acumulado, axis=1, prepend=acumulado[:, :1])[:, desde - previa:]
+        return np.clip(nuevos, 0, None).astype(np.int32)
+
+    def a_dataframe(self, metrica='Confirmed'):
+        # Vista ancha (países en filas, fechas en columnas) para análisis exploratorio.
+        return pd.DataFrame(self.metricas[metrica], index=self.paises, columns=pd.DatetimeIndex(self.fechas))
+
+
+def cubo_vacio():
+    return CuboSeries([], [], {m: np.zeros((0, 0), dtype=np.int32) for m in METRICAS}, np.zeros((0, 0), dtype=bool))
+
+
+def numero_version(version):
+    # Las versiones son 'cubo-<nanosegundos>': el número las ordena de la más antigua a la más nueva.
+    return int(version.rsplit('-', 1)[1]) if version and version != 'cubo-vacio' else -1
+
+
+def version_cubo(directorio=DIRECTORIO_CUBO):
+    # Versión publicada del cubo: la que nombra el puntero meta.json (el único archivo que se
+    # reemplaza en el sitio). Un meta.json sin 'version' es del formato anterior y no cuenta.
+    meta_ruta = Path(directorio) / 'meta.json'
+    if not meta_ruta.exists():
+        return 'cubo-vacio'
+    return json.loads(meta_ruta.read_text()).get('version', 'cubo-vacio')
+
+
+def version_servida(directorio=DIRECTORIO_CUBO):
+    # Versión que deben leer el dashboard y la API: la publicada junto con la instantánea en el
+    # puntero 'actual' (actualizacion.py), salvo que meta.json apunte a una más nueva (una ingesta
+    # hecha a mano después). Una versión preparada y aún no publicada no la ve nadie.
+    puntero = leer_puntero(PUNTERO_ACTUAL) or {}
+    return max(puntero.get('cubo'), version_cubo(directorio), key=numero_version)
+
+
+def leer_meta(directorio=DIRECTORIO_CUBO, version=None):
+    # Metadatos de una versión (por defecto, la publicada): directorio de datos, países, fechas y
+    # archivos procesados. None si no hay cubo o si la versión ya se borró.
+    version = version or version_cubo(directorio)
+    ruta = Path(directorio) / 'versiones' / f'{version}.json'
+    return json.loads(ruta.read_text()) if ruta.exists() else None
+
+
+def cargar_cubo(directorio=DIRECTORIO_CUBO, version=None):
+    # Carga una versión del cubo (por defecto, la publicada); devuelve uno vacío si todavía no existe.
+    # Si la versión pedida ya se borró, se carga la publicada. La versión cargada queda en cubo.version.
+    directorio = Path(directorio)
+    meta = leer_meta(directorio, version) if version else None
+    if meta is None:
+        version = version_cubo(directorio)
+        meta = leer_meta(directorio, version)
+    if meta is None:
+        cubo = cubo_vacio()
+        cubo.version = 'cubo-vacio'
+        return cubo
+    datos = directorio / meta['datos']
+    # Las matrices pueden tener columnas reservadas de más: solo cuentan las fechas de la versión.
+    n_paises, n_fechas = len(meta['paises']), len(meta['fechas'])
+    metricas = {m: np.load(datos / f'{m}.npy', mmap_mode='r')[:n_paises, :n_fechas] for m in METRICAS}
+    presente = np.load(datos / 'presente.npy', mmap_mode='r')[:n_paises, :n_fechas]
+    cubo = CuboSeries(meta['paises'], meta['fechas'], metricas, presente)
+    cubo.version = version
+    cubo.procesados = meta['procesados']
+    return cubo
+
+
+def escribir_json(ruta, contenido):
+    # Escribe un JSON con un reemplazo atómico: nadie lee nunca un archivo a medias.
+    temporal = ruta.parent / f'.{ruta.stem}.tmp-{os.getpid()}.json'
+    temporal.write_text(json.dumps(contenido, ensure_ascii=False))
+    os.replace(temporal, ruta)
+
+
+def podar_versiones(directorio, conservar=VERSIONES_CONSERVADAS):
+    # Borra las versiones más antiguas y los directorios de datos que ya no usa ninguna de las que
+    # quedan. Un lector que aún tenga abierta una versión borrada conserva sus mmap.
+    versiones = sorted((directorio / 'versiones').glob('cubo-*.json'), key=lambda r: numero_version(r.stem))
+    for ruta in versiones[:-conservar]:
+        ruta.unlink(missing_ok=True)
+    en_uso = {json.loads(r.read_text())['datos'] for r in versiones[-conservar:]}
+    for datos in directorio.glob('datos-*'):
+        if datos.name not in en_uso:
+            shutil.rmtree(datos, ignore_errors=True)
+
+
+def publicar_version(version, directorio=DIRECTORIO_CUBO):
+    # Mueve el puntero meta.json a una versión ya escrita.
+    escribir_json(Path(directorio) / 'meta.json', {'version': version})
+
+
+def escribir_meta(cubo, procesados, directorio, datos, publicar=True):
+    # Crea una versión nueva (inmutable) que apunta al directorio de datos 'datos' y, con publicar,
+    # la publica moviendo el puntero meta.json: las matrices y sus metadatos cambian juntos o no
+    # cambian. Sin publicar, la versión queda preparada para publicar_version.
+    directorio = Path(directorio)
+    (directorio / 'versiones').mkdir(parents=True, exist_ok=True)
+    version = f'cubo-{max(time.time_ns(), numero_version(version_cubo(directorio)) + 1)}'
+    meta = {'datos': datos, 'paises': cubo.paises, 'fechas': [str(f) for f in cubo.fechas], 'procesados': procesados}
+    escribir_json(directorio / 'versiones' / f'{version}.json', meta)
+    if publicar:
+        publicar_version(version, directorio)
+    podar_versiones(directorio)
+    return version
+
+
+def guardar_cubo(cubo, procesados, directorio=DIRECTORIO_CUBO, publicar=True):
+    # Guarda las matrices en un directorio de datos nuevo y después publica su versión. Los lectores
+    # de la versión anterior siguen leyendo sus propios archivos, que no se tocan.
+    directorio = Path(directorio)
+    datos = f'datos-{time.time_ns()}'
+    (directorio / datos).mkdir(parents=True)
+    for nombre, matriz in list(cubo.metricas.items()) + [('presente', cubo.presente)]:
+        # Se reservan HOLGURA_FECHAS columnas vacías al final para los días siguientes.
+        reservada = np.zeros((matriz.shape[0], matriz.shape[1] + HOLGURA_FECHAS), dtype=matriz.dtype)
+        reservada[:, :matriz.shape[1]] = matriz
+        np.save(directorio / datos / f'{nombre}.npy', reservada)
+    return escribir_meta(cubo, procesados, directorio, datos, publicar)
+
+
+def firma_archivo(ruta):
+    # Tamaño y fecha de modificación: basta para saber si un archivo ya fue procesado.
+    estado = ruta.stat()
+    return [estado.st_size, estado.st_mtime_ns]
+
+
+def ampliar_cubo(cubo, paises_nuevos, fechas_nuevas):
+    # Devuelve un cubo con filas/columnas añadidas para los países y fechas que aún no tenía.
+    paises = cubo.paises + [p for p in paises_nuevos if p not in cubo.posicion]
+    fechas = np.union1d(cubo.fechas, np.asarray(fechas_nuevas, dtype='datetime64[D]'))
+    # Posiciones de las columnas antiguas dentro del nuevo eje de fechas.
+    columnas = np.searchsorted(fechas, cubo.fechas)
+    filas = len(cubo.paises)
+    metricas = {}
+    for metrica, matriz in cubo.metricas.items():
+        nueva = np.zeros((len(paises), len(fechas)), dtype=np.int32)
+        nueva[:filas, columnas] = matriz
+        metricas[metrica] = nueva
+    presente = np.zeros((len(paises), len(fechas)), dtype=bool)
+    presente[:filas, columnas] = cubo.presente
+    return CuboSeries(paises, fechas, metricas, presente)
+
+
+def pendientes(directorio_csv, procesados):
+    # Lista (ruta, fecha) de los archivos nuevos o modificados desde la última ingesta.
+    resultado = []
+    for ruta in sorted(Path(directorio_csv).glob('*.csv')):
+        fecha = fecha_de_archivo(ruta.name)
+        if fecha is not None and procesados.get(ruta.name) != firma_archivo(ruta):
+            resultado.append((ruta, fecha))
+    return resultado
+
+
+def actualizar_cubo(directorio_csv=DIRECTORIO_CSV, directorio_cubo=DIRECTORIO_CUBO, procesos=None, publicar=True):
+    # Ingesta incremental: parsea en paralelo solo los archivos pendientes y los incorpora al cubo.
+    # Con publicar=False la versión nueva queda preparada sin mover meta.json (ver escribir_meta).
+    directorio_cubo = Path(directorio_cubo)
+    cubo = cargar_cubo(directorio_cubo)
+    meta = leer_meta(directorio_cubo, cubo.version)
+    procesados = meta['procesados'] if meta else {}
+
+    trabajo = pendientes(directorio_csv, procesados)
+    if not trabajo:
+        return cubo
+
+    rutas = [ruta for ruta, _ in trabajo]
+    # Cada proceso devuelve solo los totales por país de su archivo, así la memoria queda acotada.
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        resultados = list(pool.map(leer_reporte_diario, rutas, chunksize=8))
+
+    # Amplía el cubo una sola vez con todos los países y fechas nuevos.
+    paises_nuevos = list(dict.fromkeys(p for paises, _ in resultados for p in paises))
+    cubo = ampliar_cubo(cubo, paises_nuevos, [fecha for _, fecha in trabajo])
+
+    for (ruta, fecha), (paises, valores) in zip(trabajo, resultados):
+        columna = np.searchsorted(cubo.fechas, fecha)
+        filas = np.array([cubo.posicion[p] for p in paises], dtype=np.int64)
+        for j, metrica in enumerate(METRICAS):
+            # Un archivo corregido reemplaza por completo su columna de fecha.
+            cubo.metricas[metrica][:, columna] = 0
+            cubo.metricas[metrica][filas, columna] = valores[:, j]
+        cubo.presente[:, columna] = False
+        cubo.presente[filas, columna] = True
+        procesados[ruta.name] = firma_archivo(ruta)
+
+    return cargar_cubo(directorio_cubo, guardar_cubo(cubo, procesados, directorio_cubo, publicar))
+
+
+def anexar_reporte(ruta, directorio_cubo=DIRECTORIO_CUBO, publicar=True):
+    # Añade un día posterior al último del cubo escribiendo solo su columna en las matrices de la
+    # versión publicada (en el espacio reservado) y publicando una versión nueva con los mismos datos.
+    # Las versiones anteriores no ven la columna: sus metadatos acotan las fechas. El costo es el de
+    # leer ese CSV; 'publicar' como en actualizar_cubo. Devuelve el cubo actualizado, o None si el
+    # día no se puede anexar así (fecha que no es la siguiente, país nuevo o sin columnas
+    # reservadas): entonces hay que usar actualizar_cubo.
+    ruta, directorio_cubo = Path(ruta), Path(directorio_cubo)
+    fecha = fecha_de_archivo(ruta.name)
+    cubo = cargar_cubo(directorio_cubo)
+    meta = leer_meta(directorio_cubo, cubo.version)
+    if fecha is None or meta is None:
+        return None
+    procesados = meta['procesados']
+    if procesados.get(ruta.name) == firma_archivo(ruta):
+        return cubo
+    paises, valores = leer_reporte_diario(ruta)
+    datos = directorio_cubo / meta['datos']
+    matrices = {m: np.load(datos / f'{m}.npy', mmap_mode='r+') for m in METRICAS}
+    matrices['presente'] = np.load(datos / 'presente.npy', mmap_mode='r+')
+    columna = len(cubo.fechas)
+    if (len(cubo.fechas) and fecha <= cubo.fechas[-1]) or any(p not in cubo.posicion for p in paises) \
+            or columna >= matrices['presente'].shape[1] or matrices['presente'].shape[0] < len(cubo.paises):
+        return None
+
+    filas = np.array([cubo.posicion[p] for p in paises], dtype=np.int64)
+    for j, metrica in enumerate(METRICAS):
+        matrices[metrica][:, columna] = 0
+        matrices[metrica][filas, columna] = valores[:, j]
+    matrices['presente'][:, columna] = False
+    matrices['presente'][filas, columna] = True
+    for matriz in matrices.values():
+        matriz.flush()
+    procesados[ruta.name] = firma_archivo(ruta)
+    cubo = CuboSeries(cubo.paises, np.append(cubo.fechas, fecha),
+                      {m: matrices[m][:len(cubo.paises), :columna + 1] for m in METRICAS},
+                      matrices['presente'][:len(cubo.paises), :columna + 1])
+    return cargar_cubo(directorio_cubo, escribir_meta(cubo, procesados, directorio_cubo, meta['datos'], publicar))
+
+
+if __name__ == '__main__':
+    # Uso: python app/ingesta.py [--csv-dir data/raw] [--procesos N]
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Construye o actualiza el cubo país × fecha a partir de los reportes diarios.')
+    parser.add_argument('--csv-dir', default=str(DIRECTORIO_CSV), help='Directorio con los CSV MM-DD-YYYY.csv.')
+    parser.add_argument('--cubo-dir', default=str(DIRECTORIO_CUBO), help='Directorio de salida del cubo.')
+    parser.add_argument('--procesos', type=int, default=None, help='Número de procesos (por defecto, todos los núcleos).')
+    args = parser.parse_args()
+
+    cubo = actualizar_cubo(args.csv_dir, args.cubo_dir, args.procesos)
+    print(f'{len(cubo.paises)} países × {len(cubo.fechas)} fechas')
@@ -0,0 +1,192 @@
+# Instrumentación ligera de los puntos calientes del dashboard.
+# Streamlit vuelve a ejecutar el script completo en cada cambio de un widget; este módulo registra,
+# para cada rerun, cuánto tarda cada bloque (spans anidados) y cuántas llamadas a las funciones
+# cacheadas fueron aciertos o fallos de caché. Los datos se pueden ver en un panel opcional de la
+# barra lateral y volcar como JSON lines (una línea por rerun) para analizarlos fuera de línea.
+#
+# Se activa con la variable de entorno COVID_INSTRUMENTACION=1 (y COVID_TRAZAS=ruta.jsonl para el
+# volcado). Desactivada, los decoradores devuelven la función original y medir() un contexto vacío
+# compartido, así que el costo es una llamada a función por bloque.
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+
+# Interruptor global, leído una sola vez al importar el módulo.
+ACTIVA = os.environ.get('COVID_INSTRUMENTACION', '') not in ('', '0')
+# Archivo JSON lines donde se añade una línea por rerun (opcional).
+ARCHIVO_TRAZAS = os.environ.get('COVID_TRAZAS')
+
+# Contexto vacío reutilizado cuando la instrumentación está desactivada.
+_NULO = nullcontext()
+# Estado del rerun en curso. Streamlit ejecuta cada sesión en su propio hilo, así que cada hilo
+# tiene su propio registro.
+_local = threading.local()
+# Aciertos y fallos acumulados en el proceso, por función cacheada (compartidos entre sesiones).
+_acumulado = defaultdict(lambda: {'llamadas': 0, 'fallos': 0})
+_candado = threading.Lock()
+
+
+def iniciar_rerun(pagina):
+    # Abre el registro de un rerun; se llama al inicio de cada página.
+    if not ACTIVA:
+        return
+    _local.rerun = {'pagina': pagina, 'inicio': time.time(), 'reloj': time.perf_counter(),
+                    'spans': [], 'cache': defaultdict(lambda: {'llamadas': 0, 'fallos': 0})}
+    _local.profundidad = 0
+
+
+def _rerun_actual():
+    return getattr(_local, 'rerun', None)
+
+
+class _Span:
+    # Mide un bloque y lo añade a los spans del rerun en curso (si lo hay).
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.detalle = {}
+
+    def __enter__(self):
+        self.rerun = _rerun_actual()
+        if self.rerun is not None:
+            self.profundidad = _local.profundidad
+            _local.profundidad += 1
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        fin = time.perf_counter()
+        if self.rerun is not None:
+            _local.profundidad = self.profundidad
+            self.rerun['spans'].append({
+                'nombre': self.nombre, 'profundidad': self.profundidad,
+                'inicio_ms': round((self.inicio - self.rerun['reloj']) * 1000, 3),
+                'ms': round((fin - self.inicio) * 1000, 3), **self.detalle,
+            })
+        return False
+
+
+def medir(nombre):
+    # Context manager: `with medir('coropletas'): ...`.
+    return _Span(nombre) if ACTIVA else _NULO
+
+
+def cronometrado(nombre=None):
+    # Decorador que mide cada llamada de la función como un span con su nombre.
+    def decorar(funcion):
+        if not ACTIVA:
+            return funcion
+        etiqueta = nombre or funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with _Span(etiqueta):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorar
+
+
+def registrar_cache(nombre, acierto):
+    # Cuenta una llamada a una función cacheada en el rerun en curso y en el acumulado del proceso.
+    if not ACTIVA:
+        return
+    rerun = _rerun_actual()
+    if rerun is not None:
+        rerun['cache'][nombre]['llamadas'] += 1
+        rerun['cache'][nombre]['fallos'] += not acierto
+    with _candado:
+        _acumulado[nombre]['llamadas'] += 1
+        _acumulado[nombre]['fallos'] += not acierto
+
+
+def instrumentar_cache(decorador):
+    # Envuelve un decorador de caché de Streamlit (st.cache_data, st.cache_resource o uno ya
+    # configurado como st.cache_data(ttl=60)) para medir cada llamada y contar aciertos y fallos.
+    # El cuerpo de la función solo se ejecuta en un fallo, así que basta con marcarlo desde dentro.
+    def decorar(funcion):
+        if not ACTIVA:
+            return decorador(funcion)
+        nombre = funcion.__name__
+
+        @functools.wraps(funcion)
+        def calculo(*args, **kwargs):
+            _local.fallo = True
+            return funcion(*args, **kwargs)
+
+        # functools.wraps conserva nombre, módulo y código fuente: la clave de caché no cambia.
+        en_cache = decorador(calculo)
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            # Se guarda la marca de la llamada exterior por si una función cacheada llama a otra.
+            anterior, _local.fallo = getattr(_local, 'fallo', False), False
+            try:
+                with _Span(nombre) as span:
+                    resultado = en_cache(*args, **kwargs)
+                    fallo = _local.fallo
+                    span.detalle['cache'] = 'fallo' if fallo else 'acierto'
+            finally:
+                _local.fallo = anterior
+            registrar_cache(nombre, not fallo)
+            return resultado
+
+        envoltura.clear = en_cache.clear
+        return envoltura
+    return decorar
+
+
+def cerrar_rerun():
+    # Cierra el rerun en curso, lo vuelca a ARCHIVO_TRAZAS y lo devuelve (None si no hay ninguno).
+    rerun = _rerun_actual()
+    if rerun is None:
+        return None
+    _local.rerun = None
+    registro = {'pagina': rerun['pagina'], 'inicio': rerun['inicio'],
+                'total_ms': round((time.perf_counter() - rerun['reloj']) * 1000, 3),
+                'spans': rerun['spans'], 'cache': dict(rerun['cache'])}
+    if ARCHIVO_TRAZAS:
+        with _candado, open(ARCHIVO_TRAZAS, 'a', encoding='utf-8') as archivo:
+            archivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+    return registro
+
+
+def tasas_acumuladas():
+    # Aciertos, fallos y tasa de aciertos por función cacheada desde que arrancó el proceso.
+    with _candado:
+        return {nombre: {**c, 'aciertos': c['llamadas'] - c['fallos'],
+                         'tasa_aciertos': (c['llamadas'] - c['fallos']) / c['llamadas'] if c['llamadas'] else 0.0}
+                for nombre, c in _acumulado.items()}
+
+
+def panel_depuracion():
+    # Cierra el rerun y, si la instrumentación está activa, dibuja el panel en la barra lateral.
+    # Se llama al final de cada página.
+    if not ACTIVA:
+        return
+    import pandas as pd
+    import streamlit as st
+
+    registro = cerrar_rerun()
+    if registro is None:
+        return
+    with st.sidebar.expander('⏱️ Depuración: tiempos del rerun'):
+        st.caption(f"{registro['pagina']}: {registro['total_ms']:.1f} ms en total")
+        spans = pd.DataFrame(registro['spans'], columns=['nombre', 'profundidad', 'inicio_ms', 'ms', 'cache'])
+        # Los spans se registran al cerrarse; se ordenan por inicio y se sangran por profundidad.
+        spans = spans.sort_values('inicio_ms')
+        spans['nombre'] = ['  ' * p + n for p, n in zip(spans['profundidad'], spans['nombre'])]
+        st.dataframe(spans.drop(columns='profundidad'), hide_index=True)
+        acumulado = tasas_acumuladas()
+        if acumulado:
+            st.caption('Caché (acumulado del proceso)')
+            st.dataframe(pd.DataFrame(acumulado).T[['llamadas', 'aciertos', 'fallos', 'tasa_aciertos']])
+        # Memoria residente y expulsiones de las cachés acotadas (si alguna página las usa).
+        from cache_acotada import estadisticas_caches
+        caches = estadisticas_caches()
+        if caches:
+            st.caption('Cachés acotadas (memoria y expulsiones)')
+            st.dataframe(pd.DataFrame(caches).T[['entradas', 'mb_residentes', 'mb_maximo', 'expulsiones', 'caducadas', 'tasa_aciertos']])
@@ -0,0 +1,128 @@
+# Cubo de agregación jerárquica: condado (Admin2) → provincia → país → global.
+# Se calcula una sola vez por instantánea, en una pasada sobre el reporte crudo, usando
+# códigos enteros de grupo reutilizables (np.bincount) en lugar de un groupby por nivel.
+# El desglose de cualquier nivel es después un corte de arrays ya ordenados.
+import numpy as np
+import pandas as pd
+
+# Niveles de la jerarquía, de más general a más detallado.
+NIVELES = ['Country_Region', 'Province_State', 'Admin2']
+# Métricas que se suman en cada nivel.
+METRICAS = ['Confirmed', 'Deaths', 'Recovered', 'Active']
+# Etiqueta para filas sin provincia o sin condado.
+SIN_DESGLOSE = '(Sin desglose)'
+
+
+def codigos_nivel(serie):
+    # Códigos enteros 0..k-1 y etiquetas de una columna; los nulos pasan a la etiqueta SIN_DESGLOSE.
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos = serie.cat.codes.to_numpy().astype(np.int64)
+        etiquetas = np.asarray(serie.cat.categories.astype(str), dtype=object)
+    else:
+        codigos, etiquetas = pd.factorize(serie, sort=True)
+        codigos = codigos.astype(np.int64)
+        etiquetas = np.asarray(etiquetas.astype(str), dtype=object)
+    # El código 'k' representa el nulo.
+    codigos = np.where(codigos < 0, len(etiquetas), codigos)
+    return codigos, np.append(etiquetas, SIN_DESGLOSE)
+
+
+class CuboJerarquico:
+    # Tablas agregadas por nivel (país, provincia, condado) y total global.
+
+    def __init__(self, df):
+        # Códigos de cada nivel y tamaño de su "alfabeto" (para combinar claves sin colisiones).
+        codigos = []
+        self.etiquetas = []
+        for nivel in NIVELES:
+            if nivel in df.columns:
+                c, e = codigos_nivel(df[nivel])
+            else:
+                # Reportes sin ese nivel (p. ej. versiones antiguas sin Admin2): todo queda "sin desglose".
+                c, e = np.zeros(len(df), dtype=np.int64), np.array([SIN_DESGLOSE], dtype=object)
+            codigos.append(c)
+            self.etiquetas.append(e)
+        tamanos = [len(e) for e in self.etiquetas]
+        self.tamanos = tamanos
+        # Etiqueta → código de cada nivel, para localizar un nodo sin recorrer las etiquetas.
+        self.codigo = [{etiqueta: i for i, etiqueta in enumerate(e)} for e in self.etiquetas]
+
+        # Clave combinada de la hoja (país, provincia, condado) en un solo entero.
+        clave = np.zeros(len(df), dtype=np.int64)
+        for c, k in zip(codigos, tamanos):
+            clave = clave * k + c
+        claves_hoja, grupo = np.unique(clave, return_inverse=True)
+
+        # Sumas por hoja en una sola pasada (una bincount por métrica); los NaN cuentan como 0, como en groupby.sum().
+        sumas = {m: np.bincount(grupo, weights=np.nan_to_num(df[m].to_numpy(dtype=np.float64)), minlength=len(claves_hoja))
+                 for m in METRICAS}
+        # Centroide geográfico por hoja: media de Lat/Long_ de las filas con coordenadas.
+        for coord in ['Lat', 'Long_']:
+            valores = df[coord].to_numpy(dtype=np.float64) if coord in df.columns else np.full(len(df), np.nan)
+            validos = ~np.isnan(valores)
+            sumas[coord] = np.bincount(grupo, weights=np.where(validos, valores, 0.0), minlength=len(claves_hoja))
+            sumas[f'_n_{coord}'] = np.bincount(grupo, weights=validos.astype(np.float64), minlength=len(claves_hoja))
+
+        # Sube nivel a nivel: la clave del padre es la clave del hijo sin su último dígito.
+        self.tablas = {}
+        # Claves combinadas (ordenadas) de las filas de cada tabla, para localizar desgloses por búsqueda binaria.
+        self.claves = {}
+        claves, valores = claves_hoja, sumas
+        for profundidad in range(len(NIVELES), 0, -1):
+            self.tablas[NIVELES[profundidad - 1]] = self.construir_tabla(claves, valores, tamanos, profundidad)
+            self.claves[NIVELES[profundidad - 1]] = claves
+            if profundidad > 1:
+                claves_padre, grupo_padre = np.unique(claves // tamanos[profundidad - 1], return_inverse=True)
+                valores = {m: np.bincount(grupo_padre, weights=v, minlength=len(claves_padre)) for m, v in valores.items()}
+                claves = claves_padre
+
+        # Total global: suma de la tabla por país.
+        paises = self.tablas['Country_Region']
+        self.total = paises[METRICAS].sum()
+        self.total['CFR'] = round(self.total['Deaths'] / self.total['Confirmed'] * 100, 2) if self.total['Confirmed'] else np.nan
+
+    def construir_tabla(self, claves, valores, tamanos, profundidad):
+        # Decodifica las claves combinadas en columnas de etiquetas y añade métricas, CFR y centroide.
+        columnas = {}
+        resto = claves.copy()
+        for i in range(profundidad - 1, -1, -1):
+            columnas[NIVELES[i]] = self.etiquetas[i][resto % tamanos[i]]
+            resto //= tamanos[i]
+        tabla = pd.DataFrame({n: columnas[n] for n in NIVELES[:profundidad]})
+        for m in METRICAS:
+            tabla[m] = valores[m]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tabla['CFR'] = np.round(tabla['Deaths'] / tabla['Confirmed'] * 100, 2)
+            tabla['Lat'] = valores['Lat'] / valores['_n_Lat']
+            tabla['Long_'] = valores['Long_'] / valores['_n_Long_']
+        return tabla
+
+    def nivel(self, nombre):
+        # Tabla completa de un nivel ('Country_Region', 'Province_State' o 'Admin2').
+        return self.tablas[nombre]
+
+    def desglose(self, pais=None, provincia=None):
+        # Filas hijas de un nodo: sin argumentos, los países; con país, sus provincias;
+        # con país y provincia, sus condados. Las tablas ya están ordenadas por padre,
+        # así que el resultado es un corte contiguo localizado por búsqueda binaria.
+        if pais is None:
+            return self.tablas['Country_Region']
+        nivel = 'Province_State' if provincia is None else 'Admin2'
+        padre = [pais] if provincia is None else [pais, provincia]
+        inicio, fin = self.rango(nivel, padre)
+        return self.tablas[nivel].iloc[inicio:fin]
+
+    def rango(self, nivel, padre):
+        # Posiciones [inicio, fin) de las filas de 'nivel' cuyo prefijo de niveles coincide con 'padre'.
+        # La clave combinada ordena las filas por país, luego provincia, luego condado.
+        prefijo = 0
+        for i, valor in enumerate(padre):
+            if valor not in self.codigo[i]:
+                return 0, 0
+            prefijo = prefijo * self.tamanos[i] + self.codigo[i][valor]
+        # Ancho del bloque de claves que comparten el prefijo.
+        profundidad = NIVELES.index(nivel) + 1
+        ancho = int(np.prod(self.tamanos[len(padre):profundidad]))
+        claves = self.claves[nivel]
+        return (int(np.searchsorted(claves, prefijo * ancho, side='left')),
+                int(np.searchsorted(claves, (prefijo + 1) * ancho, side='left')))
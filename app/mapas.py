@@ -0,0 +1,204 @@
+# Mapas coropléticos del dashboard con geometría local y precalculada.
+# Con locationmode='country names' Plotly resuelve cada nombre de país con una tabla interna de
+# expresiones regulares en cada rerun; aquí los nombres de JHU se traducen una sola vez a ISO3 con
+# una tabla incluida en el repositorio (data/iso3_paises.csv) y la figura se construye con
+# locationmode='ISO-3'. Para el nivel de provincias se usan GeoJSON locales simplificados de
+# antemano (Douglas-Peucker) en varios niveles de detalle, sin descargar geometría durante la sesión.
+#
+# Uso: python app/mapas.py provincias.geojson --nombre us --prop-pais admin --prop-provincia name
+import functools
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from almacen import DIRECTORIO_DATOS
+
+# Tabla Country_Region → ISO3 (versionada junto al código, no depende de COVID_DATA_DIR).
+ARCHIVO_ISO3 = Path(__file__).resolve().parent.parent / 'data' / 'iso3_paises.csv'
+# Aquí se guardan los GeoJSON de provincias ya simplificados: <nombre>-<detalle>.geojson.
+DIRECTORIO_GEO = DIRECTORIO_DATOS / 'geo'
+# Niveles de detalle → tolerancia de Douglas-Peucker en grados (0 = geometría original).
+NIVELES_DETALLE = {'bajo': 0.1, 'medio': 0.02, 'alto': 0.0}
+# Decimales de las coordenadas guardadas (5 decimales ≈ 1 m; menos bytes en el JSON de la figura).
+DECIMALES = {'bajo': 2, 'medio': 3, 'alto': 5}
+# Separador del identificador de cada provincia en el GeoJSON: 'País|Provincia'.
+SEPARADOR = '|'
+
+
+@functools.lru_cache(maxsize=1)
+def cargar_iso3():
+    # Diccionario Country_Region → ISO3, leído una sola vez por proceso.
+    tabla = pd.read_csv(ARCHIVO_ISO3, keep_default_na=False)
+    return dict(zip(tabla['Country_Region'], tabla['ISO3']))
+
+
+def codigos_iso3(paises):
+    # Código ISO3 de cada país (NaN para los que no tienen, como cruceros o los Juegos Olímpicos).
+    return pd.Series(paises).map(cargar_iso3())
+
+
+def figura_coropletas(tabla, metrica='Confirmed'):
+    # Mapa mundial coloreado por 'metrica', devuelto ya serializado (diccionario de Plotly).
+    import plotly.express as px
+
+    df = tabla[['Country_Region', metrica]].assign(ISO3=codigos_iso3(tabla['Country_Region']).to_numpy())
+    fig = px.choropleth(
+        df.dropna(subset=['ISO3']),
+        locations='ISO3',                  # Códigos ISO3 de la tabla local.
+        locationmode='ISO-3',              # Sin búsqueda por nombre dentro de Plotly.
+        color=metrica,
+        hover_name='Country_Region',
+        color_continuous_scale=px.colors.sequential.Plasma,
+        title=f'Distribución Mundial de Casos {metrica}'
+    )
+    return fig.to_dict()
+
+
+def _distancias_segmento(puntos, inicio, fin):
+    # Distancia de cada punto al segmento inicio-fin (o al punto inicio si el segmento es degenerado).
+    segmento = fin - inicio
+    largo = segmento @ segmento
+    if largo == 0:
+        return np.hypot(*(puntos - inicio).T)
+    t = np.clip((puntos - inicio) @ segmento / largo, 0, 1)
+    return np.hypot(*(puntos - (inicio + t[:, None] * segmento)).T)
+
+
+def douglas_peucker(puntos, tolerancia):
+    # Simplifica una línea (array n × 2) con una pila en lugar de recursión; conserva los extremos.
+    puntos = np.asarray(puntos, dtype=float)
+    if tolerancia <= 0 or len(puntos) < 3:
+        return puntos
+    conservar = np.zeros(len(puntos), dtype=bool)
+    conservar[[0, -1]] = True
+    pila = [(0, len(puntos) - 1)]
+    while pila:
+        i, j = pila.pop()
+        if j - i < 2:
+            continue
+        distancias = _distancias_segmento(puntos[i + 1:j], puntos[i], puntos[j])
+        k = int(np.argmax(distancias))
+        if distancias[k] > tolerancia:
+            k += i + 1
+            conservar[k] = True
+            pila += [(i, k), (k, j)]
+    return puntos[conservar]
+
+
+def simplificar_anillo(anillo, tolerancia, decimales):
+    # Un anillo cerrado necesita al menos 4 puntos; si la simplificación lo colapsa, se descarta.
+    puntos = np.round(douglas_peucker(anillo, tolerancia), decimales)
+    # El redondeo puede dejar puntos consecutivos repetidos.
+    puntos = puntos[np.r_[True, np.any(np.diff(puntos, axis=0) != 0, axis=1)]]
+    return puntos.tolist() if len(puntos) >= 4 else None
+
+
+def simplificar_geometria(geometria, tolerancia, decimales):
+    # Polygon o MultiPolygon simplificado; los polígonos cuyo anillo exterior colapsa se eliminan.
+    poligonos = [geometria['coordinates']] if geometria['type'] == 'Polygon' else geometria['coordinates']
+    resultado = []
+    for poligono in poligonos:
+        exterior = simplificar_anillo(poligono[0], tolerancia, decimales)
+        if exterior is None:
+            continue
+        huecos = [h for h in (simplificar_anillo(a, tolerancia, decimales) for a in poligono[1:]) if h]
+        resultado.append([exterior] + huecos)
+    if not resultado:
+        return None
+    return {'type': 'MultiPolygon', 'coordinates': resultado}
+
+
+def simplificar_geojson(geojson, detalle, prop_pais, prop_provincia):
+    # FeatureCollection con la geometría simplificada al nivel 'detalle' y un 'id' 'País|Provincia'
+    # que coincide con las etiquetas del cubo jerárquico. Solo se conservan las dos propiedades de nombre.
+    tolerancia, decimales = NIVELES_DETALLE[detalle], DECIMALES[detalle]
+    entidades = []
+    for entidad in geojson['features']:
+        geometria = entidad.get('geometry')
+        if not geometria or geometria['type'] not in ('Polygon', 'MultiPolygon'):
+            continue
+        geometria = simplificar_geometria(geometria, tolerancia, decimales)
+        if geometria is None:
+            continue
+        propiedades = entidad.get('properties') or {}
+        pais, provincia = str(propiedades[prop_pais]), str(propiedades[prop_provincia])
+        entidades.append({'type': 'Feature', 'id': f'{pais}{SEPARADOR}{provincia}',
+                          'properties': {'Country_Region': pais, 'Province_State': provincia},
+                          'geometry': geometria})
+    return {'type': 'FeatureCollection', 'features': entidades}
+
+
+def ruta_geojson(nombre, detalle, raiz=DIRECTORIO_GEO):
+    return Path(raiz) / f'{nombre}-{detalle}.geojson'
+
+
+def preparar_geojson(origen, nombre, prop_pais, prop_provincia, raiz=DIRECTORIO_GEO):
+    # Escribe un archivo por nivel de detalle (reemplazo atómico) y devuelve las rutas.
+    geojson = json.loads(Path(origen).read_text(encoding='utf-8'))
+    Path(raiz).mkdir(parents=True, exist_ok=True)
+    rutas = []
+    for detalle in NIVELES_DETALLE:
+        ruta = ruta_geojson(nombre, detalle, raiz)
+        temporal = ruta.with_name(f'.{ruta.name}.tmp-{os.getpid()}')
+        simplificado = simplificar_geojson(geojson, detalle, prop_pais, prop_provincia)
+        temporal.write_text(json.dumps(simplificado, separators=(',', ':'), ensure_ascii=False), encoding='utf-8')
+        os.replace(temporal, ruta)
+        rutas.append(ruta)
+    return rutas
+
+
+def geojson_disponibles(raiz=DIRECTORIO_GEO):
+    # Nombres de los GeoJSON de provincias ya preparados (los que tienen todos los niveles de detalle).
+    raiz = Path(raiz)
+    if not raiz.is_dir():
+        return []
+    nombres = {r.name.rsplit('-', 1)[0] for r in raiz.glob('*.geojson')}
+    return sorted(n for n in nombres if all(ruta_geojson(n, d, raiz).exists() for d in NIVELES_DETALLE))
+
+
+@functools.lru_cache(maxsize=8)
+def cargar_geojson(nombre, detalle, raiz=DIRECTORIO_GEO):
+    # GeoJSON simplificado de un nivel de detalle, leído una vez por proceso.
+    return json.loads(ruta_geojson(nombre, detalle, raiz).read_text(encoding='utf-8'))
+
+
+def paises_geojson(geojson):
+    # Países cubiertos por un GeoJSON de provincias.
+    return {e['properties']['Country_Region'] for e in geojson['features']}
+
+
+def figura_provincias(tabla, geojson, metrica='Confirmed', titulo=None):
+    # Coropletas de las provincias de 'tabla' (salida de CuboJerarquico.desglose) sobre el GeoJSON local.
+    import plotly.express as px
+
+    ids = tabla['Country_Region'].astype(str) + SEPARADOR + tabla['Province_State'].astype(str)
+    fig = px.choropleth(
+        tabla.assign(id=ids.to_numpy()),
+        geojson=geojson,
+        locations='id',                    # Coincide con el 'id' de cada entidad del GeoJSON.
+        color=metrica,
+        hover_name='Province_State',
+        color_continuous_scale=px.colors.sequential.Plasma,
+        title=titulo
+    )
+    # Encuadra el mapa en las provincias dibujadas y oculta el resto del mundo.
+    fig.update_geos(fitbounds='locations', visible=False)
+    return fig.to_dict()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Simplifica un GeoJSON de provincias en varios niveles de detalle para el dashboard.')
+    parser.add_argument('origen', help='GeoJSON de entrada (Polygon/MultiPolygon por provincia).')
+    parser.add_argument('--nombre', required=True, help='Nombre del conjunto (los archivos serán <nombre>-<detalle>.geojson).')
+    parser.add_argument('--prop-pais', required=True, help='Propiedad con el país, escrito como en Country_Region de JHU.')
+    parser.add_argument('--prop-provincia', required=True, help='Propiedad con la provincia, escrita como en Province_State de JHU.')
+    parser.add_argument('--out', default=str(DIRECTORIO_GEO))
+    args = parser.parse_args()
+
+    for ruta in preparar_geojson(args.origen, args.nombre, args.prop_pais, args.prop_provincia, args.out):
+        print(f'{ruta} ({ruta.stat().st_size / 1024:.1f} KB)')
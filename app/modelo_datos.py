@@ -0,0 +1,155 @@
+# Modelo de datos en memoria compartido por todas las páginas.
+# load_data() devuelve un objeto DatosCovid con los DataFrames ya compactados (columnas de texto
+# categóricas, números con el dtype más pequeño posible) y con índices precalculados, para que
+# cada interacción sea una búsqueda por posición en lugar de un filtrado con máscara booleana.
+import numpy as np
+import pandas as pd
+
+from jerarquia import SIN_DESGLOSE, CuboJerarquico
+
+# Columnas de conteo: se reducen a enteros pequeños si no tienen nulos.
+COLUMNAS_CONTEO = ['Confirmed', 'Deaths', 'Recovered', 'Active']
+# Métricas con índice de orden precalculado (Top N y filtros por umbral).
+METRICAS_RANKING = ['Confirmed', 'Deaths', 'Recovered', 'Active', 'CFR']
+
+
+def compactar(df):
+    # Devuelve una copia con texto categórico y números reducidos (int32/float32 cuando es posible).
+    df = df.copy()
+    for columna in df.columns:
+        serie = df[columna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            continue
+        if not pd.api.types.is_numeric_dtype(serie):
+            df[columna] = serie.astype('category')
+        elif columna in COLUMNAS_CONTEO:
+            # Los conteos solo se reducen si son enteros exactos; con nulos se dejan en float64
+            # para no perder precisión en totales grandes.
+            if serie.notna().all() and (serie % 1 == 0).all():
+                df[columna] = pd.to_numeric(serie.astype(np.int64), downcast='integer')
+        elif pd.api.types.is_float_dtype(serie):
+            # Coordenadas, tasas y CFR toleran float32 sin problema.
+            df[columna] = serie.astype(np.float32)
+    return df
+
+
+def tabla_por_pais(jerarquia):
+    # Tabla por país (Country_Region, Confirmed, Deaths, Recovered, Active, CFR) tomada del cubo jerárquico,
+    # que ya sumó las métricas por país en la misma pasada que provincias y condados.
+    df_pais = jerarquia.nivel('Country_Region')
+    # Descarta las filas sin país (en un groupby('Country_Region') se habrían descartado igual).
+    df_pais = df_pais[df_pais['Country_Region'] != SIN_DESGLOSE]
+    df_pais = df_pais[['Country_Region'] + COLUMNAS_CONTEO + ['CFR']].reset_index(drop=True)
+    df_pais['Country_Region'] = df_pais['Country_Region'].astype('category')
+    return df_pais
+
+
+class IndiceRanking:
+    # Orden precalculado de las filas de una tabla para cada métrica (se construye una vez por instantánea).
+    # Top N pasa a ser un corte del array de orden y el filtro por umbral una búsqueda binaria.
+
+    def __init__(self, df, metricas=METRICAS_RANKING):
+        self.orden_desc = {}
+        self.valores_asc = {}
+        self.orden_asc = {}
+        for metrica in metricas:
+            valores = df[metrica].to_numpy(dtype=np.float64)
+            validos = ~np.isnan(valores)
+            # Orden descendente estable (en empates gana la fila anterior, igual que nlargest); los NaN
+            # quedan al final, en su orden original, y como en nlargest solo salen si n supera a los válidos.
+            self.orden_desc[metrica] = np.argsort(-valores, kind='stable')
+            # Orden ascendente de los valores válidos, para búsquedas binarias por umbral.
+            asc = np.flatnonzero(validos)[np.argsort(valores[validos], kind='stable')]
+            self.orden_asc[metrica] = asc
+            self.valores_asc[metrica] = valores[asc]
+
+    def top_n(self, metrica, n):
+        # Posiciones de las n filas con mayor valor de la métrica (equivale a nlargest).
+        return self.orden_desc[metrica][:n]
+
+    def sobre_umbral(self, metrica, umbral):
+        # Posiciones de las filas con métrica >= umbral, mediante búsqueda binaria.
+        inicio = np.searchsorted(self.valores_asc[metrica], umbral, side='left')
+        return self.orden_asc[metrica][inicio:]
+
+
+class DatosCovid:
+    # Conjunto de datos indexado: reporte crudo, tabla por país e índices para búsquedas rápidas.
+
+    def __init__(self, df_raw, id_snapshot=None):
+        # Identificador de la instantánea de origen; sirve como clave barata de caché.
+        self.id_snapshot = id_snapshot or df_raw.attrs.get('snapshot', '')
+        self.raw = compactar(df_raw)
+        # Cubo jerárquico condado → provincia → país → global, calculado una sola vez.
+        self.jerarquia = CuboJerarquico(self.raw)
+        self.paises = compactar(tabla_por_pais(self.jerarquia))
+        # Orden de los países por cada métrica, para Top N y filtros por umbral.
+        self.ranking = IndiceRanking(self.paises)
+        # Lista de países ordenada, lista para usarse como opciones de los widgets.
+        self.opciones_paises = sorted(self.paises['Country_Region'].astype(str))
+        # País → posición de su fila en self.paises.
+        self.posicion = {pais: i for i, pais in enumerate(self.paises['Country_Region'].astype(str))}
+        # País → posiciones de sus filas en el reporte crudo (provincias, condados...).
+        codigos = self.raw['Country_Region'].cat.codes.to_numpy()
+        orden = np.argsort(codigos, kind='stable')
+        cortes = np.searchsorted(codigos[orden], np.arange(len(self.raw['Country_Region'].cat.categories) + 1))
+        self.filas_raw = {
+            str(pais): orden[cortes[i]:cortes[i + 1]]
+            for i, pais in enumerate(self.raw['Country_Region'].cat.categories)
+        }
+
+    def fila(self, pais):
+        # Fila de un país en la tabla por país (como Series).
+        return self.paises.iloc[self.posicion[pais]]
+
+    def filas(self, paises):
+        # Filas de varios países, en el orden pedido; los nombres desconocidos se ignoran.
+        posiciones = [self.posicion[p] for p in paises if p in self.posicion]
+        return self.paises.iloc[posiciones]
+
+    def top_n(self, metrica, n):
+        # Los n países con mayor valor de la métrica, sin reordenar la tabla.
+        return self.paises.iloc[self.ranking.top_n(metrica, n)]
+
+    def filtrar(self, paises, metrica, umbral):
+        # Países de la lista cuya métrica es >= umbral, conservando el orden de la lista.
+        sobre = np.zeros(len(self.paises), dtype=bool)
+        sobre[self.ranking.sobre_umbral(metrica, umbral)] = True
+        posiciones = [self.posicion[p] for p in paises if p in self.posicion and sobre[self.posicion[p]]]
+        return self.paises.iloc[posiciones]
+
+    def raw_de_pais(self, pais):
+        # Filas del reporte crudo que pertenecen a un país.
+        return self.raw.iloc[self.filas_raw.get(pais, np.array([], dtype=np.int64))]
+
+    def indice_opcion(self, pais, por_defecto=0):
+        # Posición de un país en opciones_paises (para el 'index' de un selectbox).
+        try:
+            return self.opciones_paises.index(pais)
+        except ValueError:
+            return por_defecto
+
+
+def memoria_sin_compactar(df):
+    # Memoria que ocuparía el DataFrame con texto como objetos de Python y números en 64 bits.
+    tipos = {}
+    for columna in df.columns:
+        serie = df[columna]
+        if isinstance(serie.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(serie):
+            tipos[columna] = object
+        elif pd.api.types.is_integer_dtype(serie):
+            tipos[columna] = np.int64
+        else:
+            tipos[columna] = np.float64
+    return int(df.astype(tipos).memory_usage(deep=True).sum())
+
+
+def reporte_memoria(datos):
+    # Tabla comparativa de memoria: DataFrames con objetos de Python frente a los compactados.
+    filas = []
+    for nombre, df in [('Reporte crudo', datos.raw), ('Tabla por país', datos.paises)]:
+        original = memoria_sin_compactar(df)
+        compacto = int(df.memory_usage(deep=True).sum())
+        filas.append({'Tabla': nombre, 'Original (KB)': original / 1024, 'Compacto (KB)': compacto / 1024,
+                      'Reducción (%)': 100 * (1 - compacto / original) if original else 0.0})
+    return pd.DataFrame(filas).round(1)
@@ -2,19 +2,36 @@
 import streamlit as st          # Para crear la interfaz web interactiva.
 import pandas as pd             # Para la manipulación y análisis de datos.
 import plotly.express as px     # Para crear gráficos interactivos y de alta calidad.
-import numpy as np              # Para operaciones numéricas, especialmente la generación de datos aleatorios.
 
-# CORRECCIÓN: Ahora se importa directamente desde app.py, que está en el directorio padre.
-# Esto permite que todas las páginas usen la misma función de carga de datos cacheada.
-from Pagina_Principal import load_data
+# Importa la función 'load_data' desde el módulo de datos 'datos.py', que no tiene efectos secundarios
+# (importar 'Pagina_Principal.py' volvería a ejecutar toda la página principal).
+# Esto permite que todas las páginas usen los mismos datos cacheados.
+from datos import load_data
+# Importa el reporte de memoria del conjunto de datos indexado.
+from modelo_datos import reporte_memoria
+# Importa la lectura de artefactos precalculados y el cálculo del histograma (para cuando no exista).
+from artefactos import leer_artefacto
+from precalculo import histograma_cfr
+# Importa el perfilador de calidad (reglas de validación por fila y perfil del archivo completo).
+from calidad import REGLAS, perfilar, perfilar_historico
+# Importa el cubo país × fecha (cargado una sola vez por versión) y el detector de anomalías en flujo.
+from datos import load_cubo
+from anomalias import detectar_anomalias
+# Importa la instrumentación opcional (tiempos por rerun y aciertos de caché).
+from cache_acotada import cache_acotada  # Caché en memoria acotada (LRU por bytes, caduca con la instantánea).
+from instrumentacion import iniciar_rerun, instrumentar_cache, panel_depuracion
+
+# Abre el registro de tiempos de este rerun (no hace nada si la instrumentación está desactivada).
+iniciar_rerun('Calidad_Datos')
 
 # Configura las propiedades iniciales de la página web.
 st.set_page_config(page_title="Calidad de Datos", layout="wide")
 # Muestra el título principal de la página.
 st.title("Análisis de Calidad de Datos")
 
-# Llama a la función para cargar los datos crudos y los datos agrupados por país.
-df_raw, df_country = load_data()
+# Llama a la función para cargar el conjunto de datos indexado y toma los datos crudos y los agrupados por país.
+datos = load_data()
+df_raw, df_country = datos.raw, datos.paises
 
 # Encabezado para la primera sección de la página.
 st.header("Análisis de Valores Nulos y Consistencia")
@@ -27,46 +44,118 @@ st.dataframe(null_counts[null_counts > 0])
 # Muestra un cuadro de información con una interpretación de los resultados.
 st.info("La columna 'CFR' (Case_Fatality_Ratio) es la que presenta más valores nulos, probablemente por divisiones entre cero o datos no reportados.")
 
+# Sub-encabezado para las reglas de validación.
+st.subheader("Reglas de Validación del Reporte")
+
+
+# Aplica todas las reglas al reporte crudo en una sola pasada vectorizada (una vez por instantánea).
+@instrumentar_cache(cache_acotada())
+def perfilar_reporte(_datos, id_snapshot):
+    return perfilar(_datos.raw)
+
+
+resumen_reglas, marcas = perfilar_reporte(datos, datos.id_snapshot)
+# Muestra cuántas filas incumplen cada regla.
+st.dataframe(pd.DataFrame({'Regla': list(REGLAS.values()), 'Filas': [resumen_reglas['reglas'][r] for r in REGLAS]}), hide_index=True)
+# Permite ver las filas que incumplen una regla concreta.
+regla = st.selectbox("Ver filas que incumplen:", options=list(REGLAS), format_func=REGLAS.get)
+st.dataframe(df_raw[marcas[regla].to_numpy()])
+
+# Perfil del archivo completo de reportes diarios: los archivos ya perfilados se leen de la caché.
+if st.button("Perfilar todos los reportes diarios de data/raw"):
+    with st.spinner("Perfilando reportes..."):
+        df_historico = perfilar_historico()
+    st.dataframe(df_historico, hide_index=True)
+
+# Muestra cuánta memoria ahorra el conjunto de datos compacto frente a DataFrames con objetos de Python.
+with st.expander("Uso de memoria de los datos cargados"):
+    st.dataframe(reporte_memoria(datos))
+
 # Sub-encabezado para el histograma.
 st.subheader("Distribución de la Tasa de Mortalidad (CFR)")
-# Crea una figura de histograma para visualizar cómo se distribuyen los valores de CFR entre los países.
-fig_hist_cfr = px.histogram(df_country, x='CFR', nbins=50, title="Histograma de la Tasa de Mortalidad por País")
+# Toma los intervalos y conteos del histograma precalculado (o los calcula si no hay artefacto).
+histograma = leer_artefacto(datos.id_snapshot, 'histograma_cfr') or histograma_cfr(datos)
+bordes = histograma['bordes']
+# Crea una figura de barras con un intervalo por barra, que es la misma vista que un histograma.
+fig_hist_cfr = px.bar(x=(bordes[:-1] + bordes[1:]) / 2, y=histograma['conteos'],
+                      labels={'x': 'CFR', 'y': 'count'}, title="Histograma de la Tasa de Mortalidad por País")
+# Las barras ocupan todo el ancho de su intervalo, sin huecos entre ellas.
+fig_hist_cfr.update_traces(width=bordes[1] - bordes[0])
 # Muestra el gráfico en la aplicación, haciendo que ocupe todo el ancho disponible.
 st.plotly_chart(fig_hist_cfr, use_container_width=True)
 
-# --- 2.5: Gráfico de Control (Simulado) ---
+# --- 2.5: Gráfico de Control ---
 # Encabezado para la sección del gráfico de control.
 st.header("Gráfico de Control para Detección de Anomalías")
-# Muestra una advertencia indicando que los datos son simulados.
-st.warning("Esta sección es una demostración conceptual.")
 # Muestra un cuadro de información explicando el propósito de un gráfico de control.
 st.info("""
-Un gráfico de control se usaría sobre una serie de tiempo (ej. muertes diarias) para detectar puntos que se desvían más de 3 desviaciones estándar de la media móvil, indicando posibles anomalías en los reportes.
+El gráfico de control se aplica sobre la serie diaria de cada país y marca los días que se desvían más de 3 desviaciones estándar de la media móvil de 7 días anterior, además de las alertas EWMA y CUSUM, que detectan cambios más sostenidos.
 """)
 
-# Simulación de datos para el gráfico.
-# Crea un rango de 49 fechas consecutivas empezando desde el 1 de marzo de 2022.
-dias = pd.date_range(start="2022-03-01", periods=49)
-# Genera 49 números enteros aleatorios entre 50 y 150 para simular las muertes diarias.
-muertes_diarias = np.random.randint(50, 150, size=49)
-# Introduce manualmente un valor atípico (anomalía) en el día 21 para demostrar cómo lo detectaría el gráfico.
-muertes_diarias[20] = 300 # Anomalía
-# Crea un DataFrame de pandas con las fechas y los datos de muertes simuladas.
-df_control = pd.DataFrame({'Fecha': dias, 'Muertes Diarias': muertes_diarias})
-# Calcula la media móvil de 7 días para suavizar la tendencia de los datos.
-df_control['Media Móvil'] = df_control['Muertes Diarias'].rolling(window=7).mean()
-# Calcula el límite de control superior (media móvil + 3 desviaciones estándar móviles).
-df_control['Límite Superior'] = df_control['Media Móvil'] + 3 * df_control['Muertes Diarias'].rolling(window=7).std()
-# Calcula el límite de control inferior (media móvil - 3 desviaciones estándar móviles).
-df_control['Límite Inferior'] = df_control['Media Móvil'] - 3 * df_control['Muertes Diarias'].rolling(window=7).std()
-
-# Crea la figura base del gráfico de control con una línea para las muertes diarias.
-fig_control = px.line(df_control, x='Fecha', y='Muertes Diarias', title="Gráfico de Control Simulado de Muertes Diarias")
+
+# Actualiza el detector solo con los días nuevos del cubo (el estado se guarda en disco).
+# La clave es (versión del cubo, métrica): al publicarse un día nuevo se procesa solo ese día.
+# El historial cuenta en el límite de bytes de la caché acotada y las versiones viejas salen por LRU.
+@instrumentar_cache(cache_acotada())
+def obtener_anomalias(_cubo, version_cubo, metrica):
+    if not _cubo.paises:
+        return None
+    return detectar_anomalias(_cubo, metrica)
+
+
+# Crea dos columnas para los selectores de métrica y país.
+col_metrica, col_pais = st.columns(2)
+# Selector de la métrica a vigilar.
+metrica_control = col_metrica.selectbox("Serie diaria:", options=['Deaths', 'Confirmed'],
+                                        format_func=lambda m: 'Muertes diarias' if m == 'Deaths' else 'Casos diarios')
+cubo = load_cubo()
+resultado = obtener_anomalias(cubo, cubo.version, metrica_control)
+
+# Si todavía no se ha ingerido el archivo de reportes diarios, no hay series que vigilar.
+if resultado is None:
+    st.warning("No hay series temporales disponibles. Ejecuta `python app/ingesta.py` con los reportes diarios en data/raw/.")
+    st.stop()
+
+paises_control, fechas_control, historial = resultado
+# Selector del país, con Perú por defecto si está disponible.
+opciones_control = sorted(paises_control)
+pais_control = col_pais.selectbox("País:", options=opciones_control,
+                                  index=opciones_control.index('Peru') if 'Peru' in opciones_control else 0)
+fila = paises_control.index(pais_control)
+
+# Crea un DataFrame con la serie del país elegido y sus límites de control.
+df_control = pd.DataFrame({
+    'Fecha': pd.DatetimeIndex(fechas_control),
+    'Valor Diario': historial['valor'][fila],
+    'Media Móvil': historial['media'][fila],
+    'Límite Superior': historial['limite_superior'][fila],
+    'Límite Inferior': historial['limite_inferior'][fila],
+})
+# Días marcados como anomalía por el criterio de 3 sigmas.
+anomalias_sigma = df_control[historial['alerta_sigma'][fila]]
+
+# Crea la figura base del gráfico de control con una línea para la serie diaria.
+fig_control = px.line(df_control, x='Fecha', y='Valor Diario', title=f"Gráfico de Control de {pais_control}")
 # Añade la línea de la media móvil al gráfico.
-fig_control.add_scatter(x=dias, y=df_control['Media Móvil'], mode='lines', name='Media Móvil')
+fig_control.add_scatter(x=df_control['Fecha'], y=df_control['Media Móvil'], mode='lines', name='Media Móvil')
 # Añade la línea del límite superior, punteada y de color rojo.
-fig_control.add_scatter(x=dias, y=df_control['Límite Superior'], mode='lines', name='Límite Superior', line=dict(dash='dash', color='red'))
+fig_control.add_scatter(x=df_control['Fecha'], y=df_control['Límite Superior'], mode='lines', name='Límite Superior', line=dict(dash='dash', color='red'))
 # Añade la línea del límite inferior, punteada y de color rojo.
-fig_control.add_scatter(x=dias, y=df_control['Límite Inferior'], mode='lines', name='Límite Inferior', line=dict(dash='dash', color='red'))
+fig_control.add_scatter(x=df_control['Fecha'], y=df_control['Límite Inferior'], mode='lines', name='Límite Inferior', line=dict(dash='dash', color='red'))
+# Marca las anomalías con puntos rojos.
+fig_control.add_scatter(x=anomalias_sigma['Fecha'], y=anomalias_sigma['Valor Diario'], mode='markers', name='Anomalía (3σ)', marker=dict(color='red', size=10))
 # Muestra el gráfico completo en la aplicación.
 st.plotly_chart(fig_control, use_container_width=True)
+
+# Resumen de alertas para todos los países en los últimos 30 días (ya calculadas en la misma pasada).
+st.subheader("Alertas de los Últimos 30 Días por País")
+df_alertas = pd.DataFrame({
+    'País': paises_control,
+    'Alertas 3σ': historial['alerta_sigma'][:, -30:].sum(axis=1),
+    'Alertas EWMA': historial['alerta_ewma'][:, -30:].sum(axis=1),
+    'Alertas CUSUM': historial['alerta_cusum'][:, -30:].sum(axis=1),
+}).sort_values('Alertas 3σ', ascending=False)
+st.dataframe(df_alertas[df_alertas.iloc[:, 1:].sum(axis=1) > 0], hide_index=True)
+
+# Cierra el registro de tiempos del rerun y muestra el panel de depuración (si está activo).
+panel_depuracion()
@@ -2,52 +2,60 @@
 import streamlit as st  # Para crear la interfaz web.
 import pandas as pd     # Para la manipulación de datos.
 import plotly.express as px # Para crear gráficos interactivos.
-from sklearn.preprocessing import StandardScaler # Para estandarizar los datos (muy importante para PCA y K-means).
-from sklearn.decomposition import PCA          # Para el Análisis de Componentes Principales (reducir dimensiones).
-from sklearn.cluster import KMeans             # Para el algoritmo de clustering K-means.
 
-# Importa la función 'load_data' desde el archivo principal 'Pagina_Principal.py'.
+# Importa la función 'load_data' desde el módulo de datos 'datos.py', que no tiene efectos secundarios
+# (importar 'Pagina_Principal.py' volvería a ejecutar toda la página principal).
 # Esto permite que todas las páginas usen los mismos datos cacheados.
-from Pagina_Principal import load_data
+from datos import load_cubo, load_data
+# Importa la lectura de artefactos precalculados y el motor de clustering (para cuando no exista el artefacto).
+from artefactos import leer_artefacto
+from segmentacion import CARACTERISTICAS, barrido_clustering
+# Importa el índice de trayectorias similares (vecinos exactos en un árbol, con reordenamiento DTW opcional).
+from similitud import VENTANA_POR_DEFECTO, VENTANAS, construir_indice, consultar, leer_indice, poblaciones
+# Importa la instrumentación opcional (tiempos por rerun y aciertos de caché).
+from cache_acotada import cache_acotada  # Caché en memoria acotada (LRU por bytes, caduca con la instantánea).
+from instrumentacion import iniciar_rerun, instrumentar_cache, medir, panel_depuracion
+
+# Abre el registro de tiempos de este rerun (no hace nada si la instrumentación está desactivada).
+iniciar_rerun('Clustering_PCA')
 
 # Configura las propiedades de la página, como el título en la pestaña del navegador y el layout.
 st.set_page_config(page_title="Clustering y PCA", layout="wide")
 # Muestra el título principal de la página.
 st.title("Segmentación de Países y Reducción de Dimensionalidad")
 
-# Llama a la función para cargar los datos crudos y los datos agrupados por país.
-df_raw, df_country = load_data()
+# Llama a la función para cargar el conjunto de datos indexado y toma los datos crudos y los agrupados por país.
+datos = load_data()
+df_raw, df_country = datos.raw, datos.paises
 
 # --- 4.1 y 4.2: K-means y PCA ---
 # Encabezado para la sección de clustering.
 st.header("Clustering de Países con K-means y PCA")
 # Define la lista de características (columnas) que se usarán para el análisis.
-features = ['Confirmed', 'Deaths', 'Recovered', 'Active', 'CFR']
-# Crea una copia del DataFrame, eliminando las filas que tengan valores nulos en las columnas seleccionadas.
-# .copy() se usa para evitar advertencias de pandas al modificar el DataFrame más adelante.
-df_cluster = df_country.dropna(subset=features).copy()
-# Crea un DataFrame que contiene solo las columnas de características para el modelado.
-df_cluster_features = df_cluster[features]
-
-# Escala los datos para que todas las características tengan la misma importancia (media 0, desviación estándar 1).
-scaler = StandardScaler() # Crea una instancia del escalador.
-scaled_features = scaler.fit_transform(df_cluster_features) # Ajusta y transforma los datos.
-
-# Aplica el Análisis de Componentes Principales (PCA) para reducir la dimensionalidad.
-# Crea un slider para que el usuario elija cuántas "super-variables" (componentes) quiere generar.
+features = CARACTERISTICAS
+
+
+# Obtiene el barrido completo de clustering y PCA para esta instantánea: se lee de los artefactos
+# precalculados o, si no existen, se calcula una sola vez (escalado, PCA y K-means para cada k).
+@instrumentar_cache(cache_acotada())
+def obtener_barrido(_datos, id_snapshot):
+    return leer_artefacto(id_snapshot, 'clustering') or barrido_clustering(_datos)
+
+
+barrido = obtener_barrido(datos, datos.id_snapshot)
+# Países y características usados en el clustering (los que no tienen valores nulos).
+df_cluster = barrido['caracteristicas'].copy()
+df_cluster['Country_Region'] = barrido['paises']
+
+# Crea un slider para que el usuario elija cuántas "super-variables" (componentes) quiere ver.
 n_components = st.slider("Número de Componentes Principales (PCA):", 2, 5, 2)
-pca = PCA(n_components=n_components) # Crea una instancia de PCA con el número de componentes elegido.
-principal_components = pca.fit_transform(scaled_features) # Aplica PCA a los datos escalados.
-# Crea un nuevo DataFrame con los resultados de PCA.
-df_pca = pd.DataFrame(data=principal_components, columns=[f'PC{i+1}' for i in range(n_components)])
+# Crea un nuevo DataFrame con los resultados de PCA (las primeras n columnas del PCA completo).
+df_pca = pd.DataFrame(data=barrido['pca'][n_components], columns=[f'PC{i+1}' for i in range(n_components)])
 
-# Aplica el algoritmo K-means para agrupar los países en clusters.
 # Crea un slider para que el usuario elija cuántos grupos (clusters) quiere encontrar.
 n_clusters = st.slider("Número de Clusters (K-means):", 2, 10, 4)
-# Crea una instancia de K-means. random_state asegura que los resultados sean reproducibles.
-kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-# Aplica K-means a los datos escalados y añade la etiqueta del cluster a cada país en el DataFrame.
-df_cluster['Cluster'] = kmeans.fit_predict(scaled_features)
+# Toma las etiquetas de K-means ya calculadas para ese número de clusters y las añade a cada país.
+df_cluster['Cluster'] = barrido['etiquetas'][n_clusters]
 # Añade la columna de clusters al DataFrame de PCA para poder colorear el gráfico.
 df_pca['Cluster'] = df_cluster['Cluster']
 # Añade la columna de nombres de países al DataFrame de PCA para mostrarla en el gráfico.
@@ -67,6 +75,15 @@ fig_pca = px.scatter(
 # Muestra el gráfico en la aplicación.
 st.plotly_chart(fig_pca, use_container_width=True)
 
+# --- Elección del Número de Clusters ---
+# Encabezado para la sección del método del codo.
+st.header("Método del Codo y Coeficiente de Silueta")
+# Las métricas de cada k ya vienen del barrido, así que la gráfica no requiere ajustes adicionales.
+fig_codo = px.line(barrido['metricas'], x='k', y='Inercia', markers=True, title="Inercia de K-means según el número de clusters")
+st.plotly_chart(fig_codo, use_container_width=True)
+fig_silueta = px.line(barrido['metricas'], x='k', y='Silueta', markers=True, title="Coeficiente de silueta según el número de clusters")
+st.plotly_chart(fig_silueta, use_container_width=True)
+
 # --- 4.3: Interpretación de Clusters ---
 # Encabezado para la sección de interpretación.
 st.header("Interpretación de los Clusters")
@@ -81,3 +98,39 @@ st.info("""
 - **Cluster 1:** Países con bajo volumen general de casos.
 - **Cluster 2:** Países con una alta tasa de fatalidad (CFR) en comparación con su número de casos.
 """)
+
+# --- Países con Trayectoria Similar ---
+# El clustering de arriba usa una sola fecha; aquí se comparan las curvas de casos y fallecidos por
+# habitante de los últimos meses. El índice de cada ventana se lee de data/similitud (app/similitud.py)
+# o, si no existe, se construye una vez por versión del cubo e instantánea.
+@instrumentar_cache(cache_acotada())
+def obtener_indice(_cubo, version_cubo, _datos, id_snapshot, ventana):
+    indice = leer_indice(version_cubo, id_snapshot, ventana)
+    return indice if indice is not None else construir_indice(_cubo, poblaciones(_datos.raw), ventana)
+
+
+cubo = load_cubo()
+if cubo.paises:
+    st.header("Países con Trayectoria Similar")
+    col1, col2, col3 = st.columns(3)
+    ventana = col1.selectbox("Ventana (días):", options=VENTANAS, index=VENTANAS.index(VENTANA_POR_DEFECTO))
+    indice = obtener_indice(cubo, cubo.version, datos, datos.id_snapshot, ventana)
+    paises_indice = sorted(indice['paises'])
+    pais_similar = col2.selectbox("País:", options=paises_indice,
+                                  index=paises_indice.index('Peru') if 'Peru' in paises_indice else 0)
+    k_similares = col3.slider("Países similares:", 1, 10, 5)
+    reordenar_dtw = st.checkbox("Reordenar por DTW (tolera olas desfasadas unos días)")
+    if paises_indice:
+        with medir('similitud'):
+            similares = consultar(indice, pais_similar, k_similares, reordenar_dtw)
+        st.dataframe(similares)
+        # Curvas de casos nuevos por 100.000 habitantes del país elegido y de sus vecinos.
+        elegidos = [pais_similar, *similares['País']]
+        filas = [indice['posicion'][p] for p in elegidos]
+        df_similares = pd.DataFrame(indice['curvas']['Confirmed'][filas].T, columns=elegidos,
+                                    index=pd.DatetimeIndex(indice['fechas'], name='Fecha'))
+        fig_similares = px.line(df_similares, title=f"Casos nuevos por 100.000 habitantes (media de 7 días): {pais_similar} y similares")
+        st.plotly_chart(fig_similares, use_container_width=True)
+
+# Cierra el registro de tiempos del rerun y muestra el panel de depuración (si está activo).
+panel_depuracion()
@@ -2,26 +2,45 @@
 import streamlit as st  # Para crear la interfaz web.
 import pandas as pd     # Para la manipulación y análisis de datos.
 import plotly.express as px # Para crear gráficos interactivos.
-from scipy import stats # Específicamente para funciones estadísticas como los intervalos de confianza.
-import numpy as np      # Para operaciones numéricas, especialmente con arrays.
+import plotly.graph_objects as go  # Para las bandas de los intervalos de la tendencia.
 
-# Importa la función 'load_data' desde el archivo principal 'Pagina_Principal.py'.
+# Importa la función 'load_data' desde el módulo de datos 'datos.py', que no tiene efectos secundarios
+# (importar 'Pagina_Principal.py' volvería a ejecutar toda la página principal).
 # Esto permite que todas las páginas usen los mismos datos cacheados.
-from Pagina_Principal import load_data
+from datos import load_cubo, load_data
+# Importa la lista de correcciones por comparaciones múltiples del motor de CFR.
+from estadistica_cfr import CORRECCIONES
+# Importa la lectura de artefactos precalculados y las funciones que los generan (para cuando no existan).
+from artefactos import leer_artefacto
+from precalculo import describir, tabla_remuestreo_cfr, tablas_cfr
+# Importa el motor de remuestreo para la tendencia de la CFR (bootstrap y posterior Beta-Binomial).
+from remuestreo_cfr import VENTANA_TENDENCIA, tendencia_cfr
+# Importa la instrumentación opcional (tiempos por rerun y aciertos de caché).
+from cache_acotada import cache_acotada  # Caché en memoria acotada (LRU por bytes, caduca con la instantánea).
+from instrumentacion import iniciar_rerun, instrumentar_cache, medir, panel_depuracion
+
+# Abre el registro de tiempos de este rerun (no hace nada si la instrumentación está desactivada).
+iniciar_rerun('Estadistica')
 
 # Configura las propiedades de la página, como el título en la pestaña del navegador y el layout.
 st.set_page_config(page_title="Estadística Avanzada", layout="wide")
 # Muestra el título principal de la página.
 st.title("Estadística Descriptiva y Avanzada")
 
-# Llama a la función para cargar los datos crudos y los datos agrupados por país.
-df_raw, df_country = load_data()
+# Llama a la función para cargar el conjunto de datos indexado y toma los datos crudos y los agrupados por país.
+datos = load_data()
+df_raw, df_country = datos.raw, datos.paises
 
 # --- 2.1 y 2.4: Métricas y Detección de Outliers ---
 # Encabezado para la primera sección de análisis.
 st.header("Métricas Clave y Detección de Outliers")
 # Muestra una tabla con las estadísticas descriptivas (media, std, min, max, etc.) del DataFrame por país.
-st.dataframe(df_country.describe())
+# Si se ejecutó app/precalculo.py para esta instantánea, la tabla se lee ya calculada.
+with medir('describe'):
+    descripcion = leer_artefacto(datos.id_snapshot, 'describe')
+    if descripcion is None:
+        descripcion = describir(datos)
+st.dataframe(descripcion)
 
 # Sub-encabezado para la sección de boxplots.
 st.subheader("Boxplots para Detección de Outliers")
@@ -31,42 +50,75 @@ fig_box = px.box(df_country, y=['Confirmed', 'Deaths', 'Recovered', 'Active'],
 # Muestra el gráfico en la aplicación, haciendo que ocupe todo el ancho disponible.
 st.plotly_chart(fig_box, use_container_width=True)
 
+# --- Tablas Precalculadas ---
+# Intervalos de todos los países y tests de todos los pares: se leen de los artefactos precalculados
+# o, si no existen, se calculan una vez por instantánea.
+# Cualquier interacción posterior solo indexa estas tablas (no se filtra el DataFrame por país).
+# La clave de la caché es el identificador de la instantánea, no el DataFrame completo
+# (el guion bajo en '_datos' le indica a la caché que no lo use para la clave).
+@instrumentar_cache(cache_acotada())
+def calcular_tablas_cfr(_datos, id_snapshot, correccion):
+    tablas = leer_artefacto(id_snapshot, 'cfr') or tablas_cfr(_datos)
+    return tablas['intervalos'], tablas['z'], tablas['p_valor'], tablas['p_corregido'][correccion]
+
+
+# Intervalos por remuestreo (bootstrap y Beta-Binomial) de todos los países, también por instantánea.
+@instrumentar_cache(cache_acotada())
+def calcular_remuestreo(_datos, id_snapshot):
+    tabla = leer_artefacto(id_snapshot, 'cfr_remuestreo')
+    return tabla if tabla is not None else tabla_remuestreo_cfr(_datos)
+
+
+# CFR móvil de los países elegidos con sus intervalos, por versión del cubo.
+@instrumentar_cache(cache_acotada())
+def calcular_tendencia(_cubo, version_cubo, paises, ventana):
+    return tendencia_cfr(_cubo, list(paises), ventana, replicas=1000, procesos=1)
+
+
 # --- 2.2: Intervalos de Confianza ---
 # Encabezado para la sección de intervalos de confianza.
 st.header("Intervalos de Confianza para CFR")
+# Selector del método de corrección por comparaciones múltiples (se usa en la sección de tests).
+correccion = st.selectbox("Corrección por comparaciones múltiples:", options=CORRECCIONES)
+intervalos, z_pares, p_pares, p_pares_corregido = calcular_tablas_cfr(datos, datos.id_snapshot, correccion)
+# Los intervalos por remuestreo se añaden como columnas a la tabla analítica (mismo índice por país).
+intervalos = intervalos.join(calcular_remuestreo(datos, datos.id_snapshot))
+
 # Crea un widget de selección múltiple para que el usuario elija los países a analizar.
 countries_ic = st.multiselect("Selecciona países para calcular IC del CFR:",
-                              options=df_country['Country_Region'].unique(), default=['Peru', 'Mexico'])
+                              options=datos.opciones_paises, default=['Peru', 'Mexico'])
+# Permite mostrar la tabla completa de todos los países.
+todos_ic = st.checkbox("Mostrar todos los países")
 
 # Comprueba si el usuario ha seleccionado al menos un país.
-if countries_ic:
-    results = [] # Inicializa una lista vacía para guardar los resultados.
-    # Itera sobre cada país seleccionado por el usuario.
-    for country in countries_ic:
-        # Filtra el DataFrame para obtener solo los datos del país actual.
-        data = df_country[df_country['Country_Region'] == country]
-        # Extrae el número de casos confirmados. .iloc[0] selecciona el primer (y único) valor.
-        confirmed = data['Confirmed'].iloc[0]
-        # Extrae el número de fallecidos.
-        deaths = data['Deaths'].iloc[0]
-
-        # Se asegura de que el número de confirmados sea mayor que cero para evitar divisiones por cero.
-        if confirmed > 0:
-            # Calcula la proporción de muertes (p-hat), que es la estimación de la CFR.
-            p_hat = deaths / confirmed
-            # Calcula el error estándar de la proporción.
-            se = np.sqrt((p_hat * (1 - p_hat)) / confirmed)
-            # Calcula el intervalo de confianza del 95% para la proporción usando la distribución normal.
-            ci = stats.norm.interval(0.95, loc=p_hat, scale=se)
-            # Agrega un diccionario con los resultados formateados a la lista de resultados.
-            results.append({
-                'País': country,
-                'CFR (%)': f"{(p_hat * 100):.2f}",
-                'IC 95% Límite Inferior (%)': f"{(ci[0] * 100):.2f}",
-                'IC 95% Límite Superior (%)': f"{(ci[1] * 100):.2f}"
-            })
-    # Muestra los resultados en una tabla estática.
-    st.table(pd.DataFrame(results))
+if countries_ic or todos_ic:
+    # Toma las filas de la tabla precalculada (índice por país) y quita los países sin confirmados.
+    seleccion = intervalos if todos_ic else intervalos.loc[countries_ic]
+    # Convierte las proporciones a porcentajes con dos decimales para mostrarlas.
+    st.dataframe((seleccion.dropna() * 100).round(2).add_suffix(' (%)'))
+    st.caption("Bootstrap: percentiles de 4000 remuestreos de los casos. Bayes: posterior Beta con prior de "
+               "Jeffreys (media e intervalo de credibilidad). Con pocos casos son más fiables que Wald.")
+
+# --- Tendencia de la CFR ---
+# CFR móvil (fallecidos nuevos / confirmados nuevos en la ventana) de los países elegidos arriba,
+# con su intervalo bayesiano como banda. Necesita el cubo de series temporales.
+cubo = load_cubo()
+if countries_ic and cubo.paises:
+    st.subheader("Tendencia de la CFR")
+    ventana = st.slider("Ventana móvil (días):", min_value=7, max_value=90, value=VENTANA_TENDENCIA, step=7)
+    with medir('tendencia_cfr'):
+        tendencia = calcular_tendencia(cubo, cubo.version, tuple(countries_ic), ventana)
+    fig_tendencia = go.Figure()
+    for pais, serie in tendencia.groupby('País', sort=False):
+        # Banda: límite superior y luego el inferior rellenando hasta el anterior.
+        fig_tendencia.add_trace(go.Scatter(x=serie['Fecha'], y=serie['Bayes Superior'] * 100, mode='lines',
+                                           line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig_tendencia.add_trace(go.Scatter(x=serie['Fecha'], y=serie['Bayes Inferior'] * 100, mode='lines',
+                                           line=dict(width=0), fill='tonexty', showlegend=False, hoverinfo='skip'))
+        fig_tendencia.add_trace(go.Scatter(x=serie['Fecha'], y=serie['CFR'] * 100, mode='lines', name=pais))
+    fig_tendencia.update_layout(title=f"CFR móvil ({ventana} días) con intervalo bayesiano del 95%",
+                                yaxis_title="CFR (%)")
+    st.plotly_chart(fig_tendencia, use_container_width=True)
 
 # --- 2.3: Test de Hipótesis ---
 # Encabezado para la sección de test de hipótesis.
@@ -74,33 +126,23 @@ st.header("Test de Hipótesis para Comparar CFR")
 # Crea dos columnas para colocar los selectores de países uno al lado del otro.
 col1, col2 = st.columns(2)
 # Crea un selector en la primera columna para el País 1, con Perú como valor por defecto.
-country1 = col1.selectbox("Selecciona País 1:", options=df_country['Country_Region'].unique(), index=150)  # Peru
+country1 = col1.selectbox("Selecciona País 1:", options=datos.opciones_paises, index=datos.indice_opcion('Peru'))
 # Crea un selector en la segunda columna para el País 2, con México como valor por defecto.
-country2 = col2.selectbox("Selecciona País 2:", options=df_country['Country_Region'].unique(), index=122)  # Mexico
+country2 = col2.selectbox("Selecciona País 2:", options=datos.opciones_paises, index=datos.indice_opcion('Mexico'))
 
 # Comprueba si el usuario ha hecho clic en el botón para realizar el test.
 if st.button("Realizar Test de Hipótesis (CFR País 2 > CFR País 1)"):
-    # Importa la función necesaria para el test de proporciones desde la librería statsmodels.
-    from statsmodels.stats.proportion import proportions_ztest
-
-    # Filtra los datos para obtener la fila correspondiente al País 1.
-    data1 = df_country[df_country['Country_Region'] == country1]
-    # Filtra los datos para obtener la fila correspondiente al País 2.
-    data2 = df_country[df_country['Country_Region'] == country2]
-
-    # Crea un array de NumPy con el número de "éxitos" (muertes) para cada país.
-    count = np.array([data2['Deaths'].iloc[0], data1['Deaths'].iloc[0]])
-    # Crea un array de NumPy con el número de "observaciones" (casos confirmados) para cada país.
-    nobs = np.array([data2['Confirmed'].iloc[0], data1['Confirmed'].iloc[0]])
-
-    # Realiza el test Z para dos proporciones. 'alternative='larger'' especifica que es un test de una cola.
-    stat, pval = proportions_ztest(count, nobs, alternative='larger')
+    # El test ya está calculado: basta con leer la celda (País 2, País 1) de las matrices de pares.
+    pval = p_pares.loc[country2, country1]
+    pval_corregido = p_pares_corregido.loc[country2, country1]
 
     # Muestra las hipótesis del test en la aplicación.
     st.write(f"**Hipótesis Nula (H0):** CFR({country2}) <= CFR({country1})")
     st.write(f"**Hipótesis Alternativa (H1):** CFR({country2}) > CFR({country1})")
-    # Muestra el p-valor resultante en un formato de métrica.
-    st.metric("P-valor", f"{pval:.4f}")
+    # Muestra el p-valor resultante y el corregido por comparaciones múltiples en formato de métrica.
+    col1, col2 = st.columns(2)
+    col1.metric("P-valor", f"{pval:.4f}")
+    col2.metric(f"P-valor bilateral corregido ({correccion})", f"{pval_corregido:.4f}")
     # Comprueba si el p-valor es menor que el nivel de significancia (0.05).
     if pval < 0.05:
         # Si es menor, se rechaza la H0 y se muestra un mensaje de éxito.
@@ -108,3 +150,12 @@ if st.button("Realizar Test de Hipótesis (CFR País 2 > CFR País 1)"):
     else:
         # Si no es menor, no se puede rechazar la H0 y se muestra un mensaje de advertencia.
         st.warning("No se puede rechazar la hipótesis nula.")
+
+# Matriz (simétrica) de p-valores bilaterales corregidos para los pares de países seleccionados arriba.
+if len(countries_ic) > 1 and st.checkbox("Mostrar matriz de p-valores corregidos entre los países seleccionados"):
+    fig_pares = px.imshow(p_pares_corregido.loc[countries_ic, countries_ic], zmin=0, zmax=1,
+                          title="P-valores bilaterales corregidos (CFR distinta entre fila y columna)")
+    st.plotly_chart(fig_pares, use_container_width=True)
+
+# Cierra el registro de tiempos del rerun y muestra el panel de depuración (si está activo).
+panel_depuracion()
@@ -0,0 +1,87 @@
+# Precálculo sin interfaz de todos los artefactos que usan las páginas del dashboard.
+# Carga los datos una sola vez y escribe en una carpeta versionada por instantánea:
+# tabla por país, estadísticas descriptivas, tablas de CFR (intervalos y tests por pares),
+# intervalos de CFR por remuestreo (bootstrap y Beta-Binomial), barrido de clustering
+# (k = 2..10, en paralelo) con PCA (2..5 componentes) e histograma de la CFR.
+# Las páginas leen estos artefactos y, si no existen, llaman a estas mismas funciones.
+# Las páginas y la API los buscan en COVID_ARTIFACTS_DIR (por defecto data/artefactos); --out solo
+# cambia dónde se escriben, así que con otro directorio hay que servirlo con esa misma variable.
+#
+# Uso: python app/precalculo.py --fecha 04-18-2022 [--out data/artefactos]
+import numpy as np
+
+from almacen import FECHA_POR_DEFECTO, cargar_reporte
+from artefactos import DIRECTORIO_ARTEFACTOS, escribir_artefactos
+from estadistica_cfr import CORRECCIONES, intervalos_cfr, test_z_pares
+from modelo_datos import DatosCovid
+from remuestreo_cfr import intervalos_remuestreo
+from segmentacion import barrido_clustering
+
+# Número de intervalos del histograma de CFR.
+INTERVALOS_HISTOGRAMA = 50
+
+
+def describir(datos):
+    # Estadísticas descriptivas (media, std, min, max, cuartiles) de la tabla por país.
+    return datos.paises.describe()
+
+
+def tablas_cfr(datos):
+    # Intervalos de confianza de todos los países y tests Z de todos los pares,
+    # con el p-valor corregido para cada método de corrección disponible.
+    df = datos.paises
+    intervalos = intervalos_cfr(df['Country_Region'], df['Deaths'], df['Confirmed'])
+    corregidos = {}
+    for correccion in CORRECCIONES:
+        z, p_valor, corregidos[correccion] = test_z_pares(df['Country_Region'], df['Deaths'], df['Confirmed'], correccion)
+    return {'intervalos': intervalos, 'z': z, 'p_valor': p_valor, 'p_corregido': corregidos}
+
+
+def tabla_remuestreo_cfr(datos):
+    # Intervalos bootstrap y bayesianos de la CFR de todos los países (un solo lote: sin procesos).
+    df = datos.paises
+    return intervalos_remuestreo(df['Country_Region'], df['Deaths'], df['Confirmed'], procesos=1)
+
+
+def histograma_cfr(datos, intervalos=INTERVALOS_HISTOGRAMA):
+    # Conteos e intervalos del histograma de CFR por país (los países sin CFR se omiten).
+    valores = datos.paises['CFR'].dropna().to_numpy(dtype=np.float64)
+    conteos, bordes = np.histogram(valores, bins=intervalos)
+    return {'conteos': conteos, 'bordes': bordes}
+
+
+def calcular_artefactos(datos, procesos=-1, anteriores=None):
+    # Todos los artefactos de una instantánea, por nombre.
+    # 'procesos' se pasa al barrido de clustering (-1 = todos los núcleos). 'anteriores' son los
+    # artefactos de la instantánea previa (actualización diaria), que inician el clustering.
+    anterior = (anteriores or {}).get('clustering')
+    return {
+        'tabla_paises': datos.paises,
+        'describe': describir(datos),
+        'cfr': tablas_cfr(datos),
+        'cfr_remuestreo': tabla_remuestreo_cfr(datos),
+        'clustering': barrido_clustering(datos, procesos, anterior),
+        'histograma_cfr': histograma_cfr(datos),
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser(description='Precalcula los artefactos del dashboard para una fecha.')
+    parser.add_argument('--fecha', default=FECHA_POR_DEFECTO, help='Fecha del reporte (MM-DD-YYYY).')
+    parser.add_argument('--out', default=str(DIRECTORIO_ARTEFACTOS),
+                        help='Directorio raíz de artefactos (por defecto, el que leen las páginas: COVID_ARTIFACTS_DIR).')
+    parser.add_argument('--procesos', type=int, default=-1, help='Procesos para el barrido de clustering (-1 = todos).')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    datos = DatosCovid(cargar_reporte(args.fecha))
+    destino = escribir_artefactos(datos.id_snapshot, calcular_artefactos(datos, args.procesos), args.out)
+    print(f'{destino} ({time.perf_counter() - inicio:.1f} s)')
+    # Fuera del directorio que leen las páginas y la API, los artefactos no se usan hasta que se apunte a él.
+    if Path(args.out).resolve() != DIRECTORIO_ARTEFACTOS.resolve():
+        print(f'Aviso: las páginas y la API leen {DIRECTORIO_ARTEFACTOS}; para usar estos artefactos, '
+              f'arráncalas con COVID_ARTIFACTS_DIR={args.out}')
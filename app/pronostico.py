@@ -0,0 +1,225 @@
+# Subsistema de pronóstico por país para la página de Modelado Temporal.
+# Ajusta un modelo por país (Prophet, o ETS/ARIMA de statsmodels como alternativa barata)
+# sobre los casos nuevos diarios del cubo país × fecha. Los ajustes de muchos países se
+# reparten en un pool de procesos y cada resultado se guarda en disco con una clave
+# (país, modelo, parámetros, hash de datos), de modo que un cambio de widget nunca reajusta.
+import hashlib  # Para las claves de la caché en disco.
+import json     # Para serializar los parámetros de forma estable.
+import os       # Para reemplazos atómicos de archivos.
+import pickle   # Para guardar pronósticos y modelos ajustados.
+import warnings # Para silenciar los avisos de convergencia de statsmodels en los ajustes por lote.
+from concurrent.futures import ProcessPoolExecutor  # Para ajustar muchos países en paralelo.
+
+import numpy as np
+import pandas as pd
+
+from almacen import DIRECTORIO_DATOS
+from ingesta import cargar_cubo
+
+# Directorio de la caché de modelos y pronósticos.
+DIRECTORIO_MODELOS = DIRECTORIO_DATOS / 'modelos'
+
+# Modelos disponibles. 'prophet' cae a 'ets' si la librería no está instalada.
+MODELOS = ['ets', 'arima', 'prophet']
+
+# Parámetros por defecto de cada modelo.
+PARAMETROS_POR_DEFECTO = {
+    'ets': {'horizonte': 14, 'estacionalidad': 7},
+    'arima': {'horizonte': 14, 'orden': [2, 1, 2]},
+    'prophet': {'horizonte': 14},
+}
+
+
+def hash_serie(fechas, valores):
+    # Hash de los datos de entrada: si la serie cambia (nuevo día, corrección), cambia la clave.
+    h = hashlib.sha256()
+    h.update(np.asarray(fechas, dtype='datetime64[D]').tobytes())
+    h.update(np.asarray(valores, dtype=np.float64).tobytes())
+    return h.hexdigest()[:16]
+
+
+def clave_cache(pais, modelo, parametros, hash_datos):
+    # Clave estable para (país, modelo, parámetros, datos).
+    texto = json.dumps([pais, modelo, parametros, hash_datos], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:24]
+
+
+def leer_cache(clave):
+    ruta = DIRECTORIO_MODELOS / f'{clave}.pkl'
+    if not ruta.exists():
+        return None
+    with open(ruta, 'rb') as f:
+        return pickle.load(f)
+
+
+def escribir_cache(clave, resultado):
+    # Se escribe a un temporal y se renombra, para que un lector nunca vea un archivo a medias.
+    DIRECTORIO_MODELOS.mkdir(parents=True, exist_ok=True)
+    temporal = DIRECTORIO_MODELOS / f'.{clave}.tmp-{os.getpid()}'
+    with open(temporal, 'wb') as f:
+        pickle.dump(resultado, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporal, DIRECTORIO_MODELOS / f'{clave}.pkl')
+
+
+def formatear_pronostico(fechas, media, inferior, superior):
+    # Formato común de salida para todos los modelos.
+    return pd.DataFrame({
+        'Fecha': pd.DatetimeIndex(fechas),
+        'Pronóstico': np.clip(np.asarray(media, dtype=np.float64), 0, None),
+        'Límite Inferior': np.clip(np.asarray(inferior, dtype=np.float64), 0, None),
+        'Límite Superior': np.clip(np.asarray(superior, dtype=np.float64), 0, None),
+    })
+
+
+def ajustar_ets(serie, parametros):
+    # Suavizado exponencial (error y tendencia aditivos, tendencia amortiguada, estacionalidad semanal).
+    from statsmodels.tsa.exponential_smoothing.ets import ETSModel
+
+    horizonte = parametros['horizonte']
+    periodo = parametros.get('estacionalidad')
+    # La estacionalidad solo se usa si hay al menos dos ciclos completos de datos.
+    estacional = 'add' if periodo and len(serie) >= 2 * periodo else None
+    resultado = ETSModel(serie, error='add', trend='add', damped_trend=True, seasonal=estacional,
+                         seasonal_periods=periodo if estacional else None).fit(disp=False)
+    tabla = resultado.get_prediction(start=len(serie), end=len(serie) + horizonte - 1).summary_frame(alpha=0.05)
+    fechas = pd.date_range(serie.index[-1] + pd.Timedelta(days=1), periods=horizonte, freq='D')
+    return resultado, formatear_pronostico(fechas, tabla['mean'], tabla['pi_lower'], tabla['pi_upper'])
+
+
+def ajustar_arima(serie, parametros):
+    # ARIMA(p, d, q) con intervalos de predicción del 95%.
+    from statsmodels.tsa.arima.model import ARIMA
+
+    horizonte = parametros['horizonte']
+    resultado = ARIMA(serie, order=tuple(parametros['orden'])).fit()
+    tabla = resultado.get_forecast(horizonte).summary_frame(alpha=0.05)
+    fechas = pd.date_range(serie.index[-1] + pd.Timedelta(days=1), periods=horizonte, freq='D')
+    return resultado, formatear_pronostico(fechas, tabla['mean'], tabla['mean_ci_lower'], tabla['mean_ci_upper'])
+
+
+def ajustar_prophet(serie, parametros):
+    # Prophet con estacionalidad semanal. El modelo se guarda como JSON (su formato de serialización).
+    from prophet import Prophet
+    from prophet.serialize import model_to_json
+
+    horizonte = parametros['horizonte']
+    modelo = Prophet(weekly_seasonality=True, yearly_seasonality=False, daily_seasonality=False)
+    modelo.fit(pd.DataFrame({'ds': serie.index, 'y': serie.to_numpy()}))
+    futuro = modelo.make_future_dataframe(periods=horizonte, include_history=False)
+    tabla = modelo.predict(futuro)
+    return model_to_json(modelo), formatear_pronostico(tabla['ds'], tabla['yhat'], tabla['yhat_lower'], tabla['yhat_upper'])
+
+
+AJUSTADORES = {'ets': ajustar_ets, 'arima': ajustar_arima, 'prophet': ajustar_prophet}
+
+
+def serie_diaria(pais, fechas, valores):
+    # Serie con frecuencia diaria explícita. El cubo solo tiene las fechas con archivo: si el archivo
+    # de JHU se salta una fecha, el día siguiente trae los casos de los dos. Se interpola el acumulado
+    # sobre el calendario completo y se vuelve a diferenciar, así el salto se reparte entre los días
+    # del hueco (sin un día en cero seguido de uno doble).
+    valores = np.asarray(valores, dtype=np.float64)
+    acumulado = pd.Series(np.cumsum(valores), index=pd.DatetimeIndex(fechas))
+    calendario = pd.date_range(acumulado.index[0], acumulado.index[-1], freq='D')
+    nuevos = acumulado.reindex(calendario).interpolate(method='time').diff()
+    nuevos.iloc[0] = valores[0]
+    return nuevos.rename(pais)
+
+
+def ajustar_pais(tarea):
+    # Ajusta un país. Recibe una tupla para poder usarse directamente con pool.map.
+    # Devuelve (clave, resultado) con resultado = {'modelo', 'modelo_usado', 'ajuste', 'pronostico'}.
+    # Si el ajuste falla, resultado lleva 'error' (el mensaje) en lugar del pronóstico y no se guarda
+    # en la caché: un país problemático no detiene el lote y se reintenta en la próxima llamada.
+    clave, pais, modelo, parametros, fechas, valores = tarea
+    modelo_usado = modelo
+    try:
+        serie = serie_diaria(pais, fechas, valores)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            try:
+                ajuste, pronostico = AJUSTADORES[modelo](serie, parametros)
+            except ImportError:
+                # Prophet es opcional; sin él se usa ETS.
+                if modelo != 'prophet':
+                    raise
+                modelo_usado = 'ets'
+                ajuste, pronostico = ajustar_ets(serie, {**PARAMETROS_POR_DEFECTO['ets'], 'horizonte': parametros['horizonte']})
+    except Exception as e:
+        return clave, {'pais': pais, 'modelo': modelo, 'modelo_usado': modelo_usado, 'parametros': parametros,
+                       'error': f'{type(e).__name__}: {e}'}
+    resultado = {'pais': pais, 'modelo': modelo, 'modelo_usado': modelo_usado,
+                 'parametros': parametros, 'ajuste': ajuste, 'pronostico': pronostico}
+    escribir_cache(clave, resultado)
+    return clave, resultado
+
+
+def clave_pais(cubo, nuevos, pais, modelo, parametros, metrica):
+    # Clave de caché y serie de casos nuevos de un país ('nuevos' es cubo.nuevos_diarios(metrica)).
+    valores = nuevos[cubo.posicion[pais]].astype(np.float64)
+    return clave_cache(pais, modelo, {**parametros, 'metrica': metrica}, hash_serie(cubo.fechas, valores)), valores
+
+
+def pronostico_guardado(pais, modelo='ets', parametros=None, metrica='Confirmed', cubo=None):
+    # Solo lectura: el pronóstico ya guardado en la caché de disco para los datos actuales, o None.
+    parametros = {**PARAMETROS_POR_DEFECTO[modelo], **(parametros or {})}
+    if cubo is None:
+        cubo = cargar_cubo()
+    if pais not in cubo.posicion:
+        return None
+    clave, _ = clave_pais(cubo, cubo.nuevos_diarios(metrica), pais, modelo, parametros, metrica)
+    return leer_cache(clave)
+
+
+def pronosticar_paises(paises, modelo='ets', parametros=None, metrica='Confirmed', cubo=None, procesos=None):
+    # Devuelve {país: resultado}. Los aciertos de caché se leen de disco; el resto se ajusta,
+    # en paralelo si hay más de un país pendiente. Los países cuyo ajuste falló traen 'error'.
+    parametros = {**PARAMETROS_POR_DEFECTO[modelo], **(parametros or {})}
+    if cubo is None:
+        cubo = cargar_cubo()
+    nuevos = cubo.nuevos_diarios(metrica)
+
+    resultados = {}
+    tareas = []
+    for pais in paises:
+        clave, valores = clave_pais(cubo, nuevos, pais, modelo, parametros, metrica)
+        guardado = leer_cache(clave)
+        if guardado is not None:
+            resultados[pais] = guardado
+        else:
+            tareas.append((clave, pais, modelo, parametros, cubo.fechas, valores))
+
+    if len(tareas) == 1 or procesos == 1:
+        # Un solo ajuste (caso típico en la página): no compensa arrancar procesos.
+        ajustados = map(ajustar_pais, tareas)
+    elif tareas:
+        # Lote de países: el tiempo total escala con el número de núcleos.
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            ajustados = list(pool.map(ajustar_pais, tareas))
+    else:
+        ajustados = []
+    for (_, pais, *_), (_, resultado) in zip(tareas, ajustados):
+        resultados[pais] = resultado
+    return resultados
+
+
+if __name__ == '__main__':
+    # Uso: python app/pronostico.py [--modelo ets|arima|prophet] [--horizonte 14] [--procesos N]
+    # Ajusta todos los países del cubo y deja los pronósticos en la caché de disco.
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Ajusta pronósticos para todos los países del cubo.')
+    parser.add_argument('--modelo', choices=MODELOS, default='ets')
+    parser.add_argument('--horizonte', type=int, default=14)
+    parser.add_argument('--metrica', choices=['Confirmed', 'Deaths'], default='Confirmed')
+    parser.add_argument('--procesos', type=int, default=None)
+    args = parser.parse_args()
+
+    cubo = cargar_cubo()
+    inicio = time.perf_counter()
+    salida = pronosticar_paises(cubo.paises, args.modelo, {'horizonte': args.horizonte}, args.metrica, cubo, args.procesos)
+    fallidos = {pais: r['error'] for pais, r in salida.items() if 'error' in r}
+    print(f'{len(salida) - len(fallidos)} países en {time.perf_counter() - inicio:.1f} s')
+    for pais, error in fallidos.items():
+        print(f'  {pais}: {error}')
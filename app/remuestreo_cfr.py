@@ -0,0 +1,148 @@
+# Intervalos de la CFR por remuestreo: bootstrap y posterior Beta-Binomial.
+# Los intervalos analíticos de estadistica_cfr.py se apoyan en aproximaciones que fallan con pocos
+# casos; aquí se simulan miles de réplicas por celda (un país, o un país en una fecha para la
+# tendencia). Las réplicas de muchas celdas se generan de una vez como una matriz celdas × réplicas,
+# por lotes de a lo sumo ELEMENTOS_POR_LOTE números, y los lotes se reparten entre procesos.
+# Cada lote tiene su propia semilla derivada de la semilla global, así que el resultado no depende
+# del número de procesos.
+#
+# Uso: python app/remuestreo_cfr.py [--replicas 4000] [--tendencia] [--ventana 28] [--procesos N]
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Réplicas por celda por defecto.
+REPLICAS_POR_DEFECTO = 4000
+# Tamaño máximo de la matriz de réplicas de un lote (acota la memoria de cada proceso: ~16 MB).
+ELEMENTOS_POR_LOTE = 2_000_000
+# Prior Beta(a, b) de la CFR: Jeffreys, poco informativo y bien definido con 0 fallecidos.
+PRIOR_BETA = (0.5, 0.5)
+# Días de la ventana móvil de la tendencia (fallecidos nuevos / confirmados nuevos en la ventana).
+VENTANA_TENDENCIA = 28
+SEMILLA = 0
+COLUMNAS = ['Bootstrap Inferior', 'Bootstrap Superior', 'Bayes Media', 'Bayes Inferior', 'Bayes Superior']
+
+
+def cuantiles_por_fila(muestras, cuantiles):
+    # Cuantiles de cada fila con interpolación lineal (igual que np.quantile), ordenando en el sitio:
+    # ordenar la matriz es varias veces más rápido que np.quantile por ejes.
+    muestras.sort(axis=1)
+    posiciones = np.asarray(cuantiles) * (muestras.shape[1] - 1)
+    abajo = np.floor(posiciones).astype(np.int64)
+    arriba = np.minimum(abajo + 1, muestras.shape[1] - 1)
+    fraccion = posiciones - abajo
+    return muestras[:, abajo] * (1 - fraccion) + muestras[:, arriba] * fraccion
+
+
+def remuestrear_lote(tarea):
+    # Intervalos de un lote de celdas: devuelve una matriz celdas × COLUMNAS.
+    # Se ejecuta dentro de los procesos del pool, por eso recibe y devuelve solo arrays.
+    x, n, replicas, confianza, semilla = tarea
+    rng = np.random.default_rng(semilla)
+    cuantiles = [(1 - confianza) / 2, (1 + confianza) / 2]
+    p = x / n
+    # Bootstrap: remuestrear con reemplazo los n casos de una celda equivale a sacar el número de
+    # fallecidos de una Binomial(n, p̂); todas las celdas y réplicas salen en una sola llamada.
+    # Se ordenan los conteos enteros y solo sus cuantiles se pasan a proporción.
+    bootstrap = rng.binomial(n[:, None].astype(np.int64), p[:, None], size=(len(n), replicas))
+    # Posterior Beta-Binomial: con prior Beta(a, b) y x fallecidos de n casos, la CFR a posteriori
+    # es Beta(a + x, b + n - x).
+    a, b = PRIOR_BETA
+    posterior = rng.beta((a + x)[:, None], (b + n - x)[:, None], size=(len(n), replicas))
+    return np.column_stack([
+        cuantiles_por_fila(bootstrap, cuantiles) / n[:, None],
+        posterior.mean(axis=1),
+        cuantiles_por_fila(posterior, cuantiles),
+    ])
+
+
+def intervalos_celdas(fallecidos, confirmados, replicas=REPLICAS_POR_DEFECTO, confianza=0.95,
+                      procesos=None, semilla=SEMILLA):
+    # Intervalos de todas las celdas con casos (confirmados > 0); el resto queda en NaN.
+    # Devuelve una matriz celdas × COLUMNAS. 'procesos' como en ProcessPoolExecutor (None = todos
+    # los núcleos); con 1, o si cabe todo en un lote, se calcula aquí mismo.
+    x = np.asarray(fallecidos, dtype=np.float64)
+    n = np.asarray(confirmados, dtype=np.float64)
+    # Fallecidos por encima de los confirmados (correcciones de los reportes) se acotan a n.
+    x = np.clip(x, 0, np.maximum(n, 0))
+    validas = np.flatnonzero(n > 0)
+    resultado = np.full((len(n), len(COLUMNAS)), np.nan)
+    if not len(validas):
+        return resultado
+
+    filas_por_lote = max(1, ELEMENTOS_POR_LOTE // replicas)
+    lotes = [validas[i:i + filas_por_lote] for i in range(0, len(validas), filas_por_lote)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(lotes))
+    tareas = [(x[lote], n[lote], replicas, confianza, s) for lote, s in zip(lotes, semillas)]
+    if len(tareas) == 1 or procesos == 1:
+        # Un solo lote (la tabla por país): no compensa arrancar procesos.
+        partes = map(remuestrear_lote, tareas)
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            partes = list(pool.map(remuestrear_lote, tareas))
+    for lote, parte in zip(lotes, partes):
+        resultado[lote] = parte
+    return resultado
+
+
+def intervalos_remuestreo(paises, fallecidos, confirmados, replicas=REPLICAS_POR_DEFECTO, confianza=0.95,
+                          procesos=None, semilla=SEMILLA):
+    # Intervalos bootstrap y bayesianos de la CFR de todos los países, indexados por país y en
+    # proporciones (igual que intervalos_cfr).
+    valores = intervalos_celdas(fallecidos, confirmados, replicas, confianza, procesos, semilla)
+    return pd.DataFrame(valores, columns=COLUMNAS, index=pd.Index(np.asarray(paises), name='País'))
+
+
+def tendencia_cfr(cubo, paises=None, ventana=VENTANA_TENDENCIA, replicas=REPLICAS_POR_DEFECTO,
+                  confianza=0.95, procesos=None, semilla=SEMILLA):
+    # CFR móvil de cada país y fecha del cubo (fallecidos nuevos / confirmados nuevos en los últimos
+    # 'ventana' días) con sus intervalos. Devuelve un DataFrame largo (País, Fecha, CFR, COLUMNAS...)
+    # solo con las celdas que tienen casos en la ventana.
+    posiciones = np.array([cubo.posicion[p] for p in (paises or cubo.paises) if p in cubo.posicion], dtype=np.int64)
+    if not len(posiciones) or not len(cubo.fechas):
+        return pd.DataFrame(columns=['País', 'Fecha', 'CFR', *COLUMNAS])
+    acumulados = {}
+    for metrica in ('Deaths', 'Confirmed'):
+        # Acumulado con los días sin reporte rellenados (un hueco no se convierte en un pico).
+        matriz = cubo.acumulado_continuo(metrica, posiciones)
+        # Diferencia del acumulado a 'ventana' días (las primeras fechas usan lo que haya).
+        previo = np.concatenate([np.zeros((len(posiciones), min(ventana, matriz.shape[1])), dtype=np.int64),
+                                 matriz[:, :-ventana] if ventana < matriz.shape[1] else matriz[:, :0]], axis=1)
+        acumulados[metrica] = np.clip(matriz - previo, 0, None).ravel()
+    x, n = acumulados['Deaths'], acumulados['Confirmed']
+    valores = intervalos_celdas(x, n, replicas, confianza, procesos, semilla)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cfr = np.where(n > 0, np.minimum(x, n) / n, np.nan)
+    tabla = pd.DataFrame({
+        'País': np.repeat(np.asarray(cubo.paises, dtype=object)[posiciones], len(cubo.fechas)),
+        'Fecha': np.tile(cubo.fechas, len(posiciones)),
+        'CFR': cfr,
+        **dict(zip(COLUMNAS, valores.T)),
+    })
+    return tabla[n > 0].reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from almacen import cargar_reporte
+    from modelo_datos import DatosCovid
+
+    parser = argparse.ArgumentParser(description='Intervalos bootstrap y bayesianos de la CFR.')
+    parser.add_argument('--replicas', type=int, default=REPLICAS_POR_DEFECTO)
+    parser.add_argument('--tendencia', action='store_true', help='CFR móvil de todos los países y fechas del cubo.')
+    parser.add_argument('--ventana', type=int, default=VENTANA_TENDENCIA)
+    parser.add_argument('--procesos', type=int, default=None, help='Número de procesos (por defecto, todos los núcleos).')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.tendencia:
+        from ingesta import cargar_cubo
+        tabla = tendencia_cfr(cargar_cubo(), ventana=args.ventana, replicas=args.replicas, procesos=args.procesos)
+    else:
+        df = DatosCovid(cargar_reporte()).paises
+        tabla = intervalos_remuestreo(df['Country_Region'], df['Deaths'], df['Confirmed'], args.replicas, procesos=args.procesos)
+    print(tabla.head(20).to_string())
+    print(f'{len(tabla)} celdas × {args.replicas} réplicas en {time.perf_counter() - inicio:.2f} s')
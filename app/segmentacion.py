@@ -0,0 +1,67 @@
+# Motor de clustering (K-means) y PCA para la página de Clustering.
+# El escalado y un PCA de rango completo se ajustan una sola vez por instantánea; las vistas de
+# 2..5 componentes son cortes de sus columnas. El barrido k = 2..10 se reparte entre procesos con
+# joblib y guarda, para cada k, etiquetas, centroides, inercia y silueta (curva del codo incluida).
+import numpy as np
+import pandas as pd
+
+# Características usadas para el clustering y PCA.
+CARACTERISTICAS = ['Confirmed', 'Deaths', 'Recovered', 'Active', 'CFR']
+# Valores de k (número de clusters) y de componentes principales que ofrece la página.
+RANGO_K = range(2, 11)
+RANGO_PCA = range(2, 6)
+
+
+def ajustar_k(escalado, k, inicial=None):
+    # Ajusta K-means para un k y devuelve sus etiquetas, centroides (en el espacio escalado),
+    # inercia y coeficiente de silueta. Se ejecuta dentro de los procesos de joblib.
+    # Con 'inicial' (centroides de la instantánea anterior) se parte de ellos con una sola
+    # inicialización en lugar de diez: de un día al siguiente los clusters apenas se mueven.
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import silhouette_score
+
+    if inicial is None:
+        modelo = KMeans(n_clusters=k, random_state=42, n_init=10).fit(escalado)
+    else:
+        modelo = KMeans(n_clusters=k, init=inicial, n_init=1).fit(escalado)
+    # La silueta solo está definida si hay más puntos que clusters y al menos dos clusters distintos.
+    valido = len(escalado) > k and len(np.unique(modelo.labels_)) > 1
+    return {
+        'etiquetas': modelo.labels_,
+        'centroides': modelo.cluster_centers_,
+        'inercia': float(modelo.inertia_),
+        'silueta': float(silhouette_score(escalado, modelo.labels_)) if valido else np.nan,
+    }
+
+
+def barrido_clustering(datos, procesos=-1, anterior=None):
+    # Escala las características, ajusta el PCA completo y el barrido de K-means en paralelo.
+    # 'procesos' es el n_jobs de joblib (-1 = todos los núcleos). 'anterior' es el barrido de la
+    # instantánea previa (actualización diaria): sus centroides inician el K-means de cada k.
+    from joblib import Parallel, delayed
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.decomposition import PCA
+
+    df_cluster = datos.paises.dropna(subset=CARACTERISTICAS).reset_index(drop=True)
+    escalador = StandardScaler().fit(df_cluster[CARACTERISTICAS])
+    escalado = escalador.transform(df_cluster[CARACTERISTICAS])
+    pca = PCA(n_components=min(max(RANGO_PCA), *escalado.shape)).fit(escalado)
+    componentes = pca.transform(escalado)
+
+    # Los centroides anteriores están en unidades originales: se pasan a la escala de hoy.
+    iniciales = {k: escalador.transform(anterior['centroides'][k]) if anterior else None for k in RANGO_K}
+    resultados = Parallel(n_jobs=procesos)(delayed(ajustar_k)(escalado, k, iniciales[k]) for k in RANGO_K)
+    por_k = dict(zip(RANGO_K, resultados))
+    return {
+        'paises': df_cluster['Country_Region'].astype(str).to_numpy(),
+        'caracteristicas': df_cluster[CARACTERISTICAS],
+        'pca': {n: componentes[:, :n] for n in RANGO_PCA},
+        'varianza_explicada': pca.explained_variance_ratio_,
+        'etiquetas': {k: r['etiquetas'] for k, r in por_k.items()},
+        # Centroides en las unidades originales, para interpretar cada cluster.
+        'centroides': {k: pd.DataFrame(escalador.inverse_transform(r['centroides']), columns=CARACTERISTICAS)
+                       for k, r in por_k.items()},
+        # Métricas por k para la curva del codo y la silueta.
+        'metricas': pd.DataFrame({'k': list(por_k), 'Inercia': [r['inercia'] for r in resultados],
+                                  'Silueta': [r['silueta'] for r in resultados]}),
+    }
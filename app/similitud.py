@@ -0,0 +1,210 @@
+# Búsqueda de países con trayectoria epidémica similar.
+# Cada país se resume en un vector de longitud fija: sus curvas de casos y fallecidos nuevos por
+# 100.000 habitantes (media móvil de 7 días) en los últimos 'ventana' días del cubo, remuestreadas a
+# PUNTOS valores, en escala logarítmica y con el mismo peso para cada métrica. Los vectores de
+# todos los países se indexan en un árbol de sklearn (BallTree o KDTree) y una consulta devuelve
+# los k vecinos exactos en milisegundos. Opcionalmente, los candidatos se reordenan por DTW
+# (Dynamic Time Warping), que tolera olas adelantadas o retrasadas unos días.
+# Los índices se construyen sin interfaz, uno por ventana y en paralelo, y se guardan en
+# data/similitud/<versión del cubo>-<instantánea>/ (la población sale del reporte de la instantánea).
+#
+# Uso: python app/similitud.py [--procesos N] [--pais Peru --k 5 --dtw]
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from almacen import DIRECTORIO_DATOS
+from ingesta import DIRECTORIO_CUBO, cargar_cubo
+
+# Directorio de los índices precalculados.
+DIRECTORIO_SIMILITUD = DIRECTORIO_DATOS / 'similitud'
+# Ventanas (días hasta la última fecha del cubo) que se indexan y la que usa la página por defecto.
+VENTANAS = (90, 180, 365)
+VENTANA_POR_DEFECTO = 180
+# Valores por métrica en el vector (180 días → un valor por semana, aprox.).
+PUNTOS = 26
+# Métricas de la trayectoria, en este orden dentro del vector.
+METRICAS_TRAYECTORIA = ('Confirmed', 'Deaths')
+# Días de la media móvil de los casos nuevos.
+SUAVIZADO = 7
+# Vecinos del árbol que se reordenan por DTW y ancho de la banda de Sakoe-Chiba (fracción de PUNTOS).
+CANDIDATOS_DTW = 20
+BANDA_DTW = 0.15
+ARBOLES = ('ball', 'kd')
+
+
+def poblaciones(raw):
+    # Población por país estimada del reporte: Incident_Rate son casos por 100.000 habitantes, así que
+    # cada fila aporta Confirmed * 100.000 / Incident_Rate. Las filas sin tasa no cuentan.
+    tasa = raw['Incident_Rate'].to_numpy(dtype=np.float64)
+    confirmados = raw['Confirmed'].to_numpy(dtype=np.float64)
+    validas = np.isfinite(tasa) & (tasa > 0) & (confirmados > 0)
+    paises = raw['Country_Region'].astype(str).to_numpy()[validas]
+    return pd.Series(confirmados[validas] * 1e5 / tasa[validas]).groupby(paises).sum()
+
+
+def remuestrear(curvas, puntos=PUNTOS):
+    # Remuestrea cada fila a 'puntos' valores por interpolación lineal (sirve también si hay menos días).
+    columnas = np.linspace(0, curvas.shape[1] - 1, puntos)
+    abajo = np.floor(columnas).astype(np.int64)
+    arriba = np.minimum(abajo + 1, curvas.shape[1] - 1)
+    fraccion = columnas - abajo
+    return curvas[:, abajo] * (1 - fraccion) + curvas[:, arriba] * fraccion
+
+
+def trayectorias(cubo, poblacion, ventana=VENTANA_POR_DEFECTO):
+    # Curvas diarias por 100.000 habitantes de los países con población conocida en la ventana.
+    # Devuelve (países, fechas, {métrica: matriz países × fechas}).
+    paises = [p for p in cubo.paises if poblacion.get(p, 0) > 0]
+    posiciones = np.array([cubo.posicion[p] for p in paises], dtype=np.int64)
+    habitantes = poblacion.reindex(paises).to_numpy(dtype=np.float64)
+    inicio = max(len(cubo.fechas) - ventana, 0)
+    # Solo se leen la ventana y los SUAVIZADO días anteriores, no todo el archivo histórico.
+    base = max(inicio - SUAVIZADO, 0)
+    curvas = {}
+    for metrica in METRICAS_TRAYECTORIA:
+        # Acumulado con los días sin reporte rellenados (un hueco no se convierte en un pico).
+        acumulado = cubo.acumulado_continuo(metrica, posiciones, desde=base).astype(np.float64)
+        # Media móvil de los casos nuevos = diferencia del acumulado a SUAVIZADO días / SUAVIZADO.
+        # Los primeros días del cubo se comparan con su primera fecha (no con cero, que daría un pico).
+        previo = np.repeat(acumulado[:, :1], acumulado.shape[1], axis=1)
+        previo[:, SUAVIZADO:] = acumulado[:, :-SUAVIZADO]
+        nuevos = np.clip(acumulado - previo, 0, None) / SUAVIZADO
+        curvas[metrica] = nuevos[:, inicio - base:] / habitantes[:, None] * 1e5
+    return paises, cubo.fechas[inicio:], curvas
+
+
+def embeber(curvas):
+    # Vector de cada país: por métrica, la curva remuestreada en escala log1p y dividida por la
+    # desviación típica global de esa métrica (así casos y fallecidos pesan lo mismo).
+    bloques = []
+    for metrica in METRICAS_TRAYECTORIA:
+        bloque = np.log1p(remuestrear(curvas[metrica]))
+        bloques.append(bloque / (bloque.std() or 1.0))
+    return np.hstack(bloques)
+
+
+def construir_indice(cubo, poblacion, ventana=VENTANA_POR_DEFECTO, arbol='ball'):
+    # Índice de una ventana: vectores, curvas (para graficar) y el árbol de vecinos exactos.
+    from sklearn.neighbors import BallTree, KDTree
+
+    paises, fechas, curvas = trayectorias(cubo, poblacion, ventana)
+    vectores = embeber(curvas) if paises else np.zeros((0, PUNTOS * len(METRICAS_TRAYECTORIA)))
+    return {
+        'ventana': ventana,
+        'paises': paises,
+        'posicion': {p: i for i, p in enumerate(paises)},
+        'fechas': fechas,
+        'curvas': curvas,
+        'vectores': vectores,
+        'arbol': (BallTree if arbol == 'ball' else KDTree)(vectores) if paises else None,
+    }
+
+
+def _construir_en_proceso(tarea):
+    # Se ejecuta dentro de los procesos del pool: cada uno abre la misma versión del cubo (mmap) por su cuenta.
+    directorio_cubo, version_cubo, poblacion, ventana, arbol = tarea
+    return construir_indice(cargar_cubo(directorio_cubo, version_cubo), poblacion, ventana, arbol)
+
+
+def directorio_indices(version_cubo, id_snapshot):
+    return DIRECTORIO_SIMILITUD / f'{version_cubo}-{id_snapshot}'
+
+
+def construir_indices(directorio_cubo, poblacion, version_cubo, id_snapshot, ventanas=VENTANAS, arbol='ball',
+                      procesos=None):
+    # Construye y guarda el índice de cada ventana en paralelo; devuelve {ventana: índice}.
+    tareas = [(directorio_cubo, version_cubo, poblacion, ventana, arbol) for ventana in ventanas]
+    if len(tareas) == 1 or procesos == 1:
+        indices = list(map(_construir_en_proceso, tareas))
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            indices = list(pool.map(_construir_en_proceso, tareas))
+    destino = directorio_indices(version_cubo, id_snapshot)
+    destino.mkdir(parents=True, exist_ok=True)
+    for ventana, indice in zip(ventanas, indices):
+        # Cada archivo se escribe aparte y se publica con un reemplazo atómico.
+        temporal = destino / f'.v{ventana}.tmp-{os.getpid()}.pkl'
+        with open(temporal, 'wb') as f:
+            pickle.dump(indice, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, destino / f'v{ventana}.pkl')
+    return dict(zip(ventanas, indices))
+
+
+def leer_indice(version_cubo, id_snapshot, ventana):
+    # Índice precalculado de una ventana, o None si no se ha construido.
+    ruta = directorio_indices(version_cubo, id_snapshot) / f'v{ventana}.pkl'
+    if not ruta.exists():
+        return None
+    with open(ruta, 'rb') as f:
+        return pickle.load(f)
+
+
+def distancias_dtw(consulta, candidatas, banda=BANDA_DTW):
+    # DTW multivariante de una trayectoria (métricas × puntos) contra varias (c × métricas × puntos),
+    # con banda de Sakoe-Chiba. La recurrencia recorre la matriz celda a celda, pero cada celda se
+    # calcula para todas las candidatas a la vez.
+    puntos = consulta.shape[1]
+    ancho = max(1, int(round(banda * puntos)))
+    # Costo local: distancia euclídea entre los vectores de métricas de cada par de instantes.
+    costo = np.sqrt(((consulta[None, :, :, None] - candidatas[:, :, None, :]) ** 2).sum(axis=1))
+    acumulado = np.full((len(candidatas), puntos + 1, puntos + 1), np.inf)
+    acumulado[:, 0, 0] = 0.0
+    for i in range(1, puntos + 1):
+        for j in range(max(1, i - ancho), min(puntos, i + ancho) + 1):
+            previo = np.minimum(np.minimum(acumulado[:, i - 1, j - 1], acumulado[:, i - 1, j]), acumulado[:, i, j - 1])
+            acumulado[:, i, j] = costo[:, i - 1, j - 1] + previo
+    return acumulado[:, puntos, puntos]
+
+
+def consultar(indice, pais, k=5, dtw=False, candidatos=CANDIDATOS_DTW):
+    # Los k países más parecidos a 'pais' (sin él mismo), del más al menos parecido.
+    # Con dtw=True se piden 'candidatos' vecinos al árbol y se reordenan por DTW.
+    i = indice['posicion'][pais]
+    n = len(indice['paises'])
+    vecinos = min(n, max(k, candidatos if dtw else k) + 1)
+    distancias, posiciones = indice['arbol'].query(indice['vectores'][i:i + 1], k=vecinos)
+    distancias, posiciones = distancias[0], posiciones[0]
+    otros = posiciones != i
+    distancias, posiciones = distancias[otros], posiciones[otros]
+    tabla = pd.DataFrame({'País': np.asarray(indice['paises'], dtype=object)[posiciones], 'Distancia': distancias})
+    if dtw and len(posiciones):
+        # El vector de cada país son sus curvas remuestreadas una tras otra: métricas × puntos.
+        por_metrica = indice['vectores'].reshape(n, len(METRICAS_TRAYECTORIA), PUNTOS)
+        tabla['Distancia DTW'] = distancias_dtw(por_metrica[i], por_metrica[posiciones])
+        tabla = tabla.sort_values('Distancia DTW', kind='stable')
+    return tabla.head(k).reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from almacen import leer_snapshot, snapshot_servido
+    from ingesta import version_cubo
+
+    parser = argparse.ArgumentParser(description='Construye los índices de trayectorias similares y hace una consulta de ejemplo.')
+    parser.add_argument('--cubo-dir', default=str(DIRECTORIO_CUBO))
+    parser.add_argument('--ventanas', type=int, nargs='+', default=list(VENTANAS))
+    parser.add_argument('--arbol', choices=ARBOLES, default='ball')
+    parser.add_argument('--procesos', type=int, default=None, help='Número de procesos (por defecto, todos los núcleos).')
+    parser.add_argument('--pais', help='País de la consulta de ejemplo.')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--dtw', action='store_true', help='Reordena los candidatos por DTW.')
+    args = parser.parse_args()
+
+    destino = snapshot_servido()
+    poblacion = poblaciones(leer_snapshot(destino))
+    version = version_cubo(args.cubo_dir)
+    inicio = time.perf_counter()
+    indices = construir_indices(args.cubo_dir, poblacion, version, destino.name, args.ventanas, args.arbol, args.procesos)
+    print(f'{directorio_indices(version, destino.name)} ({time.perf_counter() - inicio:.2f} s)')
+    if args.pais:
+        for ventana, indice in indices.items():
+            inicio = time.perf_counter()
+            tabla = consultar(indice, args.pais, args.k, args.dtw)
+            print(f'\nVentana de {ventana} días ({(time.perf_counter() - inicio) * 1000:.2f} ms):')
+            print(tabla.to_string(index=False))
@@ -0,0 +1,89 @@
+# Generador de datos sintéticos con el esquema de los reportes diarios de JHU.
+# Sirve para los benchmarks y para probar el dashboard sin conexión: produce reportes de
+# ~4000 filas multiplicados por una escala (1x, 10x, 100x...) y series temporales de varios años.
+import datetime as dt
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ingesta import CuboSeries, METRICAS
+
+# Filas de un reporte real de JHU (aprox.) y países con nombre real para que las páginas tengan sus valores por defecto.
+FILAS_BASE = 4000
+PAISES_REALES = ['US', 'India', 'Brazil', 'France', 'Germany', 'Peru', 'Mexico', 'Chile', 'Italy', 'Spain']
+N_PAISES = 200
+# Fecha inicial de las series sintéticas (el primer reporte de JHU es del 22-01-2020).
+FECHA_INICIAL = dt.date(2020, 1, 22)
+
+
+def nombres_paises(n=N_PAISES):
+    # Los n primeros nombres: primero los países reales y después 'Pais 000', 'Pais 001'...
+    return (PAISES_REALES + [f'Pais {i:03d}' for i in range(n - len(PAISES_REALES))])[:n]
+
+
+def generar_reporte(escala=1, dia=0, semilla=0):
+    # Reporte diario con ~FILAS_BASE × escala filas. Los acumulados crecen con 'dia'.
+    rng = np.random.default_rng(semilla)
+    n = FILAS_BASE * escala
+    paises = np.array(nombres_paises(), dtype=object)
+    # Distribución de filas por país muy desigual (como EE.UU. con miles de condados).
+    pesos = rng.pareto(1.2, len(paises)) + 0.05
+    pais = paises[rng.choice(len(paises), n, p=pesos / pesos.sum())]
+    provincia = np.char.add('Provincia ', (np.arange(n) % (40 * escala)).astype(str)).astype(object)
+    admin2 = np.char.add('Condado ', np.arange(n).astype(str)).astype(object)
+    # Solo una parte de las filas tiene condado (en JHU, sobre todo EE.UU.).
+    admin2[rng.random(n) < 0.3] = None
+    tasa = rng.gamma(2.0, 50.0, n)
+    confirmados = np.floor(tasa * (dia + 1) * rng.uniform(50, 150, n)).astype(np.int64)
+    fallecidos = np.floor(confirmados * rng.beta(2, 150, n)).astype(np.int64)
+    recuperados = np.zeros(n, dtype=np.int64)
+    combinado = pd.Series(admin2).fillna('').astype(str) + ', ' + pd.Series(provincia).astype(str) + ', ' + pd.Series(pais).astype(str)
+    return pd.DataFrame({
+        'FIPS': np.nan,
+        'Admin2': admin2,
+        'Province_State': provincia,
+        'Country_Region': pais,
+        'Last_Update': (FECHA_INICIAL + dt.timedelta(days=dia + 1)).strftime('%Y-%m-%d 04:21:00'),
+        'Lat': rng.uniform(-60, 70, n),
+        'Long_': rng.uniform(-180, 180, n),
+        'Confirmed': confirmados,
+        'Deaths': fallecidos,
+        'Recovered': recuperados,
+        'Active': np.nan,
+        'Combined_Key': combinado.str.lstrip(', ').to_numpy(),
+        'Incident_Rate': tasa,
+        'Case_Fatality_Ratio': np.where(confirmados > 0, fallecidos / np.maximum(confirmados, 1) * 100, np.nan),
+    })
+
+
+def escribir_archivo(directorio, dias, escala=1, semilla=0):
+    # Escribe 'dias' reportes consecutivos MM-DD-YYYY.csv en el directorio y devuelve sus rutas.
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    rutas = []
+    for dia in range(dias):
+        fecha = FECHA_INICIAL + dt.timedelta(days=dia)
+        ruta = directorio / f'{fecha:%m-%d-%Y}.csv'
+        generar_reporte(escala, dia, semilla).to_csv(ruta, index=False)
+        rutas.append(ruta)
+    return rutas
+
+
+def generar_cubo(n_paises=N_PAISES, n_dias=3 * 365, semilla=0):
+    # Cubo país × fecha con acumulados crecientes y olas epidémicas, sin pasar por CSV.
+    rng = np.random.default_rng(semilla)
+    t = np.arange(n_dias)
+    # Cada país tiene varias olas (gaussianas) de casos nuevos diarios más ruido de Poisson.
+    centros = rng.uniform(0, n_dias, (n_paises, 4))
+    anchos = rng.uniform(15, 60, (n_paises, 4))
+    alturas = rng.gamma(2.0, 500.0, (n_paises, 4))
+    intensidad = (alturas[:, :, None] * np.exp(-0.5 * ((t - centros[:, :, None]) / anchos[:, :, None]) ** 2)).sum(axis=1)
+    nuevos = rng.poisson(intensidad + 1.0)
+    confirmados = np.cumsum(nuevos, axis=1)
+    fallecidos = np.cumsum(rng.binomial(nuevos, 0.015), axis=1)
+    metricas = {m: np.zeros((n_paises, n_dias), dtype=np.int32) for m in METRICAS}
+    metricas['Confirmed'] = confirmados.astype(np.int32)
+    metricas['Deaths'] = fallecidos.astype(np.int32)
+    fechas = np.datetime64(FECHA_INICIAL.isoformat(), 'D') + t
+    return CuboSeries(nombres_paises(n_paises), fechas, metricas, np.ones((n_paises, n_dias), dtype=bool))
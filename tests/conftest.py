@@ -0,0 +1,42 @@
+# Configuración común de las pruebas: se ejecutan sin red y sin tocar data/.
+# Los módulos de app/ fijan sus directorios al importarse, así que COVID_DATA_DIR apunta a un
+# directorio temporal antes de cualquier importación; cada prueba recibe además su propio directorio.
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+os.environ['COVID_DATA_DIR'] = tempfile.mkdtemp(prefix='pruebas-covid-')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'app'))
+
+# CSV mínimo con el esquema actual de los reportes diarios de JHU.
+CSV_REPORTE = b"""FIPS,Admin2,Province_State,Country_Region,Last_Update,Lat,Long_,Confirmed,Deaths,Recovered,Active,Combined_Key,Incident_Rate,Case_Fatality_Ratio
+,,Lima,Peru,2022-04-19 04:20:00,-12.04,-77.04,2000,40,,,"Lima, Peru",6000.0,2.0
+,,Cusco,Peru,2022-04-19 04:20:00,-13.53,-71.96,1000,10,,,"Cusco, Peru",7000.0,1.0
+,,,Mexico,2022-04-19 04:20:00,23.63,-102.55,5000,250,,,Mexico,3800.0,5.0
+1001,Autauga,Alabama,US,2022-04-19 04:20:00,32.53,-86.64,300,3,,,"Autauga, Alabama, US",5400.0,
+"""
+
+
+@pytest.fixture
+def datos_tmp(tmp_path, monkeypatch):
+    # Directorio de datos vacío para una prueba: los directorios del almacén apuntan a él.
+    import almacen
+
+    monkeypatch.setattr(almacen, 'DIRECTORIO_DATOS', tmp_path)
+    monkeypatch.setattr(almacen, 'DIRECTORIO_CSV', tmp_path / 'raw')
+    monkeypatch.setattr(almacen, 'DIRECTORIO_SNAPSHOTS', tmp_path / 'snapshots')
+    return tmp_path
+
+
+@pytest.fixture
+def sin_red(monkeypatch):
+    # Cualquier intento de descarga hace fallar la prueba.
+    import urllib.request
+
+    def urlopen(*args, **kwargs):
+        raise AssertionError('la prueba intentó acceder a la red')
+
+    monkeypatch.setattr(urllib.request, 'urlopen', urlopen)
@@ -0,0 +1,35 @@
+# Pruebas de la actualización diaria (app/actualizacion.py), sin red.
+import pytest
+
+import actualizacion
+import almacen
+import ingesta
+from sinteticos import escribir_archivo
+
+
+@pytest.fixture
+def publicado(datos_tmp, sin_red):
+    # Cubo de tres días ya publicado y el reporte del cuarto día todavía sin ingerir.
+    rutas = escribir_archivo(datos_tmp / 'raw', 4)
+    siguiente = rutas[-1].rename(datos_tmp / rutas[-1].name)
+    ingesta.actualizar_cubo(datos_tmp / 'raw', datos_tmp / 'cubo', procesos=1)
+    return datos_tmp, siguiente.rename(rutas[-1])
+
+
+def test_publicar_dia_publica_instantanea_y_cubo_a_la_vez(publicado, monkeypatch):
+    datos_tmp, ruta = publicado
+    anterior = ingesta.version_servida(datos_tmp / 'cubo')
+    vistas = []
+
+    def construir_indices(directorio_cubo, poblacion, version_cubo, id_snapshot, **opciones):
+        # Antes del puntero final se sigue sirviendo el cubo anterior, aunque el nuevo ya esté escrito.
+        vistas.append((version_cubo, ingesta.version_servida(directorio_cubo)))
+
+    monkeypatch.setattr(actualizacion, 'construir_indices', construir_indices)
+    resultado = actualizacion.publicar_dia(ruta, datos_tmp / 'cubo', datos_tmp / 'artefactos')
+
+    (preparada, servida), = vistas
+    assert preparada != anterior and servida == anterior
+    assert almacen.leer_puntero(almacen.PUNTERO_ACTUAL) == {'snapshot': resultado['snapshot'], 'cubo': preparada}
+    assert ingesta.version_servida(datos_tmp / 'cubo') == preparada
+    assert len(ingesta.cargar_cubo(datos_tmp / 'cubo', preparada).fechas) == 4
@@ -0,0 +1,104 @@
+# Pruebas del almacén de instantáneas columnares (app/almacen.py), sin red.
+import io
+import json
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import almacen
+from conftest import CSV_REPORTE
+
+
+def sembrar_csv(directorio, fecha, contenido=CSV_REPORTE):
+    ruta = directorio / 'raw' / f'{fecha}.csv'
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.write_bytes(contenido)
+    return ruta
+
+
+def test_ingesta_y_lectura_conservan_valores_y_tipos(datos_tmp, sin_red):
+    sembrar_csv(datos_tmp, '04-19-2022')
+    destino = almacen.ingerir_reporte('04-19-2022')
+    df = almacen.leer_snapshot(destino)
+    esperado = almacen.normalizar_reporte(pd.read_csv(io.BytesIO(CSV_REPORTE)))
+
+    assert list(df.columns) == list(esperado.columns)
+    assert df.attrs['snapshot'] == destino.name
+    for columna in ['Confirmed', 'Deaths', 'Lat', 'Incident_Rate', 'CFR']:
+        assert df[columna].dtype == esperado[columna].dtype
+        np.testing.assert_array_equal(df[columna].to_numpy(), esperado[columna].to_numpy())
+    # El texto vuelve como categórico, con los nulos como NaN.
+    assert isinstance(df['Country_Region'].dtype, pd.CategoricalDtype)
+    assert df['Country_Region'].astype(object).tolist() == esperado['Country_Region'].tolist()
+    assert df['Admin2'].isna().tolist() == esperado['Admin2'].isna().tolist()
+
+
+def test_snapshot_vigente_sigue_al_puntero(datos_tmp, sin_red):
+    assert almacen.snapshot_vigente('04-19-2022') is None
+    primero = almacen.ingerir_reporte('04-19-2022', CSV_REPORTE)
+    assert almacen.snapshot_vigente('04-19-2022') == primero
+
+    # Un CSV corregido crea otra instantánea y el puntero pasa a ella; la anterior sigue en disco.
+    corregido = CSV_REPORTE.replace(b'5000,250', b'5100,251')
+    segundo = almacen.ingerir_reporte('04-19-2022', corregido)
+    assert segundo != primero and primero.exists()
+    assert almacen.snapshot_vigente('04-19-2022') == segundo
+    assert almacen.leer_snapshot(segundo)['Confirmed'].max() == 5100
+    assert almacen.snapshots_publicados() == {segundo.name}
+
+
+def test_puntero_actual_y_snapshot_servido(datos_tmp, sin_red):
+    sembrar_csv(datos_tmp, almacen.FECHA_POR_DEFECTO)
+    # Sin puntero 'actual' se sirve la fecha por defecto (ingerida desde data/raw).
+    por_defecto = almacen.snapshot_servido()
+    assert por_defecto.name.startswith(almacen.FECHA_POR_DEFECTO)
+
+    nuevo = almacen.ingerir_reporte('04-19-2022', CSV_REPORTE.replace(b'300,3', b'310,3'))
+    assert almacen.snapshot_servido() == por_defecto
+    almacen.publicar_puntero(almacen.PUNTERO_ACTUAL, nuevo.name)
+    assert almacen.snapshot_servido() == nuevo
+    assert json.loads((datos_tmp / 'snapshots' / 'actual.json').read_text()) == {'snapshot': nuevo.name}
+
+
+def test_cargar_reporte_sin_red_usa_el_csv_local(datos_tmp, sin_red):
+    sembrar_csv(datos_tmp, '04-19-2022')
+    df = almacen.cargar_reporte('04-19-2022')
+    assert df['Confirmed'].sum() == 8300
+    # La segunda carga ya no lee el CSV: basta la instantánea.
+    (datos_tmp / 'raw' / '04-19-2022.csv').unlink()
+    assert almacen.cargar_reporte('04-19-2022')['Deaths'].sum() == 303
+
+
+def test_sin_copia_local_descarga_una_vez_y_la_guarda(datos_tmp, monkeypatch):
+    pedidas = []
+
+    class Respuesta(io.BytesIO):
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+    def urlopen(url, timeout=None):
+        pedidas.append(url)
+        return Respuesta(CSV_REPORTE)
+
+    monkeypatch.setattr(urllib.request, 'urlopen', urlopen)
+    almacen.cargar_reporte('04-19-2022')
+    assert pedidas == [almacen.URL_BASE + '04-19-2022.csv']
+    assert (datos_tmp / 'raw' / '04-19-2022.csv').read_bytes() == CSV_REPORTE
+
+
+def test_version_de_formato_distinta_se_ignora(datos_tmp, sin_red):
+    destino = almacen.ingerir_reporte('04-19-2022', CSV_REPORTE)
+    manifiesto = json.loads((destino / 'manifiesto.json').read_text())
+    manifiesto['version'] = almacen.VERSION_FORMATO + 1
+    (destino / 'manifiesto.json').write_text(json.dumps(manifiesto))
+    assert almacen.snapshot_vigente('04-19-2022') is None
+
+
+@pytest.mark.parametrize('fecha', ['04-19-2022', '01-22-2020'])
+def test_ruta_csv_local(datos_tmp, fecha):
+    assert almacen.ruta_csv_local(fecha) == datos_tmp / 'raw' / f'{fecha}.csv'
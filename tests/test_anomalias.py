@@ -0,0 +1,119 @@
+# Pruebas del detector de anomalías en flujo (app/anomalias.py).
+import numpy as np
+import pandas as pd
+import pytest
+
+import anomalias
+import ingesta
+from ingesta import CuboSeries
+from sinteticos import escribir_archivo, generar_cubo
+
+
+def recortar(cubo, paises=None, fechas=None):
+    # Copia del cubo con los primeros países y fechas (como un cubo publicado antes).
+    filas, columnas = slice(paises), slice(fechas)
+    return CuboSeries(cubo.paises[filas], cubo.fechas[columnas],
+                      {m: np.array(v[filas, columnas]) for m, v in cubo.metricas.items()},
+                      np.array(cubo.presente[filas, columnas]))
+
+
+def comparar(historial, esperado):
+    for salida in anomalias.SALIDAS:
+        np.testing.assert_allclose(historial[salida].astype(np.float64), esperado[salida].astype(np.float64),
+                                   rtol=1e-9, atol=1e-6, equal_nan=True, err_msg=salida)
+
+
+def test_desde_historial_reanuda_igual_que_el_flujo_continuo():
+    nuevos = generar_cubo(12, 50).nuevos_diarios('Confirmed')
+    completo = anomalias.DetectorAnomalias(12).procesar(nuevos)
+    for corte in (1, 5, 7, 30):
+        detector = anomalias.DetectorAnomalias.desde_historial({s: h[:, :corte] for s, h in completo.items()})
+        resto = detector.procesar(nuevos[:, corte:])
+        comparar({s: h[:, corte:] for s, h in completo.items()}, resto)
+
+
+def test_correccion_historica_se_reprocesa_desde_su_fecha(tmp_path, monkeypatch):
+    cubo = generar_cubo(10, 60)
+    anomalias.detectar_anomalias(recortar(cubo, paises=9, fechas=50), 'Confirmed', tmp_path)
+
+    # Se corrige un reporte antiguo (fecha 20) y llega un país nuevo junto con los días nuevos.
+    corregido = recortar(cubo)
+    corregido.metricas['Confirmed'][:, 20:] += 500
+    corregido.metricas['Confirmed'][9, :50] = 0
+    corregido.presente[9, :50] = False
+    procesados = []
+    procesar = anomalias.DetectorAnomalias.procesar
+    monkeypatch.setattr(anomalias.DetectorAnomalias, 'procesar',
+                        lambda self, matriz: procesados.append(matriz.shape[1]) or procesar(self, matriz))
+    _, _, historial = anomalias.detectar_anomalias(corregido, 'Confirmed', tmp_path)
+    assert procesados == [40]
+
+    _, _, esperado = anomalias.detectar_anomalias(corregido, 'Confirmed', tmp_path / 'desde_cero')
+    comparar({s: h[:9] for s, h in historial.items()}, {s: h[:9] for s, h in esperado.items()})
+    comparar({s: h[9:, 50:] for s, h in historial.items()}, {s: h[9:, 50:] for s, h in esperado.items()})
+
+
+def test_estado_por_delante_del_cubo_no_se_pisa(tmp_path):
+    cubo = generar_cubo(12, 30)
+    _, _, completo = anomalias.detectar_anomalias(cubo, 'Deaths', tmp_path)
+    # El cubo servido va un día por detrás de la versión preparada: se devuelve su parte.
+    paises, fechas, historial = anomalias.detectar_anomalias(recortar(cubo, fechas=29), 'Deaths', tmp_path)
+    assert len(fechas) == 29
+    comparar(historial, {s: h[:, :29] for s, h in completo.items()})
+    assert len(anomalias.cargar(tmp_path)[1]) == 30
+
+
+def test_guardado_fallido_no_cambia_el_estado_publicado(tmp_path, monkeypatch):
+    cubo = generar_cubo(10, 40)
+    anomalias.detectar_anomalias(recortar(cubo, fechas=30), 'Deaths', tmp_path)
+    publicada = anomalias.version_estado(tmp_path)
+
+    # Falla la publicación del puntero: la versión nueva queda escrita, pero no se sirve.
+    def fallar(*args):
+        raise OSError('disco lleno')
+
+    monkeypatch.setattr(anomalias, 'escribir_json', fallar)
+    with pytest.raises(OSError):
+        anomalias.detectar_anomalias(cubo, 'Deaths', tmp_path)
+    assert anomalias.version_estado(tmp_path) == publicada
+    paises, fechas, _, historial, firmas, _ = anomalias.cargar(tmp_path)
+    assert len(fechas) == len(firmas) == historial['valor'].shape[1] == 30
+
+    # El siguiente guardado publica y poda: quedan ESTADOS_CONSERVADOS versiones y ningún archivo suelto.
+    monkeypatch.undo()
+    (tmp_path / 'estado.npz').write_bytes(b'formato anterior')
+    anomalias.detectar_anomalias(cubo, 'Deaths', tmp_path)
+    assert len(anomalias.cargar(tmp_path)[1]) == 40
+    assert sorted(r.name for r in tmp_path.iterdir()) == ['actual.json', 'versiones']
+    assert len(list((tmp_path / 'versiones').iterdir())) == anomalias.ESTADOS_CONSERVADOS
+
+
+def test_publicacion_solo_firma_fechas_nuevas_o_corregidas(tmp_path, monkeypatch):
+    # Cubo de disco de 11 días; el duodécimo llega después, como en la actualización diaria.
+    rutas = escribir_archivo(tmp_path / 'raw', 12)
+    ultima = rutas[-1].rename(tmp_path / rutas[-1].name)
+    cubo = ingesta.actualizar_cubo(tmp_path / 'raw', tmp_path / 'cubo', procesos=1)
+    anomalias.detectar_anomalias(cubo, 'Deaths', tmp_path / 'estado')
+
+    firmadas, procesadas = [], []
+    firmas_fechas, procesar = anomalias.firmas_fechas, anomalias.DetectorAnomalias.procesar
+    monkeypatch.setattr(anomalias, 'firmas_fechas',
+                        lambda cubo, metrica, desde=0: firmadas.append(desde) or firmas_fechas(cubo, metrica, desde))
+    monkeypatch.setattr(anomalias.DetectorAnomalias, 'procesar',
+                        lambda self, matriz: procesadas.append(matriz.shape[1]) or procesar(self, matriz))
+
+    # Un día nuevo: solo se firman la última fecha guardada y la nueva, y se procesa un día.
+    cubo = ingesta.anexar_reporte(ultima.rename(rutas[-1]), tmp_path / 'cubo')
+    anomalias.detectar_anomalias(cubo, 'Deaths', tmp_path / 'estado')
+    assert firmadas == [10] and procesadas == [1]
+
+    # Se corrige el reporte del día 4: se firma y se reprocesa desde esa fecha.
+    reporte = pd.read_csv(rutas[4])
+    reporte['Deaths'] += 1
+    reporte.to_csv(rutas[4], index=False)
+    cubo = ingesta.actualizar_cubo(tmp_path / 'raw', tmp_path / 'cubo', procesos=1)
+    _, _, historial = anomalias.detectar_anomalias(cubo, 'Deaths', tmp_path / 'estado')
+    assert firmadas[-1] == 4 and procesadas[-1] == 8
+    monkeypatch.undo()
+    _, _, esperado = anomalias.detectar_anomalias(cubo, 'Deaths', tmp_path / 'desde_cero')
+    comparar(historial, esperado)
@@ -0,0 +1,103 @@
+# Pruebas de la API HTTP (app/api.py), sin red ni servidor: las peticiones se pasan directamente a
+# la aplicación ASGI.
+import asyncio
+import json
+import urllib.error
+import urllib.request
+
+import api
+from conftest import CSV_REPORTE
+
+
+def pedir(app, camino, consulta='', cabeceras=None):
+    # Ejecuta una petición GET y devuelve (estado, cabeceras, cuerpo).
+    alcance = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': camino, 'raw_path': camino.encode(), 'root_path': '', 'query_string': consulta.encode(),
+        'headers': [(k.lower().encode(), v.encode()) for k, v in (cabeceras or {}).items()],
+        'server': ('prueba', 80), 'client': ('prueba', 1234),
+    }
+    mensajes, pedido = [], []
+
+    async def recibir():
+        # Primero el cuerpo (vacío); después el cliente sigue conectado hasta que la respuesta
+        # termina (una respuesta en streaming espera aquí una posible desconexión).
+        if pedido:
+            await asyncio.Event().wait()
+        pedido.append(True)
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def enviar(mensaje):
+        mensajes.append(mensaje)
+
+    asyncio.run(app(alcance, recibir, enviar))
+    inicio = mensajes[0]
+    cuerpo = b''.join(m.get('body', b'') for m in mensajes[1:])
+    return inicio['status'], {k.decode(): v.decode() for k, v in inicio['headers']}, cuerpo
+
+
+def test_fecha_sin_puntero_se_ingiere_del_csv_local(datos_tmp, sin_red):
+    (datos_tmp / 'raw').mkdir()
+    (datos_tmp / 'raw' / '04-19-2022.csv').write_bytes(CSV_REPORTE)
+    app = api.crear_app(api.Almacen('04-19-2022'))
+    estado, _, cuerpo = pedir(app, '/paises', 'paises=Peru')
+    assert estado == 200
+    assert json.loads(cuerpo)['filas'][0]['Confirmed'] == 3000
+
+
+def test_fecha_sin_reporte_responde_404(datos_tmp, monkeypatch):
+    # Sin CSV local y con la descarga fallando (como GitHub con una fecha que no existe).
+    def urlopen(*args, **kwargs):
+        raise urllib.error.HTTPError(args[0], 404, 'Not Found', None, None)
+
+    monkeypatch.setattr(urllib.request, 'urlopen', urlopen)
+    app = api.crear_app(api.Almacen('01-01-2019'))
+    estado, _, cuerpo = pedir(app, '/paises')
+    assert estado == 404 and '01-01-2019' in json.loads(cuerpo)['error']
+    assert pedir(app, '/salud')[0] == 404
+
+
+def test_etag_y_cache_no_construyen_la_tabla(datos_tmp, sin_red, monkeypatch):
+    (datos_tmp / 'raw').mkdir()
+    (datos_tmp / 'raw' / '04-19-2022.csv').write_bytes(CSV_REPORTE)
+    app = api.crear_app(api.Almacen('04-19-2022'))
+    construidas = []
+    filtrar = api.DatosCovid.filtrar
+    monkeypatch.setattr(api.DatosCovid, 'filtrar', lambda self, *args: construidas.append(args) or filtrar(self, *args))
+
+    estado, cabeceras, primero = pedir(app, '/paises', 'orden=Confirmed&desc=1')
+    assert estado == 200 and len(construidas) == 1
+    assert [f['Country_Region'] for f in json.loads(primero)['filas']] == ['Mexico', 'Peru', 'US']
+    # Con la ETag vigente: 304 sin construir nada.
+    estado, _, cuerpo = pedir(app, '/paises', 'orden=Confirmed&desc=1', {'If-None-Match': cabeceras['etag']})
+    assert estado == 304 and cuerpo == b'' and len(construidas) == 1
+    # Sin ETag, la respuesta sale de la caché de cuerpos serializados.
+    assert pedir(app, '/paises', 'orden=Confirmed&desc=1')[2] == primero and len(construidas) == 1
+    # Otra consulta es otra ETag y sí se construye.
+    estado, otras, _ = pedir(app, '/paises', 'paises=Peru')
+    assert estado == 200 and otras['etag'] != cabeceras['etag'] and len(construidas) == 2
+
+
+def test_parametros_invalidos_responden_400(datos_tmp, sin_red):
+    (datos_tmp / 'raw').mkdir()
+    (datos_tmp / 'raw' / '04-19-2022.csv').write_bytes(CSV_REPORTE)
+    app = api.crear_app(api.Almacen('04-19-2022'))
+    assert pedir(app, '/paises', 'metrica=Nada')[0] == 400
+    assert pedir(app, '/paises', 'limite=0')[0] == 400
+    assert pedir(app, '/provincias', 'pais=Atlantida')[0] == 404
+    estado, _, cuerpo = pedir(app, '/provincias', 'pais=Peru')
+    assert estado == 200 and sorted(f['Province_State'] for f in json.loads(cuerpo)['filas']) == ['Cusco', 'Lima']
+
+
+def test_exportar_envia_el_archivo_por_bloques(datos_tmp, sin_red):
+    (datos_tmp / 'raw').mkdir()
+    (datos_tmp / 'raw' / '04-19-2022.csv').write_bytes(CSV_REPORTE)
+    app = api.crear_app(api.Almacen('04-19-2022'))
+    estado, cabeceras, cuerpo = pedir(app, '/exportar/provincias', 'formato=csv&pais=Peru')
+    assert estado == 200 and cabeceras['content-type'].startswith('text/csv')
+    assert 'filename="covid_provincias.csv"' in cabeceras['content-disposition']
+    filas = cuerpo.decode().splitlines()
+    assert len(filas) == 3 and all('Peru' in f for f in filas[1:])
+    # Los parámetros se validan antes de empezar a enviar.
+    assert pedir(app, '/exportar/series', 'desde=ayer')[0] == 400
+    assert pedir(app, '/exportar/nada')[0] == 404
@@ -0,0 +1,28 @@
+# Pruebas de humo de los benchmarks (app/benchmark_computo.py y app/benchmark_importacion.py) a
+# escala mínima: comprueban que todos los casos corren y que la comparación con la base funciona.
+import benchmark_computo
+import benchmark_importacion
+
+
+def test_benchmark_computo_a_escala_minima(tmp_path, monkeypatch):
+    monkeypatch.setattr(benchmark_computo, 'DIRECTORIO_TEMPORAL', tmp_path)
+    # Menos países que PAISES_REALES: el cubo sintético debe tener tantos nombres como filas.
+    monkeypatch.setattr(benchmark_computo, 'PAISES_SERIE', 8)
+    resultados = benchmark_computo.ejecutar([1], [1], repeticiones=1)
+    assert sorted(resultados) == sorted([f'{c}@1x' for c in benchmark_computo.CASOS_REPORTE]
+                                        + [f'{c}@1a' for c in benchmark_computo.CASOS_SERIE])
+    assert all(r['mediana_ms'] > 0 and r['pico_mb'] >= 0 for r in resultados.values())
+    # Contra sí mismos no hay regresiones; con una base el doble de rápida, todos empeoran.
+    assert benchmark_computo.comparar(resultados, resultados, 0.25) == []
+    base = {c: {'mediana_ms': r['mediana_ms'] / 2} for c, r in resultados.items()}
+    assert len(benchmark_computo.comparar(resultados, base, 0.25)) == len(resultados)
+
+
+def test_benchmark_importacion_de_una_pagina():
+    pagina = benchmark_importacion.DIRECTORIO_APP / 'pages' / 'Estadistica.py'
+    pared, lineas = benchmark_importacion.medir_pagina(pagina)
+    modulos = benchmark_importacion.resumir_importtime(lineas)
+    assert pared > 0 and 'streamlit' in modulos
+    resultados = {pagina.name: {'importacion_ms': sum(modulos.values())}}
+    assert benchmark_importacion.comparar(resultados, resultados, 0.25) == []
+    assert benchmark_importacion.comparar(resultados, {pagina.name: {'importacion_ms': 1e-3}}, 0.25)
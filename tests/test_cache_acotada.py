@@ -0,0 +1,62 @@
+# Pruebas de la caché acotada de las páginas (app/cache_acotada.py).
+import numpy as np
+import pytest
+
+import cache_acotada
+from cache_acotada import CacheAcotada
+
+
+@pytest.fixture
+def vigentes(monkeypatch):
+    # Instantáneas publicadas que ve la caché (sin leer los punteros del disco).
+    publicadas = {'snap-a'}
+    monkeypatch.setattr(cache_acotada, 'snapshots_vigentes', lambda: publicadas)
+    return publicadas
+
+
+def test_expulsa_la_menos_usada_al_superar_el_limite(vigentes):
+    cache = CacheAcotada('prueba', max_bytes=2500)
+    for clave in 'abc':
+        cache.guardar(clave, np.zeros(100))  # 800 bytes cada una.
+    assert cache.obtener('a') == (True, cache.entradas['a'][0])
+    cache.guardar('d', np.zeros(100))
+    # 'b' era la menos usada: 'a' se leyó después de guardarse 'c'.
+    assert list(cache.entradas) == ['c', 'a', 'd']
+    assert cache.estadisticas()['expulsiones'] == 1 and cache.bytes <= cache.max_bytes
+    # Un valor mayor que toda la caché no se guarda.
+    cache.guardar('enorme', np.zeros(1000))
+    assert 'enorme' not in cache.entradas
+
+
+def test_caduca_con_su_instantanea_y_con_el_ttl(vigentes, monkeypatch):
+    cache = CacheAcotada('prueba', max_bytes=10 ** 6, ttl=60)
+    cache.guardar('x', 1, 'snap-a')
+    assert cache.obtener('x') == (True, 1)
+    vigentes.discard('snap-a')
+    vigentes.add('snap-b')
+    assert cache.obtener('x') == (False, None)
+    assert cache.estadisticas()['caducadas'] == 1
+
+    reloj = iter([0.0, 61.0])
+    monkeypatch.setattr(cache_acotada.time, 'monotonic', lambda: next(reloj))
+    cache.guardar('y', 2)
+    assert cache.obtener('y') == (False, None)
+
+
+def test_decorador_usa_solo_los_argumentos_sin_guion_bajo(vigentes):
+    llamadas = []
+
+    @cache_acotada.cache_acotada(max_mb=1)
+    def tabla(_datos, id_snapshot, paises):
+        llamadas.append(paises)
+        return len(_datos) + len(paises)
+
+    assert tabla([1, 2, 3], 'snap-a', ['Peru', 'US']) == 5
+    # Otro objeto en '_datos' no cambia la clave; una lista igual tampoco.
+    assert tabla([], 'snap-a', ['Peru', 'US']) == 5
+    assert tabla([], 'snap-a', ['Peru']) == 1
+    assert llamadas == [['Peru', 'US'], ['Peru']]
+    tabla.clear()
+    tabla([], 'snap-a', ['Peru'])
+    assert len(llamadas) == 3
+    assert cache_acotada.estadisticas_caches()[tabla.cache.nombre]['entradas'] == 1
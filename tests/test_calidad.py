@@ -0,0 +1,90 @@
+# Pruebas de las reglas de calidad (app/calidad.py): cada regla marca exactamente las filas que la
+# incumplen, con nulos y columnas ausentes, y el resumen cuenta las filas marcadas por regla.
+import numpy as np
+import pandas as pd
+import pytest
+
+from calidad import REGLAS, marcas_calidad, resumen_calidad
+
+
+def reporte(**columnas):
+    # Reporte de 4 filas con valores válidos; cada prueba sobrescribe las columnas que necesita.
+    base = {
+        'Combined_Key': ['Lima, Peru', 'Cusco, Peru', 'Mexico', 'Autauga, Alabama, US'],
+        'Confirmed': [2000, 1000, 5000, 300],
+        'Deaths': [40, 10, 250, 3],
+        'Recovered': [np.nan, np.nan, np.nan, np.nan],
+        'Active': [np.nan, np.nan, np.nan, np.nan],
+    }
+    return pd.DataFrame({**base, **columnas})
+
+
+def filas_marcadas(marcas, regla):
+    return list(np.flatnonzero(marcas[regla].to_numpy()))
+
+
+def test_reporte_valido_sin_marcas():
+    marcas = marcas_calidad(reporte())
+    assert list(marcas.columns) == list(REGLAS)
+    assert not marcas.to_numpy().any()
+
+
+@pytest.mark.parametrize('columna', ['Confirmed', 'Deaths', 'Recovered', 'Active'])
+def test_conteo_negativo(columna):
+    valores = {'Confirmed': [2000, 1000, 5000, 300], 'Deaths': [0, 0, 0, 0],
+               'Recovered': [0, 0, 0, 0], 'Active': [np.nan] * 4}[columna]
+    valores = list(valores)
+    valores[2] = -1
+    marcas = marcas_calidad(reporte(**{columna: valores}))
+    assert filas_marcadas(marcas, 'conteo_negativo') == [2]
+
+
+def test_fallecidos_mayor_confirmados():
+    # Igual no cuenta; un nulo en cualquiera de las dos no se marca.
+    marcas = marcas_calidad(reporte(Confirmed=[10, 10, np.nan, 0], Deaths=[11, 10, 5, np.nan]))
+    assert filas_marcadas(marcas, 'fallecidos_mayor_confirmados') == [0]
+
+
+def test_activos_inconsistentes():
+    # Solo se comprueba con las cuatro columnas presentes: la fila 3 tiene Recovered nulo.
+    marcas = marcas_calidad(reporte(Confirmed=[100, 100, 100, 100], Deaths=[10, 10, 10, 10],
+                                    Recovered=[20, 20, 20, np.nan], Active=[70, 71, np.nan, 5]))
+    assert filas_marcadas(marcas, 'activos_inconsistentes') == [1]
+
+
+def test_clave_duplicada():
+    # Se marcan todas las repeticiones; las claves nulas no cuentan como duplicadas.
+    marcas = marcas_calidad(reporte(Combined_Key=['Peru', 'Mexico', 'Peru', None]))
+    assert filas_marcadas(marcas, 'clave_duplicada') == [0, 2]
+    marcas = marcas_calidad(reporte(Combined_Key=[None, 'Peru', 'Mexico', None]))
+    assert filas_marcadas(marcas, 'clave_duplicada') == []
+
+
+def test_descenso_acumulado():
+    anterior = pd.DataFrame({
+        'Combined_Key': ['Lima, Peru', 'Cusco, Peru', 'Mexico', 'Mexico'],
+        'Confirmed': [2000, 1001, 4000, 9000],
+        'Deaths': [41, 10, 250, 250],
+    })
+    marcas = marcas_calidad(reporte(), anterior)
+    # Lima baja en fallecidos y Cusco en confirmados; con claves repetidas vale la primera
+    # (Mexico 4000 → 5000 no es un descenso); Autauga no estaba el día anterior.
+    assert filas_marcadas(marcas, 'descenso_acumulado') == [0, 1]
+    # Sin día anterior no hay descensos.
+    assert filas_marcadas(marcas_calidad(reporte()), 'descenso_acumulado') == []
+
+
+def test_columnas_ausentes():
+    # Reportes antiguos sin Active ni Combined_Key: esas reglas no marcan nada.
+    df = reporte().drop(columns=['Active', 'Combined_Key'])
+    marcas = marcas_calidad(df, reporte())
+    assert not marcas[['activos_inconsistentes', 'clave_duplicada', 'descenso_acumulado']].to_numpy().any()
+
+
+def test_resumen_cuenta_filas_por_regla():
+    df = reporte(Combined_Key=['Peru', 'Peru', 'Mexico', 'US'], Deaths=[40, 2000, -1, 3])
+    resumen = resumen_calidad(df, marcas_calidad(df))
+    assert resumen['filas'] == 4
+    assert resumen['reglas'] == {'conteo_negativo': 1, 'fallecidos_mayor_confirmados': 1,
+                                 'activos_inconsistentes': 0, 'clave_duplicada': 2, 'descenso_acumulado': 0}
+    assert resumen['nulos']['Recovered'] == 1.0 and resumen['nulos']['Confirmed'] == 0.0
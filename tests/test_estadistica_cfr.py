@@ -0,0 +1,33 @@
+# Pruebas de los tests de CFR por pares (app/estadistica_cfr.py).
+import numpy as np
+import pytest
+
+import estadistica_cfr
+
+
+@pytest.mark.parametrize('correccion', estadistica_cfr.CORRECCIONES)
+def test_correccion_sobre_pares_distintos(correccion):
+    from statsmodels.stats.multitest import multipletests
+
+    paises = ['A', 'B', 'C', 'D']
+    fallecidos = np.array([30, 22, 50, 10])
+    confirmados = np.array([1000, 1000, 1200, 900])
+    z, p, corregido = estadistica_cfr.test_z_pares(paises, fallecidos, confirmados, correccion)
+
+    # La familia son los 6 pares, cada uno con su p-valor bilateral.
+    filas, columnas = np.triu_indices(4, k=1)
+    bilateral = 2 * np.minimum(p.to_numpy()[filas, columnas], p.to_numpy()[columnas, filas])
+    esperado = multipletests(bilateral, method=correccion)[1]
+    for (i, j), valor in zip(zip(filas, columnas), esperado):
+        assert corregido.iat[i, j] == corregido.iat[j, i] == pytest.approx(valor)
+    assert np.isnan(np.diag(corregido.to_numpy())).all()
+
+
+def test_sin_diferencia_no_depende_del_orden():
+    # Dos países con la misma CFR (z = 0): el resultado es el mismo en ambos órdenes.
+    for orden in (['A', 'B', 'C'], ['B', 'A', 'C']):
+        datos = {'A': (10, 1000), 'B': (20, 2000), 'C': (50, 1000)}
+        x, n = zip(*(datos[p] for p in orden))
+        z, _, corregido = estadistica_cfr.test_z_pares(orden, x, n)
+        assert z.loc['A', 'B'] == 0
+        assert corregido.loc['A', 'B'] == corregido.loc['B', 'A'] == 1.0
@@ -0,0 +1,108 @@
+# Pruebas de la exportación por bloques (app/exportacion.py): cada formato, leído de vuelta, debe
+# coincidir con la concatenación de los bloques de origen.
+import gzip
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import exportacion
+from exportacion import FORMATOS, bloques_provincias, bloques_series, flujo
+from modelo_datos import DatosCovid
+from sinteticos import generar_cubo, generar_reporte
+
+
+def cubo_con_huecos():
+    # 12 países × 40 días; algunas celdas sin reporte no deben exportarse.
+    cubo = generar_cubo(12, 40)
+    cubo.presente[3, 10:15] = False
+    cubo.presente[7, -1] = False
+    return cubo
+
+
+def origen(cubo, **filtros):
+    return pd.concat(list(bloques_series(cubo, **filtros)), ignore_index=True)
+
+
+def leer(contenido, formato):
+    # Lee el archivo exportado con el lector de pandas de cada formato (XLSX: todas las hojas).
+    if formato == 'csv':
+        return pd.read_csv(io.BytesIO(contenido))
+    if formato == 'csv.gz':
+        return pd.read_csv(io.BytesIO(gzip.decompress(contenido)))
+    if formato == 'parquet':
+        return pd.read_parquet(io.BytesIO(contenido))
+    hojas = pd.read_excel(io.BytesIO(contenido), sheet_name=None)
+    return pd.concat(hojas.values(), ignore_index=True)
+
+
+def comparar(leido, esperado):
+    assert list(leido.columns) == list(esperado.columns)
+    assert len(leido) == len(esperado)
+    assert list(leido['Country_Region'].astype(str)) == list(esperado['Country_Region'].astype(str))
+    np.testing.assert_array_equal(pd.to_datetime(leido['Date']).to_numpy('datetime64[D]'),
+                                  esperado['Date'].to_numpy('datetime64[D]'))
+    for metrica in esperado.columns[2:]:
+        np.testing.assert_array_equal(leido[metrica].to_numpy(np.int64), esperado[metrica].to_numpy(np.int64))
+
+
+@pytest.mark.parametrize('formato', list(FORMATOS))
+def test_ida_y_vuelta(formato):
+    libreria = FORMATOS[formato][2]
+    if libreria:
+        pytest.importorskip(libreria)
+    cubo = cubo_con_huecos()
+    # Bloques pequeños para que el archivo se arme a partir de varios.
+    bloques = list(bloques_series(cubo, desde='2020-02-01', hasta='2020-02-20', filas=50))
+    assert len(bloques) > 1
+    contenido = b''.join(flujo(iter(bloques), formato))
+    comparar(leer(contenido, formato), pd.concat(bloques, ignore_index=True))
+
+
+@pytest.mark.parametrize('formato', list(FORMATOS))
+def test_provincias_ida_y_vuelta(formato):
+    # Filas crudas con columnas categóricas (cada país aporta bloques con su propio diccionario) y nulos.
+    libreria = FORMATOS[formato][2]
+    if libreria:
+        pytest.importorskip(libreria)
+    datos = DatosCovid(generar_reporte(), 'prueba')
+    paises = ['US', 'Peru', 'Chile']
+    esperado = pd.concat(list(bloques_provincias(datos, paises, filas=200)), ignore_index=True)
+    leido = leer(b''.join(flujo(bloques_provincias(datos, paises, filas=200), formato)), formato)
+    assert list(leido.columns) == list(esperado.columns) and len(leido) == len(esperado)
+    for columna in ['Country_Region', 'Province_State', 'Combined_Key']:
+        assert list(leido[columna].astype(str)) == list(esperado[columna].astype(str))
+    assert leido['Admin2'].isna().sum() == esperado['Admin2'].isna().sum()
+    np.testing.assert_allclose(leido[['Confirmed', 'Deaths', 'Lat']].to_numpy(np.float64),
+                               esperado[['Confirmed', 'Deaths', 'Lat']].to_numpy(np.float64), rtol=1e-6)
+
+
+def test_series_solo_celdas_presentes_y_en_rango():
+    cubo = cubo_con_huecos()
+    tabla = origen(cubo, paises=[cubo.paises[3], cubo.paises[7]], desde='2020-01-30', hasta=None)
+    inicio = int(np.searchsorted(cubo.fechas, np.datetime64('2020-01-30')))
+    assert len(tabla) == cubo.presente[[3, 7], inicio:].sum()
+    assert tabla['Date'].min() == pd.Timestamp('2020-01-30')
+    assert set(tabla['Country_Region']) == {cubo.paises[3], cubo.paises[7]}
+
+
+def test_xlsx_reparte_en_hojas(monkeypatch):
+    pytest.importorskip('openpyxl')
+    monkeypatch.setattr(exportacion, 'MAX_FILAS_XLSX', 100)
+    cubo = cubo_con_huecos()
+    esperado = origen(cubo)
+    contenido = b''.join(flujo(bloques_series(cubo, filas=70), 'xlsx'))
+    assert len(pd.read_excel(io.BytesIO(contenido), sheet_name=None)) == -(-len(esperado) // 100)
+    comparar(leer(contenido, 'xlsx'), esperado)
+
+
+@pytest.mark.parametrize('formato', list(FORMATOS))
+def test_sin_filas_queda_la_cabecera(formato):
+    libreria = FORMATOS[formato][2]
+    if libreria:
+        pytest.importorskip(libreria)
+    cubo = cubo_con_huecos()
+    contenido = b''.join(flujo(bloques_series(cubo, paises=['Atlantis']), formato))
+    leido = leer(contenido, formato)
+    assert leido.empty and list(leido.columns) == ['Country_Region', 'Date', *cubo.metricas]
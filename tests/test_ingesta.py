@@ -0,0 +1,100 @@
+# Pruebas del cubo país × fecha (app/ingesta.py), sin red.
+import os
+
+import numpy as np
+import pytest
+
+import ingesta
+from ingesta import CuboSeries
+from sinteticos import escribir_archivo
+
+
+def cubo_con_hueco():
+    # Un país con el tercer día sin reporte (en el cubo esa celda vale 0 y presente=False).
+    fechas = np.arange('2020-03-01', '2020-03-07', dtype='datetime64[D]')
+    confirmados = np.array([[100, 110, 0, 130, 140, 150], [5, 6, 7, 8, 9, 10]], dtype=np.int32)
+    presente = np.array([[True, True, False, True, True, True], [True] * 6])
+    metricas = {m: confirmados if m == 'Confirmed' else np.zeros_like(confirmados) for m in ingesta.METRICAS}
+    return CuboSeries(['A', 'B'], fechas, metricas, presente)
+
+
+def test_nuevos_diarios_con_hueco_no_inventa_un_pico():
+    cubo = cubo_con_hueco()
+    np.testing.assert_array_equal(cubo.nuevos_diarios()[0], [0, 10, 0, 20, 10, 10])
+    np.testing.assert_array_equal(cubo.nuevos_diarios()[1], [0, 1, 1, 1, 1, 1])
+    # El cálculo parcial coincide con el completo desde cualquier columna.
+    for desde in range(len(cubo.fechas)):
+        np.testing.assert_array_equal(cubo.nuevos_diarios(desde=desde), cubo.nuevos_diarios()[:, desde:])
+
+
+def test_acumulado_continuo_rellena_con_el_ultimo_reporte():
+    cubo = cubo_con_hueco()
+    np.testing.assert_array_equal(cubo.acumulado_continuo('Confirmed', [0]), [[100, 110, 110, 130, 140, 150]])
+
+
+def test_acumulado_continuo_desde_igual_al_completo():
+    # Huecos largos y países sin ningún reporte antes de 'desde': el cálculo desde una columna
+    # (que solo mira hacia atrás lo necesario) coincide con el corte del cálculo completo.
+    rng = np.random.default_rng(0)
+    presente = rng.random((30, 80)) < 0.7
+    presente[3, :60] = False
+    presente[4, 5:75] = False
+    presente[5] = False
+    acumulado = np.where(presente, np.cumsum(rng.integers(0, 50, (30, 80)), axis=1), 0).astype(np.int32)
+    metricas = {m: acumulado for m in ingesta.METRICAS}
+    cubo = CuboSeries([f'P{i}' for i in range(30)], np.arange(80) + np.datetime64('2020-03-01'), metricas, presente)
+    completo = np.take_along_axis(acumulado, np.maximum.accumulate(np.where(presente, np.arange(80), 0), axis=1), axis=1)
+    for filas in (slice(None), [5, 3, 4, 0], np.arange(10, 20)):
+        for desde in (0, 1, 6, 40, 61, 79, 80):
+            np.testing.assert_array_equal(cubo.acumulado_continuo('Confirmed', filas, desde), completo[filas, desde:])
+
+
+@pytest.fixture
+def reportes(tmp_path):
+    return tmp_path / 'raw', escribir_archivo(tmp_path / 'raw', 4)
+
+
+def test_actualizar_cubo_y_cargar(tmp_path, reportes):
+    directorio_csv, rutas = reportes
+    cubo = ingesta.actualizar_cubo(directorio_csv, tmp_path / 'cubo', procesos=1)
+    assert len(cubo.fechas) == 4 and cubo.presente.all()
+    # Los acumulados del cubo son los totales por país de cada reporte.
+    paises, valores = ingesta.leer_reporte_diario(rutas[-1])
+    fila = cubo.posicion[paises[0]]
+    assert cubo.metricas['Confirmed'][fila, -1] == valores[0, ingesta.METRICAS.index('Confirmed')]
+    # Volver a ejecutar sin archivos nuevos no cambia la versión publicada.
+    version = ingesta.version_cubo(tmp_path / 'cubo')
+    ingesta.actualizar_cubo(directorio_csv, tmp_path / 'cubo', procesos=1)
+    assert ingesta.version_cubo(tmp_path / 'cubo') == version
+
+
+def test_cada_actualizacion_publica_una_version_nueva(tmp_path):
+    directorio_csv = tmp_path / 'raw'
+    rutas = escribir_archivo(directorio_csv, 5)
+    rutas[-1].rename(tmp_path / rutas[-1].name)
+    cubo = ingesta.actualizar_cubo(directorio_csv, tmp_path / 'cubo', procesos=1)
+    anterior = cubo.version
+    assert ingesta.version_cubo(tmp_path / 'cubo') == anterior and len(cubo.fechas) == 4
+
+    # Anexar el día siguiente publica otra versión sin tocar lo que ve la anterior.
+    nuevo = ingesta.anexar_reporte(tmp_path / rutas[-1].name, tmp_path / 'cubo')
+    assert nuevo.version != anterior and len(nuevo.fechas) == 5
+    assert ingesta.version_cubo(tmp_path / 'cubo') == nuevo.version
+    viejo = ingesta.cargar_cubo(tmp_path / 'cubo', anterior)
+    assert len(viejo.fechas) == 4
+    np.testing.assert_array_equal(viejo.metricas['Confirmed'], nuevo.metricas['Confirmed'][:, :4])
+
+    # Un archivo corregido obliga a reescribir el cubo: va a un directorio de datos nuevo.
+    (tmp_path / rutas[-1].name).rename(rutas[-1])
+    os.utime(rutas[1], ns=(0, 0))
+    reconstruido = ingesta.actualizar_cubo(directorio_csv, tmp_path / 'cubo', procesos=1)
+    assert reconstruido.version != nuevo.version
+    assert ingesta.leer_meta(tmp_path / 'cubo', reconstruido.version)['datos'] \
+        != ingesta.leer_meta(tmp_path / 'cubo', nuevo.version)['datos']
+    np.testing.assert_array_equal(reconstruido.metricas['Confirmed'], nuevo.metricas['Confirmed'])
+
+def test_formato_anterior_se_trata_como_cubo_vacio(tmp_path):
+    (tmp_path / 'cubo').mkdir()
+    (tmp_path / 'cubo' / 'meta.json').write_text('{"paises": [], "fechas": [], "procesados": {}}')
+    assert ingesta.version_cubo(tmp_path / 'cubo') == 'cubo-vacio'
+    assert len(ingesta.cargar_cubo(tmp_path / 'cubo').paises) == 0
@@ -0,0 +1,68 @@
+# Pruebas del cubo jerárquico (app/jerarquia.py): cada nivel debe coincidir con un groupby().sum()
+# sobre el reporte crudo, con las provincias y condados nulos agrupados como SIN_DESGLOSE.
+import numpy as np
+import pandas as pd
+import pytest
+
+from jerarquia import METRICAS, NIVELES, SIN_DESGLOSE, CuboJerarquico
+from modelo_datos import compactar
+
+# Reporte pequeño con provincias y condados nulos, un país sin desglose y métricas con NaN.
+RAW = pd.DataFrame({
+    'Country_Region': ['Peru', 'Peru', 'Peru', 'US', 'US', 'US', 'US', 'Mexico'],
+    'Province_State': ['Lima', 'Cusco', np.nan, 'Alabama', 'Alabama', 'Texas', np.nan, np.nan],
+    'Admin2': [np.nan, np.nan, np.nan, 'Autauga', 'Baldwin', 'Travis', np.nan, np.nan],
+    'Lat': [-12.0, -13.5, np.nan, 32.5, 30.7, 30.3, np.nan, 23.6],
+    'Long_': [-77.0, -72.0, np.nan, -86.6, -87.7, -97.8, np.nan, -102.5],
+    'Confirmed': [2000, 1000, 50, 300, 200, 700, 10, 5000],
+    'Deaths': [40, 10, 1, 3, 2, 7, 0, 250],
+    'Recovered': [np.nan, np.nan, np.nan, 100, np.nan, 50, np.nan, np.nan],
+    'Active': [np.nan] * 8,
+})
+
+
+def esperado(profundidad):
+    # Sumas de referencia por los primeros 'profundidad' niveles (los NaN de métricas cuentan como 0).
+    niveles = NIVELES[:profundidad]
+    tabla = RAW.fillna({n: SIN_DESGLOSE for n in niveles}).groupby(niveles)[METRICAS].sum()
+    return tabla.reset_index().sort_values(niveles, ignore_index=True)
+
+
+@pytest.fixture(params=['texto', 'categorico'])
+def cubo(request):
+    # El mismo reporte con columnas de texto y con columnas categóricas (como en DatosCovid).
+    return CuboJerarquico(RAW if request.param == 'texto' else compactar(RAW))
+
+
+@pytest.mark.parametrize('profundidad', [1, 2, 3])
+def test_niveles_coinciden_con_groupby(cubo, profundidad):
+    niveles = NIVELES[:profundidad]
+    tabla = cubo.nivel(NIVELES[profundidad - 1]).sort_values(niveles, ignore_index=True)
+    referencia = esperado(profundidad)
+    pd.testing.assert_frame_equal(tabla[niveles].astype(str), referencia[niveles].astype(str))
+    np.testing.assert_allclose(tabla[METRICAS].to_numpy(), referencia[METRICAS].to_numpy())
+    assert cubo.total['Confirmed'] == RAW['Confirmed'].sum()
+
+
+def test_provincias_nulas_y_cfr(cubo):
+    provincias = cubo.nivel('Province_State').set_index(['Country_Region', 'Province_State'])
+    assert provincias.loc[('Peru', SIN_DESGLOSE), 'Confirmed'] == 50
+    assert provincias.loc[('Mexico', SIN_DESGLOSE), 'CFR'] == 5.0
+    # Sin coordenadas válidas el centroide queda en NaN; con varias filas es su media.
+    assert np.isnan(provincias.loc[('Peru', SIN_DESGLOSE), 'Lat'])
+    assert provincias.loc[('US', 'Alabama'), 'Lat'] == pytest.approx((32.5 + 30.7) / 2)
+
+
+def test_desglose(cubo):
+    # Sin argumentos, los países; con país, sus provincias; con país y provincia, sus condados.
+    assert cubo.desglose() is cubo.nivel('Country_Region')
+    provincias = cubo.desglose('US')
+    assert sorted(provincias['Province_State']) == sorted(['Alabama', 'Texas', SIN_DESGLOSE])
+    assert (provincias['Country_Region'] == 'US').all()
+    condados = cubo.desglose('US', 'Alabama')
+    assert list(condados['Admin2']) == ['Autauga', 'Baldwin']
+    assert list(condados['Confirmed']) == [300, 200]
+    # Las filas sin provincia también son un nodo que se puede desglosar.
+    assert list(cubo.desglose('Peru', SIN_DESGLOSE)['Admin2']) == [SIN_DESGLOSE]
+    # Un país o una provincia desconocidos no tienen hijos.
+    assert cubo.desglose('Chile').empty and cubo.desglose('US', 'Lima').empty
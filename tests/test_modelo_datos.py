@@ -0,0 +1,69 @@
+# Pruebas de los índices de ranking (app/modelo_datos.py): Top N y el filtro por umbral deben dar
+# lo mismo que nlargest y que una máscara booleana, también con empates y en el umbral exacto.
+import numpy as np
+import pandas as pd
+import pytest
+
+from modelo_datos import METRICAS_RANKING, DatosCovid, IndiceRanking
+
+# Tabla con empates en Confirmed y Deaths y un NaN en Recovered.
+TABLA = pd.DataFrame({
+    'Confirmed': [500, 300, 500, 100, 300, 900],
+    'Deaths': [5, 5, 5, 1, 3, 9],
+    'Recovered': [10, np.nan, 30, 0, 20, 40],
+})
+
+
+@pytest.mark.parametrize('metrica', ['Confirmed', 'Deaths', 'Recovered'])
+@pytest.mark.parametrize('n', [1, 2, 3, 5, 10])
+def test_top_n_igual_a_nlargest(metrica, n):
+    indice = IndiceRanking(TABLA, ['Confirmed', 'Deaths', 'Recovered'])
+    # nlargest desempata por orden de aparición (keep='first') y deja los NaN al final.
+    esperado = TABLA[metrica].nlargest(n).index.to_numpy()
+    np.testing.assert_array_equal(indice.top_n(metrica, n), esperado)
+
+
+@pytest.mark.parametrize('metrica', ['Confirmed', 'Deaths', 'Recovered'])
+@pytest.mark.parametrize('umbral', [-1, 0, 3, 5, 5.5, 300, 500, 900, 901])
+def test_sobre_umbral_igual_a_mascara(metrica, umbral):
+    # Incluye umbrales iguales a un valor presente (>=, no >) y a valores empatados.
+    indice = IndiceRanking(TABLA, ['Confirmed', 'Deaths', 'Recovered'])
+    esperado = np.flatnonzero(TABLA[metrica].to_numpy() >= umbral)
+    assert sorted(indice.sobre_umbral(metrica, umbral)) == list(esperado)
+
+
+def datos_con_empates():
+    # Reporte crudo con tres países empatados en confirmados (uno repartido en provincias) y uno sin
+    # casos, cuya CFR es NaN.
+    raw = pd.DataFrame({
+        'Country_Region': ['Chile', 'Peru', 'Peru', 'Mexico', 'Cuba', 'Bolivia', 'Haiti'],
+        'Province_State': [np.nan, 'Lima', 'Cusco', np.nan, np.nan, np.nan, np.nan],
+        'Confirmed': [3000, 2000, 1000, 5000, 3000, 100, 0],
+        'Deaths': [30, 40, 10, 250, 60, 1, 0],
+        'Recovered': [np.nan] * 7,
+        'Active': [np.nan] * 7,
+    })
+    return DatosCovid(raw, 'prueba')
+
+
+@pytest.mark.parametrize('metrica', METRICAS_RANKING)
+def test_top_n_de_datos_covid(metrica):
+    datos = datos_con_empates()
+    for n in range(1, len(datos.paises) + 2):
+        esperado = datos.paises.nlargest(n, metrica)
+        pd.testing.assert_frame_equal(datos.top_n(metrica, n), esperado)
+
+
+@pytest.mark.parametrize('umbral', [0, 100, 3000, 3001, 5000, 5001])
+def test_filtrar_igual_a_mascara(umbral):
+    datos = datos_con_empates()
+    paises = ['Peru', 'Chile', 'Mexico', 'Cuba', 'Atlantis']
+    # Mismo resultado que el filtrado con máscara booleana, en el orden de la lista pedida.
+    tabla = datos.paises.set_index(datos.paises['Country_Region'].astype(str))
+    mascara = tabla['Confirmed'] >= umbral
+    esperado = [p for p in paises if p in tabla.index and mascara[p]]
+    resultado = datos.filtrar(paises, 'Confirmed', umbral)
+    assert list(resultado['Country_Region'].astype(str)) == esperado
+    # Los países empatados en el umbral exacto entran los dos.
+    if umbral == 3000:
+        assert {'Chile', 'Cuba', 'Peru'} <= set(esperado)
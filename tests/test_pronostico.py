@@ -0,0 +1,48 @@
+# Pruebas de los pronósticos por país (app/pronostico.py).
+import numpy as np
+import pandas as pd
+import pytest
+
+import ingesta
+import pronostico
+from ingesta import CuboSeries
+
+
+def cubo_sin_una_fecha(dias=40):
+    # Dos países con un día sin archivo en el archivo de JHU (la fecha no existe en el cubo).
+    fechas = np.delete(np.arange(np.datetime64('2021-01-01'), np.datetime64('2021-01-01') + dias), 20)
+    acumulado = np.cumsum(np.tile(np.arange(1, len(fechas) + 1) % 7 + 10, (2, 1)), axis=1).astype(np.int32)
+    metricas = {m: acumulado for m in ingesta.METRICAS}
+    return CuboSeries(['A', 'B'], fechas, metricas, np.ones_like(acumulado, dtype=bool))
+
+
+def test_fecha_que_falta_reparte_el_salto(tmp_path, monkeypatch):
+    monkeypatch.setattr(pronostico, 'DIRECTORIO_MODELOS', tmp_path)
+    cubo = cubo_sin_una_fecha()
+    nuevos = cubo.nuevos_diarios()[0]
+    serie = pronostico.serie_diaria('A', cubo.fechas, nuevos)
+    assert serie.index.freqstr == 'D' and len(serie) == len(cubo.fechas) + 1
+    # El 22 trae los casos del 21 y el 22: se reparten a partes iguales y el total no cambia.
+    salto = nuevos[np.searchsorted(cubo.fechas, np.datetime64('2021-01-22'))]
+    assert serie['2021-01-21'] == serie['2021-01-22'] == salto / 2
+    assert serie.sum() == pytest.approx(nuevos.sum())
+    assert (serie.drop(pd.to_datetime(['2021-01-21', '2021-01-22'])).to_numpy() == np.delete(nuevos, 20)).all()
+    resultado = pronostico.pronosticar_paises(['A'], 'ets', {'horizonte': 7}, cubo=cubo, procesos=1)['A']
+    assert len(resultado['pronostico']) == 7
+
+
+def test_un_pais_que_falla_no_detiene_el_lote(tmp_path, monkeypatch):
+    monkeypatch.setattr(pronostico, 'DIRECTORIO_MODELOS', tmp_path)
+    ets = pronostico.AJUSTADORES['ets']
+
+    def ajustar(serie, parametros):
+        if serie.name == 'B':
+            raise ValueError('serie degenerada')
+        return ets(serie, parametros)
+
+    monkeypatch.setitem(pronostico.AJUSTADORES, 'ets', ajustar)
+    resultados = pronostico.pronosticar_paises(['A', 'B'], 'ets', {'horizonte': 7}, cubo=cubo_sin_una_fecha(), procesos=1)
+    assert 'error' not in resultados['A'] and len(resultados['A']['pronostico']) == 7
+    assert resultados['B']['error'] == 'ValueError: serie degenerada'
+    # Los fallos no se guardan en la caché: el país se reintenta en la próxima llamada.
+    assert len(list(tmp_path.glob('*.pkl'))) == 1
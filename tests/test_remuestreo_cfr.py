@@ -0,0 +1,46 @@
+# Pruebas de los intervalos de la CFR por remuestreo (app/remuestreo_cfr.py): celdas sin casos y
+# reproducibilidad con la misma semilla, sea cual sea el número de procesos.
+import numpy as np
+import pytest
+
+import remuestreo_cfr
+from remuestreo_cfr import COLUMNAS, intervalos_celdas, intervalos_remuestreo
+
+FALLECIDOS = [0, 5, 0, 40, 3, 120, 7]
+CONFIRMADOS = [0, 100, 50, 1000, 2, 3000, -1]
+
+
+def test_celdas_sin_casos_quedan_en_nan():
+    tabla = intervalos_remuestreo(list('ABCDEFG'), FALLECIDOS, CONFIRMADOS, replicas=500, procesos=1)
+    assert list(tabla.columns) == COLUMNAS
+    # Sin confirmados (o con un conteo negativo corregido) no hay intervalo.
+    assert tabla.loc[['A', 'G']].isna().all().all()
+    assert tabla.drop(['A', 'G']).notna().all().all()
+    # Sin fallecidos el bootstrap es degenerado en 0, pero el posterior de Jeffreys no.
+    assert tabla.loc['C', 'Bootstrap Inferior'] == tabla.loc['C', 'Bootstrap Superior'] == 0
+    assert 0 < tabla.loc['C', 'Bayes Inferior'] < tabla.loc['C', 'Bayes Superior'] < 0.1
+    # Más fallecidos que confirmados se acota a una CFR de 1.
+    assert tabla.loc['E', 'Bootstrap Superior'] == 1
+
+
+def test_intervalos_contienen_la_cfr_observada():
+    tabla = intervalos_remuestreo(list('ABCDEFG'), FALLECIDOS, CONFIRMADOS, replicas=2000, procesos=1).dropna()
+    x, n = np.asarray(FALLECIDOS[1:6], dtype=float), np.asarray(CONFIRMADOS[1:6], dtype=float)
+    cfr = np.minimum(x, n) / n
+    assert (tabla['Bootstrap Inferior'] <= cfr).all() and (cfr <= tabla['Bootstrap Superior']).all()
+    assert (tabla['Bayes Inferior'] <= tabla['Bayes Media']).all() and (tabla['Bayes Media'] <= tabla['Bayes Superior']).all()
+
+
+@pytest.mark.parametrize('procesos', [1, 2, 3])
+def test_misma_semilla_mismo_resultado_con_cualquier_numero_de_procesos(monkeypatch, procesos):
+    # Lotes pequeños para que haya varios y se repartan entre procesos.
+    monkeypatch.setattr(remuestreo_cfr, 'ELEMENTOS_POR_LOTE', 2 * 300)
+    rng = np.random.default_rng(1)
+    confirmados = rng.integers(0, 5000, 25)
+    fallecidos = rng.binomial(confirmados, 0.02)
+    referencia = intervalos_celdas(fallecidos, confirmados, replicas=300, procesos=1, semilla=7)
+    resultado = intervalos_celdas(fallecidos, confirmados, replicas=300, procesos=procesos, semilla=7)
+    np.testing.assert_array_equal(resultado, referencia)
+    # Otra semilla da otras réplicas.
+    otra = intervalos_celdas(fallecidos, confirmados, replicas=300, procesos=procesos, semilla=8)
+    assert not np.array_equal(np.nan_to_num(otra), np.nan_to_num(referencia))
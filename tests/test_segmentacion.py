@@ -0,0 +1,71 @@
+# Pruebas del barrido de clustering (app/segmentacion.py): forma de la salida para k = 2..10, vistas
+# de PCA y el arranque desde los centroides de la instantánea anterior.
+import numpy as np
+import pytest
+
+import segmentacion
+from modelo_datos import DatosCovid
+from segmentacion import CARACTERISTICAS, RANGO_K, RANGO_PCA, barrido_clustering
+from sinteticos import generar_reporte
+
+
+@pytest.fixture(scope='module')
+def datos():
+    return DatosCovid(generar_reporte(semilla=3), 'prueba')
+
+
+@pytest.fixture(scope='module')
+def barrido(datos):
+    return barrido_clustering(datos, procesos=1)
+
+
+def test_forma_del_barrido(datos, barrido):
+    n = len(datos.paises.dropna(subset=CARACTERISTICAS))
+    assert len(barrido['paises']) == n and barrido['caracteristicas'].shape == (n, len(CARACTERISTICAS))
+    assert list(barrido['etiquetas']) == list(RANGO_K) == list(barrido['centroides'])
+    for k in RANGO_K:
+        assert barrido['etiquetas'][k].shape == (n,) and set(barrido['etiquetas'][k]) == set(range(k))
+        assert barrido['centroides'][k].shape == (k, len(CARACTERISTICAS))
+    assert list(barrido['metricas']['k']) == list(RANGO_K)
+    # La inercia baja al aumentar k y la silueta está definida en [-1, 1].
+    assert barrido['metricas']['Inercia'].is_monotonic_decreasing
+    assert barrido['metricas']['Silueta'].between(-1, 1).all()
+    assert len(barrido['varianza_explicada']) == max(RANGO_PCA)
+
+
+def test_vistas_pca_son_cortes_del_pca_completo(barrido):
+    # Cada vista de n componentes coincide (salvo el signo de cada eje) con un PCA ajustado con n.
+    from sklearn.decomposition import PCA
+    from sklearn.preprocessing import StandardScaler
+
+    escalado = StandardScaler().fit_transform(barrido['caracteristicas'])
+    for n in RANGO_PCA:
+        assert barrido['pca'][n].shape == (len(escalado), n)
+        np.testing.assert_allclose(np.abs(barrido['pca'][n]), np.abs(PCA(n_components=n).fit_transform(escalado)), atol=1e-8)
+
+
+def test_procesos_no_cambian_el_resultado(datos, barrido):
+    paralelo = barrido_clustering(datos, procesos=2)
+    for k in RANGO_K:
+        np.testing.assert_array_equal(paralelo['etiquetas'][k], barrido['etiquetas'][k])
+
+
+def test_arranque_desde_el_barrido_anterior(datos, barrido, monkeypatch):
+    # Con el barrido anterior, cada k se inicia en sus centroides (una sola inicialización).
+    llamadas = []
+    ajustar_k = segmentacion.ajustar_k
+
+    def registrar(escalado, k, inicial=None):
+        llamadas.append((k, inicial))
+        return ajustar_k(escalado, k, inicial)
+
+    monkeypatch.setattr(segmentacion, 'ajustar_k', registrar)
+    continuado = barrido_clustering(datos, procesos=1, anterior=barrido)
+    assert [k for k, _ in llamadas] == list(RANGO_K)
+    for k, inicial in llamadas:
+        # Los centroides se pasan a la escala de hoy antes de usarlos.
+        assert inicial.shape == (k, len(CARACTERISTICAS))
+        # Sobre los mismos datos, el K-means ya convergido no se mueve: la misma partición.
+        np.testing.assert_array_equal(continuado['etiquetas'][k], barrido['etiquetas'][k])
+        np.testing.assert_allclose(continuado['centroides'][k], barrido['centroides'][k], atol=1e-6)
+    np.testing.assert_allclose(continuado['metricas']['Inercia'], barrido['metricas']['Inercia'], rtol=1e-9)
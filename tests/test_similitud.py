@@ -0,0 +1,74 @@
+# Pruebas de la búsqueda de trayectorias similares (app/similitud.py): el DTW vectorizado contra una
+# implementación directa, y las consultas contra las distancias calculadas a fuerza bruta.
+import numpy as np
+import pandas as pd
+import pytest
+
+from similitud import METRICAS_TRAYECTORIA, PUNTOS, construir_indice, consultar, distancias_dtw
+from sinteticos import generar_cubo
+
+
+def dtw_directo(a, b, banda):
+    # DTW de dos trayectorias (métricas × puntos), celda a celda y con la misma banda de Sakoe-Chiba.
+    puntos = a.shape[1]
+    ancho = max(1, int(round(banda * puntos)))
+    acumulado = np.full((puntos + 1, puntos + 1), np.inf)
+    acumulado[0, 0] = 0.0
+    for i in range(1, puntos + 1):
+        for j in range(1, puntos + 1):
+            if abs(i - j) <= ancho:
+                costo = np.sqrt(((a[:, i - 1] - b[:, j - 1]) ** 2).sum())
+                acumulado[i, j] = costo + min(acumulado[i - 1, j - 1], acumulado[i - 1, j], acumulado[i, j - 1])
+    return acumulado[puntos, puntos]
+
+
+@pytest.mark.parametrize('banda', [0.0, 0.15, 0.5, 1.0])
+def test_dtw_igual_al_directo(banda):
+    rng = np.random.default_rng(0)
+    consulta = rng.normal(size=(2, 12))
+    candidatas = rng.normal(size=(5, 2, 12))
+    esperado = [dtw_directo(consulta, c, banda) for c in candidatas]
+    np.testing.assert_allclose(distancias_dtw(consulta, candidatas, banda), esperado)
+
+
+def test_dtw_tolera_un_desfase():
+    # Contra una copia desplazada un punto, el DTW es menor que la distancia euclídea; contra sí misma, 0.
+    curva = np.sin(np.linspace(0, 3, 20))[None, :]
+    desplazada = np.concatenate([curva[:, :1], curva[:, :-1]], axis=1)
+    assert distancias_dtw(curva, desplazada[None], 0.15)[0] < np.linalg.norm(curva - desplazada)
+    assert distancias_dtw(curva, curva[None], 0.15)[0] == 0
+
+
+@pytest.fixture(scope='module')
+def indice():
+    cubo = generar_cubo(30, 200)
+    return construir_indice(cubo, pd.Series(1e6, index=cubo.paises), ventana=90)
+
+
+def test_indice_tiene_un_vector_por_pais(indice):
+    assert indice['vectores'].shape == (30, PUNTOS * len(METRICAS_TRAYECTORIA))
+    assert indice['paises'] == list(indice['posicion'])
+
+
+@pytest.mark.parametrize('k', [1, 5, 29, 40])
+def test_consulta_excluye_al_pais_y_da_los_mas_cercanos(indice, k):
+    pais = indice['paises'][3]
+    tabla = consultar(indice, pais, k)
+    assert pais not in set(tabla['País'])
+    # Distancias euclídeas a fuerza bruta, sin el propio país.
+    distancias = np.linalg.norm(indice['vectores'] - indice['vectores'][3], axis=1)
+    orden = [i for i in np.argsort(distancias, kind='stable') if i != 3][:k]
+    assert list(tabla['País']) == [indice['paises'][i] for i in orden]
+    np.testing.assert_allclose(tabla['Distancia'], distancias[orden])
+
+
+def test_consulta_dtw_reordena_los_candidatos(indice):
+    pais = indice['paises'][0]
+    tabla = consultar(indice, pais, k=5, dtw=True, candidatos=10)
+    assert len(tabla) == 5 and pais not in set(tabla['País'])
+    assert tabla['Distancia DTW'].is_monotonic_increasing
+    # Los 5 elegidos son los de menor DTW entre los 10 vecinos euclídeos más cercanos.
+    candidatos = consultar(indice, pais, k=10)['País']
+    por_metrica = indice['vectores'].reshape(len(indice['paises']), len(METRICAS_TRAYECTORIA), PUNTOS)
+    dtw = distancias_dtw(por_metrica[0], por_metrica[[indice['posicion'][p] for p in candidatos]])
+    np.testing.assert_allclose(tabla['Distancia DTW'], np.sort(dtw)[:5])